@@ -0,0 +1,104 @@
+"""GPU time of the fragment and compute-shader filter paths.
+
+Runs a two-pass Gaussian blur over the Lab4 test texture at several
+resolutions and radii on three paths and reports GPU milliseconds per
+filter (GL_TIME_ELAPSED queries):
+
+  fragment      shaders/separable.glsl with integer taps (2r + 1 fetches)
+  bilinear      the same shader with merged bilinear taps (kernels.py)
+  compute       shaders/convolve.comp, tiles staged in shared memory
+
+Needs an OpenGL 4.3 context; run from the Lab4 directory.
+
+Usage: python benchmark_compute.py [--sizes 512 1024 2048 4096] [--radii 2 8 16 31 63] [--repeat 20]
+"""
+import argparse
+
+import glfw
+import numpy as np
+from OpenGL.GL import *
+
+from compute_filter import ComputeFilter, compute_supported
+from filter_pipeline import MAX_TAPS, FilterPipeline, Kernel1D, separable
+from kernels import gaussian_kernel, gaussian_weights
+from main import create_fullscreen_quad, create_test_texture, load_program
+
+
+def gpu_milliseconds(run, repeat):
+    """Mean GPU time of ``run()`` over ``repeat`` calls, after one warm-up"""
+    run()
+    query = glGenQueries(1)[0]
+    elapsed = np.zeros(1, dtype=np.uint64)
+    total = 0
+    for _ in range(repeat):
+        glBeginQuery(GL_TIME_ELAPSED, query)
+        run()
+        glEndQuery(GL_TIME_ELAPSED)
+        glGetQueryObjectui64v(query, GL_QUERY_RESULT, elapsed)
+        total += int(elapsed[0])
+    glDeleteQueries(1, [query])
+    return total / repeat / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[512, 1024, 2048, 4096])
+    parser.add_argument('--radii', type=int, nargs='*', default=[2, 8, 16, 31, 63])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if not glfw.init():
+        raise Exception("GLFW initialization failed")
+    glfw.window_hint(glfw.VISIBLE, glfw.FALSE)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 4)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+    glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, glfw.TRUE)
+    window = glfw.create_window(64, 64, "Lab4 compute benchmark", None, None)
+    if not window:
+        glfw.terminate()
+        raise Exception("Could not create an OpenGL 4.3 context")
+    glfw.make_context_current(window)
+    if not compute_supported():
+        raise Exception("Compute shaders need OpenGL 4.3")
+
+    vao, vbo, ebo, index_count = create_fullscreen_quad()
+    pipeline = FilterPipeline(load_program("shaders/vertex.glsl", "shaders/separable.glsl"), vao, index_count)
+    compute = ComputeFilter()
+    print(f"{glGetString(GL_RENDERER).decode()}, GPU ms per two-pass blur")
+
+    print(f"{'size':>10}{'radius':>8}{'fragment':>10}{'bilinear':>10}{'compute':>10}")
+    for size in args.sizes:
+        texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB8, size, size, 0, GL_RGB, GL_UNSIGNED_BYTE,
+                     create_test_texture(size, size))
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+
+        for radius in args.radii:
+            offsets, weights = gaussian_weights(radius)
+            plain = separable(Kernel1D(weights, offsets))
+            merged = separable(gaussian_kernel(radius))
+            times = []
+            for runner, passes in ((pipeline, plain), (pipeline, merged), (compute, plain)):
+                if runner is pipeline and passes[0].kernel.taps > MAX_TAPS:
+                    times.append(None)
+                    continue
+                times.append(gpu_milliseconds(lambda: runner.run(texture, size, size, passes), args.repeat))
+            cells = ''.join(f"{'-':>10}" if t is None else f"{t:>10.3f}" for t in times)
+            print(f"{f'{size}x{size}':>10}{radius:>8}{cells}")
+        glDeleteTextures(1, [texture])
+
+    pipeline.delete()
+    compute.delete()
+    glDeleteVertexArrays(1, [vao])
+    glDeleteBuffers(2, [vbo, ebo])
+    glfw.terminate()
+
+
+if __name__ == "__main__":
+    main()
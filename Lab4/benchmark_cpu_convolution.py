@@ -0,0 +1,56 @@
+"""Time the CPU convolution paths and check them against the reference.
+
+For each radius, runs one horizontal and one vertical Gaussian pass over a
+float image with direct and FFT convolution (cpu_convolution.py), reports
+milliseconds per pass, which path ``auto`` picks, and the largest
+difference from the per-texel reference in kernels.py (on a small crop, as
+the reference is slow).
+
+Usage: python benchmark_cpu_convolution.py [--size 3840 2160] [--radii 2 8 16 24 32 48 64] [--repeat 3]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from cpu_convolution import choose_method, convolve1d
+from kernels import convolve_reference, gaussian_weights
+from main import create_test_texture
+
+
+def milliseconds(run, repeat):
+    """Best time of ``run()`` over ``repeat`` calls"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, nargs=2, default=[3840, 2160], metavar=('W', 'H'))
+    parser.add_argument('--radii', type=int, nargs='*', default=[2, 8, 16, 24, 32, 48, 64])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    width, height = args.size
+    image = create_test_texture(width, height).astype(np.float32) / 255.0
+    crop = image[:160, :160].astype(np.float64)
+    print(f"{width}x{height} RGB float32, ms per 1D pass")
+    print(f"{'radius':>8}{'axis':>6}{'direct':>10}{'fft':>10}{'auto':>8}{'max diff':>12}")
+    for radius in args.radii:
+        offsets, weights = gaussian_weights(radius)
+        for axis in (1, 0):
+            times = [milliseconds(lambda: convolve1d(image, weights, axis, method), args.repeat)
+                     for method in ('direct', 'fft')]
+            expected = convolve_reference(crop, offsets, weights, axis)
+            diff = max(np.abs(convolve1d(crop, weights, axis, method) - expected).max()
+                       for method in ('direct', 'fft'))
+            print(f"{radius:>8}{'x' if axis == 1 else 'y':>6}{times[0]:>10.1f}{times[1]:>10.1f}"
+                  f"{choose_method(len(weights)):>8}{diff:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
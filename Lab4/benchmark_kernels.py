@@ -0,0 +1,57 @@
+"""Check merged bilinear Gaussian kernels against the per-texel CPU reference.
+
+For each radius, blurs the Lab4 test texture horizontally and vertically
+with the plain integer-tap kernel and with the merged bilinear kernel (CPU
+emulation of GL_LINEAR fetches), and reports fetches per pixel and the
+largest difference. ``--subtexel-bits`` also quantizes the interpolation
+fraction the way texture units do (8 bits is common).
+
+Usage: python benchmark_kernels.py [--radii 2 4 8 16 31 62] [--size 512] [--subtexel-bits 8]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from kernels import convolve_reference, gaussian_weights, merge_bilinear_taps
+from main import create_test_texture
+
+
+def quantize_offsets(offsets, bits):
+    """Offsets whose fractional part is rounded to ``bits`` bits"""
+    if not bits:
+        return offsets
+    scale = 2 ** bits
+    return np.floor(offsets) + np.round((offsets - np.floor(offsets)) * scale) / scale
+
+
+def blur(image, offsets, weights):
+    return convolve_reference(convolve_reference(image, offsets, weights, axis=1), offsets, weights, axis=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--radii', type=int, nargs='*', default=[2, 4, 8, 16, 31, 62])
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--subtexel-bits', type=int, default=0,
+                        help="quantize bilinear fractions to this many bits (0: exact)")
+    args = parser.parse_args()
+
+    image = create_test_texture(args.size, args.size).astype(np.float64) / 255.0
+    print(f"{args.size}x{args.size} test texture, two passes, values in [0, 1]")
+    print(f"{'radius':>8}{'taps':>8}{'fetches':>9}{'max diff':>12}{'8-bit steps':>13}{'reference s':>13}")
+    for radius in args.radii:
+        offsets, weights = gaussian_weights(radius)
+        start = time.perf_counter()
+        expected = blur(image, offsets, weights)
+        elapsed = time.perf_counter() - start
+
+        merged_offsets, merged_weights = merge_bilinear_taps(offsets, weights)
+        actual = blur(image, quantize_offsets(merged_offsets, args.subtexel_bits), merged_weights)
+        diff = np.abs(actual - expected).max()
+        print(f"{radius:>8}{len(weights):>8}{len(merged_weights):>9}{diff:>12.2e}{diff * 255:>13.3f}"
+              f"{elapsed:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# compute_filter.py
+# The filter pipeline's passes as GL 4.3 compute dispatches: each work group
+# stages a tile of one row or column plus its apron in shared memory
+# (shaders/convolve.comp), so every texel is fetched once per pass instead
+# of once per tap. Same interface as FilterPipeline.run.
+import os
+
+from OpenGL.GL import *
+
+import cpu_convolution
+from filter_pipeline import HORIZONTAL, TargetPool
+
+SHADER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shaders', 'convolve.comp')
+
+# Must match TILE_SIZE and MAX_RADIUS in shaders/convolve.comp
+TILE_SIZE = 256
+MAX_RADIUS = 63
+
+
+def compute_supported():
+    """Whether the current context has compute shaders (GL 4.3)"""
+    try:
+        version = (glGetIntegerv(GL_MAJOR_VERSION), glGetIntegerv(GL_MINOR_VERSION))
+    except GLError:
+        return False
+    return tuple(int(v) for v in version) >= (4, 3)
+
+
+def integer_taps(kernel):
+    """Weights on integer offsets -radius..radius equivalent to ``kernel``
+    (see cpu_convolution.integer_taps)"""
+    radius, weights = cpu_convolution.integer_taps(kernel.offsets, kernel.weights)
+    if radius > MAX_RADIUS:
+        raise ValueError(f"Compute filters support radii up to {MAX_RADIUS}, got {radius}")
+    return radius, weights
+
+
+def load_compute_program(path=SHADER_PATH):
+    with open(path, 'r') as f:
+        source = f.read()
+    shader = glCreateShader(GL_COMPUTE_SHADER)
+    glShaderSource(shader, source)
+    glCompileShader(shader)
+    if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+        raise RuntimeError(glGetShaderInfoLog(shader).decode())
+    program = glCreateProgram()
+    glAttachShader(program, shader)
+    glLinkProgram(program)
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+        raise RuntimeError(glGetProgramInfoLog(program).decode())
+    glDeleteShader(shader)
+    return program
+
+
+class ComputeFilter:
+    """Runs FilterPasses with the tiled compute shader"""
+
+    def __init__(self):
+        self.program = load_compute_program()
+        self.pool = TargetPool()
+        self.output = None
+        self.locations = {name: glGetUniformLocation(self.program, name)
+                          for name in ('inputTexture', 'direction', 'radius', 'weights', 'magnitude', 'clampOutput')}
+
+    def run(self, texture, width, height, passes):
+        """Filter ``texture`` (width x height) and return the result's RenderTarget.
+
+        The result stays valid until the next ``run``.
+        """
+        self.pool.release(self.output)
+        self.output = None
+        if not passes:
+            return None
+
+        glUseProgram(self.program)
+        loc = self.locations
+        glUniform1i(loc['inputTexture'], 0)
+        glActiveTexture(GL_TEXTURE0)
+
+        source = None
+        for i, filter_pass in enumerate(passes):
+            target = self.pool.acquire(width, height)
+            glBindTexture(GL_TEXTURE_2D, texture if source is None else source.texture)
+            glBindImageTexture(0, target.texture, 0, GL_FALSE, 0, GL_WRITE_ONLY, GL_RGBA16F)
+
+            radius, weights = integer_taps(filter_pass.kernel)
+            glUniform1i(loc['direction'], filter_pass.direction)
+            glUniform1i(loc['radius'], radius)
+            glUniform1fv(loc['weights'], len(weights), weights)
+            glUniform1i(loc['magnitude'], filter_pass.magnitude)
+            glUniform1i(loc['clampOutput'], i == len(passes) - 1)
+
+            # One work group per TILE_SIZE pixels of every row (or column)
+            if filter_pass.direction == HORIZONTAL:
+                glDispatchCompute((width + TILE_SIZE - 1) // TILE_SIZE, height, 1)
+            else:
+                glDispatchCompute((height + TILE_SIZE - 1) // TILE_SIZE, width, 1)
+            # The next pass (or the display) samples what this one wrote
+            glMemoryBarrier(GL_TEXTURE_FETCH_BARRIER_BIT)
+
+            self.pool.release(source)
+            source = target
+
+        self.output = source
+        return source
+
+    def delete(self):
+        self.pool.delete()
+        self.output = None
+        glDeleteProgram(self.program)
@@ -0,0 +1,256 @@
+# cpu_convolution.py
+# CPU versions of the Lab4 filters: the same kernels, clamp-to-edge
+# addressing and output clamping as the single-pass shader and the filter
+# pipeline, for checking GPU output offline and for machines without GL.
+#
+# Small kernels run as direct convolution, one multiply-add per tap over
+# shifted strided views; large ones as FFT convolution. Both work on strips
+# of rows (or columns) small enough to stay in cache.
+import numpy as np
+
+from kernels import gaussian_weights, merge_bilinear_taps
+
+BLUR_FILTER = 1
+EDGE_FILTER = 3
+
+# Kernels with at least this many taps use the FFT (measured crossover at
+# 4K; see benchmark_cpu_convolution.py)
+FFT_MIN_TAPS = 65
+
+# Working set of one strip
+STRIP_BYTES = 1 << 19
+
+
+def integer_taps(offsets, weights):
+    """Weights on integer offsets -radius..radius equivalent to a kernel whose
+    taps may sit at fractional (bilinear) offsets.
+
+    A fractional tap splits between its two neighbouring texels in
+    proportion to its position, exactly as a GL_LINEAR fetch does.
+    Returns (radius, float32 weights).
+    """
+    offsets = np.asarray(offsets, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    lower = np.floor(offsets).astype(np.int64)
+    fraction = offsets - lower
+    radius = int(max(-lower.min(), (lower + (fraction > 0)).max(), 0))
+    result = np.zeros(2 * radius + 1, dtype=np.float64)
+    np.add.at(result, lower + radius, weights * (1 - fraction))
+    np.add.at(result, np.minimum(lower + 1, radius) + radius, weights * fraction)
+    return radius, result.astype(np.float32)
+
+
+# Integer-tap kernels of what Lab4 shows for each filterType: sharpen and
+# edge detection are the 5-tap kernels of shaders/fragment.glsl, the blur
+# is main.BLUR_1D (Gaussian, sigma 1, 3 bilinear fetches) expanded back to
+# the texels those fetches blend
+FILTER_KERNELS = {
+    BLUR_FILTER: integer_taps(*merge_bilinear_taps(*gaussian_weights(2, sigma=1.0)))[1],
+    2: np.array([0.0, -1.0, 3.0, -1.0, 0.0], dtype=np.float32),      # sharpen
+    3: np.array([-1.0, -1.0, 4.0, -1.0, -1.0], dtype=np.float32),    # edge detection
+}
+
+
+def _as_float(image):
+    image = np.asarray(image)
+    if image.dtype == np.uint8:
+        return image.astype(np.float32) / 255.0
+    return image.astype(np.float32, copy=False)
+
+
+def _strip_size(line_bytes):
+    return max(1, STRIP_BYTES // max(line_bytes, 1))
+
+
+def _fast_length(n):
+    """Smallest 2^a * 3^b * 5^c >= n (sizes the FFT handles quickly)"""
+    best = 1 << int(np.ceil(np.log2(n)))
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            size = p35
+            while size < n:
+                size *= 2
+            best = min(best, size)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def _padded_strip(buffer, lines, radius):
+    """Copy ``lines`` (strip, n, c) into ``buffer`` with ``radius`` edge texels each side"""
+    n = lines.shape[1]
+    buffer[:, radius:radius + n] = lines
+    buffer[:, :radius] = lines[:, :1]
+    buffer[:, radius + n:] = lines[:, -1:]
+    return buffer
+
+
+def _accumulate(out, padded, weights, temp):
+    """out = sum of weights[k] * padded[k:k + n] over the nonzero taps"""
+    n = out.shape[0]
+    np.multiply(padded[0:n], weights[0], out=out)
+    for k in range(1, len(weights)):
+        if weights[k] != 0:
+            np.multiply(padded[k:k + n], weights[k], out=temp)
+            out += temp
+
+
+def convolve_direct(image, weights, axis):
+    """Sum of weights[k] * texel at offset k - radius along ``axis`` (clamped)"""
+    image = _as_float(image)
+    weights = np.asarray(weights, dtype=np.float32)
+    radius = len(weights) // 2
+    out = np.empty(image.shape, dtype=np.float32)
+    if axis == 0:
+        # Blocks of whole rows: every tap is a contiguous run of rows
+        height = image.shape[0]
+        block = _strip_size(image[0].nbytes)
+        buffer = np.empty((block + 2 * radius,) + image.shape[1:], dtype=np.float32)
+        temp = np.empty((block,) + image.shape[1:], dtype=np.float32)
+        for start in range(0, height, block):
+            stop = min(start + block, height)
+            if start >= radius and stop + radius <= height:
+                padded = image[start - radius:stop + radius]
+            else:
+                # Only blocks near the top or bottom edge need clamped copies
+                rows = np.clip(np.arange(start - radius, stop + radius), 0, height - 1)
+                padded = np.take(image, rows, axis=0, out=buffer[:len(rows)])
+            _accumulate(out[start:stop], padded, weights, temp[:stop - start])
+        return out
+    # Strips of rows, each padded along the row
+    lines = np.moveaxis(image, axis, 1)
+    result = np.moveaxis(out, axis, 1)
+    count, n = lines.shape[:2]
+    strip = _strip_size(lines[0].nbytes)
+    buffer = np.empty((strip, n + 2 * radius) + lines.shape[2:], dtype=np.float32)
+    temp = np.empty((strip,) + lines.shape[1:], dtype=np.float32)
+    for start in range(0, count, strip):
+        stop = min(start + strip, count)
+        padded = _padded_strip(buffer[:stop - start], lines[start:stop], radius)
+        _accumulate(result[start:stop].swapaxes(0, 1), padded.swapaxes(0, 1), weights,
+                    temp[:stop - start].swapaxes(0, 1))
+    return out
+
+
+def convolve_fft(image, weights, axis):
+    """Same result as ``convolve_direct``, through the FFT"""
+    image = _as_float(image)
+    weights = np.asarray(weights, dtype=np.float32)
+    radius = len(weights) // 2
+    lines = np.moveaxis(image, axis, 1)
+    count, n = lines.shape[:2]
+    size = _fast_length(n + 2 * radius)
+    # Correlation with the kernel = convolution with it reversed
+    spectrum = np.fft.rfft(weights[::-1], n=size).astype(np.complex64)
+    spectrum = spectrum.reshape((1, -1) + (1,) * (lines.ndim - 2))
+    out = np.empty(lines.shape, dtype=np.float32)
+    strip = _strip_size(lines[0].nbytes * 4)
+    buffer = np.empty((strip, n + 2 * radius) + lines.shape[2:], dtype=np.float32)
+    for start in range(0, count, strip):
+        stop = min(start + strip, count)
+        padded = _padded_strip(buffer[:stop - start], lines[start:stop], radius)
+        full = np.fft.irfft(np.fft.rfft(padded, n=size, axis=1) * spectrum, n=size, axis=1)
+        out[start:stop] = full[:, 2 * radius:2 * radius + n]
+    return np.moveaxis(out, 1, axis)
+
+
+def choose_method(taps):
+    return 'fft' if taps >= FFT_MIN_TAPS else 'direct'
+
+
+def convolve1d(image, weights, axis, method='auto'):
+    """1D convolution along ``axis`` with clamp-to-edge; ``method`` is
+    'direct', 'fft' or 'auto' (by kernel size)"""
+    if method == 'auto':
+        method = choose_method(len(weights))
+    if method == 'direct':
+        return convolve_direct(image, weights, axis)
+    if method == 'fft':
+        return convolve_fft(image, weights, axis)
+    raise ValueError(f"Unknown convolution method: {method}")
+
+
+def convolve_separable(image, weights_x, weights_y=None, method='auto'):
+    """Horizontal pass then vertical pass (same kernel by default)"""
+    weights_y = weights_x if weights_y is None else weights_y
+    return convolve1d(convolve1d(image, weights_x, 1, method), weights_y, 0, method)
+
+
+def _magnitude(image):
+    if image.ndim == 2:
+        return np.abs(image)
+    grey = np.sqrt((image[..., :3] ** 2).sum(axis=-1))
+    return np.repeat(grey[..., None], 3, axis=-1)
+
+
+def apply_filter(image, filter_type, direction=0, method='auto'):
+    """What Lab4 shows for ``filterType``/``direction``: the single-pass
+    shaders/fragment.glsl for sharpen and edge detection, the filter
+    pipeline's BLUR_1D pass for the blur.
+
+    ``image`` is a (height, width, 3) uint8 or [0, 1] float image with row 0
+    at the bottom, as uploaded. Returns float32 RGB in [0, 1].
+    """
+    image = _as_float(image)
+    if filter_type not in FILTER_KERNELS:
+        return np.clip(image, 0.0, 1.0)
+    result = convolve1d(image, FILTER_KERNELS[filter_type], 1 if direction == 0 else 0, method)
+    if filter_type == EDGE_FILTER:
+        result = _magnitude(result)
+    return np.clip(result, 0.0, 1.0)
+
+
+def run_passes(image, passes, method='auto'):
+    """What FilterPipeline.run / ComputeFilter.run produce for ``passes``.
+
+    Kernels with bilinear offsets are expanded to integer taps; only the
+    last pass clamps to [0, 1].
+    """
+    result = _as_float(image)
+    for filter_pass in passes:
+        _, weights = integer_taps(filter_pass.kernel.offsets, filter_pass.kernel.weights)
+        result = convolve1d(result, weights, 1 if filter_pass.direction == 0 else 0, method)
+        if filter_pass.magnitude:
+            result = _magnitude(result)
+    return np.clip(result, 0.0, 1.0)
+
+
+def to_unorm8(image):
+    """Float [0, 1] -> uint8, rounded like a normalized framebuffer write"""
+    return np.clip(np.rint(np.asarray(image) * 255.0), 0, 255).astype(np.uint8)
+
+
+def main():
+    """Filter an image (or the test texture) without OpenGL and save it"""
+    import argparse
+    from PIL import Image
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('input', nargs='?', help="image file (default: the Lab4 test texture)")
+    parser.add_argument('--filter', choices=['original', 'blur', 'sharpen', 'edge'], default='blur')
+    parser.add_argument('--direction', type=int, choices=[0, 1], default=0, help="0 horizontal, 1 vertical")
+    parser.add_argument('--radius', type=int, default=0,
+                        help="instead of --filter, a two-pass Gaussian blur of this radius")
+    parser.add_argument('--method', choices=['auto', 'direct', 'fft'], default='auto')
+    parser.add_argument('-o', '--output', default='filtered.png')
+    args = parser.parse_args()
+
+    if args.input:
+        image = np.asarray(Image.open(args.input).convert('RGB'))
+    else:
+        from main import create_test_texture
+        image = create_test_texture(512, 512)
+
+    if args.radius:
+        result = np.clip(convolve_separable(image, gaussian_weights(args.radius)[1], method=args.method), 0.0, 1.0)
+    else:
+        filter_type = ['original', 'blur', 'sharpen', 'edge'].index(args.filter)
+        result = apply_filter(image, filter_type, args.direction, args.method)
+    Image.fromarray(to_unorm8(result)).save(args.output)
+    print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
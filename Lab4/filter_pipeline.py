@@ -0,0 +1,174 @@
+# filter_pipeline.py
+# Multi-pass 1D convolution on the GPU. Each pass renders a full-screen quad
+# into an offscreen framebuffer texture and the next pass reads it, so a
+# separable 2D filter of radius r costs 2 * (2r + 1) fetches per pixel
+# instead of (2r + 1)^2, and filters can be chained freely.
+import numpy as np
+from OpenGL.GL import *
+
+# Must match MAX_TAPS in shaders/separable.glsl
+MAX_TAPS = 64
+
+HORIZONTAL = 0
+VERTICAL = 1
+
+
+class Kernel1D:
+    """Tap offsets (in texels) and weights of a 1D filter"""
+
+    def __init__(self, weights, offsets=None):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        if offsets is None:
+            # Centered integer taps
+            radius = (len(self.weights) - 1) / 2
+            offsets = np.arange(len(self.weights)) - radius
+        self.offsets = np.asarray(offsets, dtype=np.float32)
+
+    @property
+    def taps(self):
+        return len(self.weights)
+
+
+# The 5-tap kernels of shaders/fragment.glsl (blurs are Gaussians from kernels.py)
+SHARPEN = Kernel1D([0.0, -1.0, 3.0, -1.0, 0.0])
+EDGE = Kernel1D([-1.0, -1.0, 4.0, -1.0, -1.0])
+
+
+class FilterPass:
+    """One 1D convolution along ``direction``"""
+
+    def __init__(self, kernel, direction, magnitude=False):
+        self.kernel = kernel
+        self.direction = direction
+        self.magnitude = magnitude
+
+
+def separable(kernel_x, kernel_y=None):
+    """The two passes of a separable 2D filter (same kernel on both axes by default)"""
+    return [FilterPass(kernel_x, HORIZONTAL), FilterPass(kernel_y or kernel_x, VERTICAL)]
+
+
+class RenderTarget:
+    """Framebuffer with one RGBA16F color texture.
+
+    Float, so negative intermediate values from sharpening survive until
+    the last pass.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA16F, width, height, 0, GL_RGBA, GL_FLOAT, None)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+
+        self.fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.texture, 0)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Framebuffer incomplete: 0x{status:x}")
+
+    def delete(self):
+        glDeleteFramebuffers(1, [self.fbo])
+        glDeleteTextures(1, [self.texture])
+
+
+class TargetPool:
+    """Reuses render targets of the same size between passes and frames"""
+
+    def __init__(self):
+        self.free = []
+        self.all = []
+
+    def acquire(self, width, height):
+        for target in self.free:
+            if (target.width, target.height) == (width, height):
+                self.free.remove(target)
+                return target
+        target = RenderTarget(width, height)
+        self.all.append(target)
+        return target
+
+    def release(self, target):
+        if target is not None and target not in self.free:
+            self.free.append(target)
+
+    def delete(self):
+        for target in self.all:
+            target.delete()
+        self.all.clear()
+        self.free.clear()
+
+
+class FilterPipeline:
+    """Runs a list of FilterPasses over a texture, ping-ponging between pooled targets.
+
+    ``program`` is the shaders/separable.glsl program and ``vao`` a
+    full-screen quad drawn with ``index_count`` indices.
+    """
+
+    def __init__(self, program, vao, index_count):
+        self.program = program
+        self.vao = vao
+        self.index_count = index_count
+        self.pool = TargetPool()
+        self.output = None
+        self.locations = {name: glGetUniformLocation(program, name)
+                          for name in ('inputTexture', 'texelStep', 'tapCount', 'offsets', 'weights',
+                                       'magnitude', 'clampOutput')}
+
+    def run(self, texture, width, height, passes):
+        """Filter ``texture`` (width x height) and return the result's RenderTarget.
+
+        The result stays valid until the next ``run``. Only the last pass
+        clamps to [0, 1], like the single-pass shader.
+        """
+        for filter_pass in passes:
+            if filter_pass.kernel.taps > MAX_TAPS:
+                raise ValueError(f"A pass has at most {MAX_TAPS} taps, got {filter_pass.kernel.taps}")
+        self.pool.release(self.output)
+        self.output = None
+        if not passes:
+            return None
+
+        viewport = glGetIntegerv(GL_VIEWPORT)
+        glUseProgram(self.program)
+        loc = self.locations
+        glUniform1i(loc['inputTexture'], 0)
+        glActiveTexture(GL_TEXTURE0)
+        glBindVertexArray(self.vao)
+        glViewport(0, 0, width, height)
+
+        source = None
+        for i, filter_pass in enumerate(passes):
+            target = self.pool.acquire(width, height)
+            glBindFramebuffer(GL_FRAMEBUFFER, target.fbo)
+            glBindTexture(GL_TEXTURE_2D, texture if source is None else source.texture)
+
+            kernel = filter_pass.kernel
+            step = (1.0 / width, 0.0) if filter_pass.direction == HORIZONTAL else (0.0, 1.0 / height)
+            glUniform2f(loc['texelStep'], *step)
+            glUniform1i(loc['tapCount'], kernel.taps)
+            glUniform1fv(loc['offsets'], kernel.taps, kernel.offsets)
+            glUniform1fv(loc['weights'], kernel.taps, kernel.weights)
+            glUniform1i(loc['magnitude'], filter_pass.magnitude)
+            glUniform1i(loc['clampOutput'], i == len(passes) - 1)
+            glDrawElements(GL_TRIANGLES, self.index_count, GL_UNSIGNED_INT, None)
+
+            self.pool.release(source)
+            source = target
+
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glViewport(*viewport)
+        self.output = source
+        return source
+
+    def delete(self):
+        self.pool.delete()
+        self.output = None
@@ -0,0 +1,73 @@
+# kernels.py
+# Gaussian kernel generation for the separable blur. Adjacent taps are
+# merged into one bilinear fetch at a fractional offset: with GL_LINEAR the
+# hardware blends the two texels with exactly the weights we need, so a
+# radius-r pass takes r + 1 fetches (rounded up to odd) instead of 2r + 1.
+import numpy as np
+
+
+def gaussian_weights(radius, sigma=None):
+    """Normalized Gaussian weights on integer taps -radius..radius.
+
+    ``sigma`` defaults to radius / 3, so the kernel covers +-3 sigma.
+    Returns (offsets, weights) as float64 arrays.
+    """
+    if radius < 0:
+        raise ValueError(f"Radius must be non-negative, got {radius}")
+    sigma = sigma or max(radius / 3.0, 1e-3)
+    offsets = np.arange(-radius, radius + 1, dtype=np.float64)
+    weights = np.exp(-0.5 * (offsets / sigma) ** 2)
+    return offsets, weights / weights.sum()
+
+
+def merge_bilinear_taps(offsets, weights):
+    """Merge neighbouring integer taps of a symmetric kernel into bilinear fetches.
+
+    The center tap stays on its own; on each side, taps (1, 2), (3, 4), ...
+    become one fetch at the weighted mean offset with the summed weight. A
+    leftover outermost tap stays unpaired.
+    """
+    radius = len(weights) // 2
+    center = weights[radius]
+    side = weights[radius + 1:]
+    positions = offsets[radius + 1:]
+    merged_offsets, merged_weights = [], []
+    for i in range(0, len(side), 2):
+        w = side[i:i + 2]
+        merged_weights.append(w.sum())
+        merged_offsets.append((positions[i:i + 2] * w).sum() / w.sum() if w.sum() > 0 else positions[i])
+    merged_offsets = np.array(merged_offsets)
+    merged_weights = np.array(merged_weights)
+    return (np.concatenate([-merged_offsets[::-1], [0.0], merged_offsets]),
+            np.concatenate([merged_weights[::-1], [center], merged_weights]))
+
+
+def gaussian_kernel(radius, sigma=None, bilinear=True):
+    """Kernel1D of a normalized Gaussian, with merged bilinear taps by default"""
+    # filter_pipeline needs OpenGL; the NumPy helpers above are also used by
+    # cpu_convolution on machines without it
+    from filter_pipeline import Kernel1D
+    offsets, weights = gaussian_weights(radius, sigma)
+    if bilinear:
+        offsets, weights = merge_bilinear_taps(offsets, weights)
+    return Kernel1D(weights, offsets)
+
+
+def convolve_reference(image, offsets, weights, axis):
+    """CPU reference: sum of weight * texel at each offset along ``axis``.
+
+    Integer offsets read texels directly; fractional ones are linearly
+    interpolated between their two neighbours like a GL_LINEAR fetch.
+    Texel coordinates clamp to the edge (GL_CLAMP_TO_EDGE).
+    """
+    image = np.asarray(image, dtype=np.float64)
+    size = image.shape[axis]
+    index = np.arange(size)
+    result = np.zeros_like(image)
+    for offset, weight in zip(offsets, weights):
+        lower = np.floor(offset)
+        fraction = offset - lower
+        a = np.take(image, np.clip(index + int(lower), 0, size - 1), axis=axis)
+        b = np.take(image, np.clip(index + int(lower) + 1, 0, size - 1), axis=axis)
+        result += weight * ((1 - fraction) * a + fraction * b)
+    return result
@@ -3,6 +3,28 @@ from OpenGL.GL import *
 import numpy as np
 import ctypes
 
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.texture_compression import cached_compressed_chain, s3tc_supported
+from common.texture_streaming import TextureStreamer
+
+from compute_filter import ComputeFilter, compute_supported
+from filter_pipeline import EDGE, SHARPEN, FilterPass, FilterPipeline, separable
+from kernels import gaussian_kernel
+
+# Store the test texture BC1-compressed when the driver supports S3TC. Bump
+# TEST_TEXTURE_VERSION when create_test_texture changes its output.
+USE_COMPRESSION = True
+TEST_TEXTURE_VERSION = 1
+
+# Radius range of the two-pass Gaussian blur (keys 5 and 6, UP/DOWN). With
+# merged bilinear taps a radius-r pass takes r + 1 (rounded up to odd) fetches.
+MAX_BLUR_RADIUS = 62
+
+# The 1D blur (key 2): sigma 1 over +-2 texels, within 0.01 of the old
+# hard-coded 5-tap kernel, but 3 bilinear fetches
+BLUR_1D = gaussian_kernel(2, sigma=1.0)
+
 def load_shader(shader_file, shader_type):
     with open(shader_file, 'r') as f:
         shader_src = f.read()
@@ -27,37 +49,37 @@ def load_program(vs_path, fs_path):
     return program
 
 def create_test_texture(width, height):
-    data = np.zeros((height, width, 3), dtype=np.uint8)
-    
-    for y in range(height):
-        for x in range(width):
-            if x % 40 < 20:
-                data[y, x] = [255, 0, 0]
-            else:
-                data[y, x] = [0, 255, 255]
-            
-            if y % 60 < 30:
-                data[y, x] = data[y, x] // 2 + np.array([0, 0, 128], dtype=np.uint8)
-            
-            if (x + y) % 80 < 40:
-                data[y, x] = data[y, x] // 2 + np.array([128, 128, 0], dtype=np.uint8)
+    """Red/cyan stripes, tinted blue in horizontal bands and yellow along diagonals
     
-    return data
-
-def main():
-    if not glfw.init():
-        raise Exception("GLFW initialization failed")
+    Built from whole-array masks, one channel at a time; any size works.
+    """
+    data = np.empty((height, width, 3), dtype=np.uint8)
+    y, x = np.ogrid[:height, :width]
     
-    width, height = 1200, 600
-    window = glfw.create_window(width, height, "1D Convolution Filter Lab", None, None)
-    if not window:
-        glfw.terminate()
-        raise Exception("Window creation failed")
-    
-    glfw.make_context_current(window)
+    red_stripe = x % 40 < 20
+    blue_band = y % 60 < 30
+    diagonal = (x + y) % 80 < 40
     
-    program = load_program("shaders/vertex.glsl", "shaders/fragment.glsl")
+    for c, (red, cyan, band_tint, diagonal_tint) in enumerate(((255, 0, 0, 128),
+                                                                   (0, 255, 0, 128),
+                                                                   (0, 255, 128, 0))):
+        # Vertical stripes, then halve and tint where the masks apply
+        channel = np.where(red_stripe, np.uint8(red), np.uint8(cyan))
+        channel = np.where(blue_band, channel // 2 + np.uint8(band_tint), channel)
+        data[..., c] = np.where(diagonal, channel // 2 + np.uint8(diagonal_tint), channel)
     
+    return data
+
+def load_compressed_test_texture(width, height):
+    """BC1 blocks of the test texture, encoded once and kept in the disk cache"""
+    levels, quality = cached_compressed_chain(f'lab4:test_texture:{width}x{height}',
+                                              lambda: [create_test_texture(width, height)],
+                                              fmt='bc1', version=TEST_TEXTURE_VERSION)
+    print(f"Test texture: BC1 PSNR {quality[0]:.1f} dB")
+    return levels
+
+def create_fullscreen_quad():
+    """VAO of a quad covering the viewport; returns (vao, vbo, ebo, index_count)"""
     vertices = np.array([
         -1.0, -1.0,     0.0, 0.0,
          1.0, -1.0,     1.0, 0.0,
@@ -84,17 +106,48 @@ def main():
     glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, 16, ctypes.c_void_p(8))
     glEnableVertexAttribArray(1)
     
-    tex_width, tex_height = 512, 512
-    texture_data = create_test_texture(tex_width, tex_height)
+    return vao, vbo, ebo, len(indices)
+
+def main():
+    # Optional texture size: python main.py [width height]
+    tex_width, tex_height = (int(v) for v in sys.argv[1:3]) if len(sys.argv) >= 3 else (512, 512)
     
-    texture = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, texture)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, tex_width, tex_height, 0, 
-                 GL_RGB, GL_UNSIGNED_BYTE, texture_data)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+    if not glfw.init():
+        raise Exception("GLFW initialization failed")
+    
+    width, height = 1200, 600
+    window = glfw.create_window(width, height, "1D Convolution Filter Lab", None, None)
+    if not window:
+        glfw.terminate()
+        raise Exception("Window creation failed")
+    
+    glfw.make_context_current(window)
+    
+    program = load_program("shaders/vertex.glsl", "shaders/fragment.glsl")
+    separable_program = load_program("shaders/vertex.glsl", "shaders/separable.glsl")
+    
+    vao, vbo, ebo, index_count = create_fullscreen_quad()
+    
+    # The test texture is generated on a worker thread and uploaded through
+    # a PBO; a placeholder is shown until it arrives
+    compression = None
+    if USE_COMPRESSION:
+        if s3tc_supported():
+            compression = 'bc1'
+        else:
+            print("S3TC texture compression is not supported; using an uncompressed texture")
+    if compression:
+        generate = lambda: load_compressed_test_texture(tex_width, tex_height)
+    else:
+        generate = lambda: create_test_texture(tex_width, tex_height)
+    streamer = TextureStreamer(workers=1)
+    texture = streamer.load(generate, tex_width, tex_height, mipmaps=False, compression=compression,
+                            params={
+                                GL_TEXTURE_MIN_FILTER: GL_LINEAR,
+                                GL_TEXTURE_MAG_FILTER: GL_LINEAR,
+                                GL_TEXTURE_WRAP_S: GL_CLAMP_TO_EDGE,
+                                GL_TEXTURE_WRAP_T: GL_CLAMP_TO_EDGE,
+                            })
     
     glUseProgram(program)
     
@@ -108,15 +161,43 @@ def main():
     glUniform1f(width_loc, float(tex_width))
     glUniform1f(height_loc, float(tex_height))
     
+    # Multi-pass filters render into offscreen targets, then the result is
+    # shown with the "Original" path of the single-pass shader
+    pipeline = FilterPipeline(separable_program, vao, index_count)
+    
+    # Optional compute-shader path (key C): tiles in shared memory, GL 4.3
+    compute = ComputeFilter() if compute_supported() else None
+    use_compute = False
+    
     current_filter = 0
     current_direction = 0
+    blur_radius = 8
     
-    filter_names = ["Original", "Blur", "Sharpen", "Edge Detection"]
+    filter_names = ["Original", "Blur", "Sharpen", "Edge Detection", "2D Gaussian Blur", "2D Blur + Sharpen"]
     direction_names = ["Horizontal", "Vertical"]
     
+    def filter_passes():
+        """Passes of the current pipeline filter (None for the single-pass ones)"""
+        if current_filter == 1:
+            return [FilterPass(BLUR_1D, current_direction)]
+        if current_filter in (2, 3) and use_compute:
+            # Run by the single-pass shader on the fragment path
+            kernel = SHARPEN if current_filter == 2 else EDGE
+            return [FilterPass(kernel, current_direction, magnitude=current_filter == 3)]
+        if current_filter < 4:
+            return None
+        blur = separable(gaussian_kernel(blur_radius))
+        if current_filter == 4:
+            return blur
+        return blur + separable(SHARPEN)
+    
     def key_callback(window, key, scancode, action, mods):
-        nonlocal current_filter, current_direction
-        if action == glfw.PRESS:
+        nonlocal current_filter, current_direction, blur_radius, use_compute
+        if action in (glfw.PRESS, glfw.REPEAT) and key in (glfw.KEY_UP, glfw.KEY_DOWN):
+            step = 1 if key == glfw.KEY_UP else -1
+            blur_radius = min(max(blur_radius + step, 1), MAX_BLUR_RADIUS)
+            print(f"Blur radius: {blur_radius}")
+        elif action == glfw.PRESS:
             if key == glfw.KEY_1:
                 current_filter = 0
                 print(f"Filter: {filter_names[current_filter]}")
@@ -129,6 +210,15 @@ def main():
             elif key == glfw.KEY_4:
                 current_filter = 3
                 print(f"Filter: {filter_names[current_filter]} ({direction_names[current_direction]})")
+            elif key in (glfw.KEY_5, glfw.KEY_6):
+                current_filter = 4 if key == glfw.KEY_5 else 5
+                print(f"Filter: {filter_names[current_filter]} (radius {blur_radius})")
+            elif key == glfw.KEY_C:
+                if compute is None:
+                    print("Compute shaders need OpenGL 4.3; staying on the fragment path")
+                else:
+                    use_compute = not use_compute
+                    print(f"Path: {'compute (tiled, shared memory)' if use_compute else 'fragment'}")
             elif key == glfw.KEY_SPACE:
                 current_direction = 1 - current_direction
                 print(f"Direction: {direction_names[current_direction]}")
@@ -145,24 +235,43 @@ def main():
     print("  2 - Gaussian Blur")
     print("  3 - Sharpen")
     print("  4 - Edge Detection")
+    print("  5 - 2D Gaussian Blur (two passes)")
+    print("  6 - 2D Blur + Sharpen (four chained passes)")
+    print("  UP/DOWN - Blur radius")
+    print("  C - Toggle fragment/compute-shader path")
     print("  SPACE - Toggle direction (Horizontal/Vertical)")
     print("  ESC - Exit")
     print("\n" + "="*40)
     print(f"Current: {filter_names[current_filter]}")
     print("="*40 + "\n")
     
+    filtered_key = None
     while not glfw.window_should_close(window):
         glClearColor(0.0, 0.0, 0.0, 1.0)
         glClear(GL_COLOR_BUFFER_BIT)
         
-        glUniform1i(filter_loc, current_filter)
+        streamer.update()
+        
+        source = texture.texture
+        passes = filter_passes()
+        if passes is not None:
+            # Re-filter only when the input or the settings change
+            runner = compute if use_compute else pipeline
+            key = (current_filter, current_direction, blur_radius, use_compute, texture.texture)
+            if key != filtered_key:
+                runner.run(texture.texture, tex_width, tex_height, passes)
+                filtered_key = key
+            source = runner.output.texture
+        
+        glUseProgram(program)
+        glUniform1i(filter_loc, current_filter if passes is None else 0)
         glUniform1i(direction_loc, current_direction)
         
         glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, texture)
+        glBindTexture(GL_TEXTURE_2D, source)
         
         glBindVertexArray(vao)
-        glDrawElements(GL_TRIANGLES, len(indices), GL_UNSIGNED_INT, None)
+        glDrawElements(GL_TRIANGLES, index_count, GL_UNSIGNED_INT, None)
         
         glfw.swap_buffers(window)
         glfw.poll_events()
@@ -170,7 +279,12 @@ def main():
     glDeleteVertexArrays(1, [vao])
     glDeleteBuffers(1, [vbo])
     glDeleteBuffers(1, [ebo])
-    glDeleteTextures(1, [texture])
+    streamer.shutdown()
+    glDeleteTextures(1, [texture.real])
+    pipeline.delete()
+    if compute is not None:
+        compute.delete()
+    glDeleteProgram(separable_program)
     glDeleteProgram(program)
     glfw.terminate()
 
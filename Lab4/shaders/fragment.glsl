@@ -8,7 +8,8 @@ uniform float textureWidth;
 uniform float textureHeight;
 uniform int direction;
 
-const float blur[5] = float[](0.06, 0.24, 0.4, 0.24, 0.06);
+// The blur (filterType 1) runs through the filter pipeline (separable.glsl)
+
 const float sharpen[5] = float[](0.0, -1.0, 3.0, -1.0, 0.0);
 const float edge[5] = float[](-1.0, -1.0, 4.0, -1.0, -1.0);
 
@@ -37,9 +38,6 @@ void main()
     if (filterType == 0) {
         outColor = texture(inputTexture, fragTexCoord);
     }
-    else if (filterType == 1) {
-        outColor = applyConvolution1D(blur);
-    }
     else if (filterType == 2) {
         outColor = applyConvolution1D(sharpen);
     }
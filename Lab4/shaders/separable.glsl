@@ -0,0 +1,30 @@
+#version 330 core
+in vec2 fragTexCoord;
+out vec4 outColor;
+
+// Must match MAX_TAPS in filter_pipeline.py
+#define MAX_TAPS 64
+
+uniform sampler2D inputTexture;
+uniform vec2 texelStep;          // one texel along the pass direction
+uniform int tapCount;
+uniform float offsets[MAX_TAPS]; // tap positions in texels (may be fractional)
+uniform float weights[MAX_TAPS];
+uniform bool magnitude;          // output length(rgb) as grey, like edge detection
+uniform bool clampOutput;        // clamp to [0, 1]; off for intermediate passes
+
+void main()
+{
+    vec4 result = vec4(0.0);
+    for (int i = 0; i < tapCount; ++i) {
+        result += texture(inputTexture, fragTexCoord + offsets[i] * texelStep) * weights[i];
+    }
+
+    if (magnitude) {
+        result = vec4(vec3(length(result.rgb)), 1.0);
+    }
+    if (clampOutput) {
+        result = clamp(result, 0.0, 1.0);
+    }
+    outColor = result;
+}
@@ -0,0 +1,67 @@
+"""CPU cost of frustum culling against object count: BVH walk vs testing every object.
+
+Builds the Lab5 cube field for each object count, bounds every cube by its
+bounding sphere, and times, per frame, the BVH cull (common/bvh.py) next to
+a linear test of every object's box against the six frustum planes, from
+the starting camera. Both return the same objects; the BVH only descends
+into nodes that straddle the frustum's boundary, so its time grows far
+slower than the object count. Build and refit times are per call. No GL
+context is needed. Run from the Lab5 directory.
+
+Usage: python benchmark_culling.py [--counts 1000 10000 100000 1000000] [--frames 20]
+"""
+import argparse
+import time
+
+import numpy as np
+
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.bvh import BVH, classify_boxes, frustum_planes, sphere_bounds
+from common.matrix_stack import perspective
+
+from main import Camera, create_cube_vertices, create_objects
+
+
+def milliseconds(function, frames):
+    """Mean milliseconds per call of ``function()``, after one warm-up call"""
+    function()
+    start = time.perf_counter()
+    for _ in range(frames):
+        function()
+    return (time.perf_counter() - start) * 1000 / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counts', type=int, nargs='*', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--leaf-size', type=int, default=8)
+    args = parser.parse_args()
+
+    vertices, _ = create_cube_vertices()
+    radius = np.linalg.norm(vertices.reshape(-1, 9)[:, :3], axis=1).max()
+    planes = frustum_planes(perspective(45, 16 / 9, 0.1, 100.0) @ Camera().get_view_matrix())
+
+    print(f"{'objects':>8}{'visible':>9}{'nodes':>7}{'tested':>8}{'bvh ms':>9}{'linear ms':>11}"
+          f"{'speedup':>9}{'build ms':>10}{'refit ms':>10}")
+    for count in args.counts:
+        scene = create_objects(count)
+        mins, maxs = sphere_bounds(scene.positions, radius)
+        bvh = BVH(mins, maxs, args.leaf_size)
+
+        rows = bvh.cull(planes)
+        outside, _ = classify_boxes(mins, maxs, planes)
+        assert np.array_equal(np.sort(rows), np.flatnonzero(~outside)), "BVH and linear culling disagree"
+
+        culled = milliseconds(lambda: bvh.cull(planes), args.frames)
+        linear = milliseconds(lambda: np.flatnonzero(~classify_boxes(mins, maxs, planes)[0]), args.frames)
+        build = milliseconds(lambda: bvh.build(mins, maxs), max(1, args.frames // 5))
+        refit = milliseconds(lambda: bvh.refit(mins, maxs), max(1, args.frames // 5))
+        stats = bvh.stats
+        print(f"{count:>8}{stats['visible']:>9}{stats['visited']:>7}{stats['tested']:>8}{culled:>9.2f}"
+              f"{linear:>11.2f}{linear / culled:>8.1f}x{build:>10.2f}{refit:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Frame time against object count: per-object draws vs one instanced draw.
+
+Renders the Lab5 cube field in a hidden window for each object count, once
+with a model uniform and glDrawElements per cube and once with all model
+matrices in one buffer and a single glDrawElementsInstanced, and charts
+milliseconds per frame (wall clock, glFinish at the end of each frame).
+The "scene ns/object" column is the CPU cost of the batched SceneStore
+update and model matrices alone. Run from the Lab5 directory.
+
+Usage: python benchmark_instancing.py [--counts 10 100 1000 10000 100000] [--frames 30] [--max-per-object 20000]
+"""
+import argparse
+import math
+import time
+
+import pygame
+from OpenGL.GL import *
+
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.instancing import InstanceBuffer
+from common.matrix_stack import perspective
+from common.vertex_format import set_dequantization
+
+from main import (INSTANCE_LOCATION, Camera, create_cube_vertices, create_objects, create_shader_program,
+                  draw_instanced, draw_per_object, set_camera_uniforms, setup_vertex_buffer)
+
+BAR_WIDTH = 40
+
+
+def frame_milliseconds(draw, shader, camera, projection, frames):
+    """Mean milliseconds per frame of ``draw()``, after one warm-up frame"""
+    shader.use()
+    for frame in range(frames + 1):
+        if frame == 1:
+            start = time.perf_counter()
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        set_camera_uniforms(shader, camera.get_view_matrix(), projection)
+        draw()
+        glFinish()
+    return (time.perf_counter() - start) * 1000 / frames
+
+
+def scene_nanoseconds(scene, frames):
+    """Mean nanoseconds per object of one scene update plus model matrices"""
+    start = time.perf_counter()
+    for _ in range(frames):
+        scene.update()
+        scene.model_matrices()
+    return (time.perf_counter() - start) * 1e9 / frames / max(len(scene), 1)
+
+
+def bar(ms, slowest):
+    """Log-scale bar: 0.1 ms is empty, ``slowest`` is full width"""
+    span = math.log10(slowest / 0.1) or 1.0
+    return '#' * max(1, round(BAR_WIDTH * math.log10(max(ms, 0.1) / 0.1) / span))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counts', type=int, nargs='*', default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--max-per-object', type=int, default=20000,
+                        help="skip the per-object path above this count (it takes seconds per frame)")
+    parser.add_argument('--size', type=int, nargs=2, default=[1280, 720])
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode(args.size, pygame.OPENGL | pygame.DOUBLEBUF | pygame.HIDDEN)
+    glEnable(GL_DEPTH_TEST)
+    glEnable(GL_POLYGON_OFFSET_FILL)
+    projection = perspective(45, args.size[0] / args.size[1], 0.1, 100.0)
+
+    shader = create_shader_program()
+    instanced_shader = create_shader_program('shaders/vertex_instanced.glsl')
+    vertices, indices = create_cube_vertices()
+    vao, index_count, dequant = setup_vertex_buffer(vertices, indices)
+    glBindVertexArray(vao)
+    instances = InstanceBuffer(INSTANCE_LOCATION, max(args.counts))
+    for program in (shader, instanced_shader):
+        program.use()
+        set_dequantization(program, dequant)
+    camera = Camera()
+    print(glGetString(GL_RENDERER).decode())
+
+    rows = []
+    for count in args.counts:
+        scene = create_objects(count)
+        scene.update(10)
+        per_object = None
+        if count <= args.max_per_object:
+            per_object = frame_milliseconds(lambda: draw_per_object(shader, index_count, scene),
+                                            shader, camera, projection, args.frames)
+        instanced = frame_milliseconds(lambda: draw_instanced(instances, index_count, scene),
+                                       instanced_shader, camera, projection, args.frames)
+        rows.append((count, per_object, instanced, scene_nanoseconds(scene, args.frames)))
+
+    print(f"{'objects':>8}{'per-object ms':>15}{'instanced ms':>14}{'speedup':>9}{'scene ns/object':>17}")
+    for count, per_object, instanced, scene_ns in rows:
+        cells = f"{'-':>15}{instanced:>14.2f}{'':>9}" if per_object is None else \
+            f"{per_object:>15.2f}{instanced:>14.2f}{per_object / instanced:>8.1f}x"
+        print(f"{count:>8}{cells}{scene_ns:>17.0f}")
+
+    slowest = max(ms for row in rows for ms in row[1:3] if ms is not None)
+    print(f"\nms per frame, log scale (0.1 .. {slowest:.0f} ms)")
+    for count, per_object, instanced, _ in rows:
+        if per_object is not None:
+            print(f"{count:>8} per-object {bar(per_object, slowest)} {per_object:.2f}")
+        print(f"{count:>8} instanced  {bar(instanced, slowest)} {instanced:.2f}")
+
+    instances.delete()
+    glDeleteVertexArrays(1, [vao])
+    shader.delete()
+    instanced_shader.delete()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
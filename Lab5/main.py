@@ -1,10 +1,38 @@
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
-from OpenGL.GLU import *
 import numpy as np
 import math
 
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.bvh import BVH, frustum_planes, sphere_bounds
+from common.instancing import InstanceBuffer
+from common.matrix_stack import look_at, perspective
+from common.scene import SceneStore
+from common.shader import Program
+from common.vertex_format import Attribute, VertexLayout, create_vertex_buffer, set_dequantization
+
+# 16 bytes per vertex instead of 9 floats (36 bytes)
+VERTEX_LAYOUT = VertexLayout([
+    Attribute('position', 0, 3, 'snorm16'),
+    Attribute('normal', 1, 3, 'int_2_10_10_10_rev'),
+    Attribute('color', 2, 3, 'unorm8'),
+])
+
+# The instanced shader's per-instance model matrix takes locations 3-6
+INSTANCE_LOCATION = 3
+
+# The hand-placed cubes: position and rotation axis. Larger scenes add a
+# random field of cubes behind them.
+OBJECTS = [
+    ((0.0, 0.0, 0.0), (1, 1, 0)),
+    ((2.0, 0.5, -1.0), (0, 1, 1)),
+    ((-2.0, -0.5, -1.5), (1, 0, 1)),
+    ((0.0, 2.0, -2.0), (1, 1, 1)),
+    ((1.5, -1.5, -0.5), (0, 1, 0)),
+]
+
 class Camera:
     def __init__(self):
         self.position = np.array([0.0, 0.0, 5.0])
@@ -12,6 +40,7 @@ class Camera:
         self.pitch = 0.0
         self.speed = 0.05
         self.sensitivity = 0.1
+        self.view = np.identity(4, dtype=np.float32)
         
     def get_view_matrix(self):
         front = np.array([
@@ -24,10 +53,7 @@ class Camera:
         target = self.position + front
         up = np.array([0.0, 1.0, 0.0])
         
-        glLoadIdentity()
-        gluLookAt(self.position[0], self.position[1], self.position[2],
-                  target[0], target[1], target[2],
-                  up[0], up[1], up[2])
+        return look_at(self.position, target, up, out=self.view)
     
     def process_keyboard(self, keys):
         front = np.array([
@@ -79,8 +105,8 @@ def load_shader(shader_file, shader_type):
     
     return shader
 
-def create_shader_program():
-    vertex_shader = load_shader('shaders/vertex.glsl', GL_VERTEX_SHADER)
+def create_shader_program(vertex_path='shaders/vertex.glsl'):
+    vertex_shader = load_shader(vertex_path, GL_VERTEX_SHADER)
     fragment_shader = load_shader('shaders/fragment.glsl', GL_FRAGMENT_SHADER)
     
     program = glCreateProgram()
@@ -96,7 +122,7 @@ def create_shader_program():
     glDeleteShader(vertex_shader)
     glDeleteShader(fragment_shader)
     
-    return program
+    return Program(program)
 
 def create_cube_vertices():
     # Shared vertex buffer for cube with positions, normals, and colors
@@ -154,37 +180,80 @@ def setup_vertex_buffer(vertices, indices):
     vao = glGenVertexArrays(1)
     glBindVertexArray(vao)
     
-    vbo = glGenBuffers(1)
-    glBindBuffer(GL_ARRAY_BUFFER, vbo)
-    glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+    # Quantize the float vertices into the compact layout; the attribute
+    # pointers come from the layout description
+    vertices = vertices.reshape(-1, 9)
+    data, dequant = VERTEX_LAYOUT.pack(position=vertices[:, 0:3], normal=vertices[:, 3:6], color=vertices[:, 6:9])
+    create_vertex_buffer(VERTEX_LAYOUT, data)
     
     ebo = glGenBuffers(1)
     glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ebo)
     glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
     
-    stride = 9 * vertices.itemsize
-    
-    # Position attribute
-    glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
-    glEnableVertexAttribArray(0)
-    
-    # Normal attribute
-    glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(3 * vertices.itemsize))
-    glEnableVertexAttribArray(1)
-    
-    # Color attribute
-    glVertexAttribPointer(2, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(6 * vertices.itemsize))
-    glEnableVertexAttribArray(2)
-    
     glBindVertexArray(0)
     
-    return vao, len(indices)
+    return vao, len(indices), dequant
+
+def create_objects(count, seed=0):
+    """A SceneStore of ``count`` spinning cubes (angular velocities in degrees per frame)"""
+    positions = np.zeros((count, 3), dtype=np.float32)
+    axes = np.zeros((count, 3), dtype=np.float32)
+    placed = min(count, len(OBJECTS))
+    for i in range(placed):
+        positions[i], axes[i] = OBJECTS[i]
+    if count > placed:
+        # About one cube per 2x2x2 units, in front of the starting camera
+        rng = np.random.default_rng(seed)
+        extra = count - placed
+        half = extra ** (1 / 3)
+        positions[placed:] = rng.uniform(-half, half, (extra, 3))
+        positions[placed:, 2] -= half + 3.0
+        axes[placed:] = rng.uniform(0.1, 1.0, (extra, 3)) * rng.choice([-1, 1], (extra, 3))
+    speeds = 0.5 + np.arange(count) % 20 * 0.1
+    scene = SceneStore(count)
+    scene.add_many(positions, axes, angular_velocities=speeds)
+    return scene
+
+def draw_per_object(shader, index_count, scene, rows=None):
+    """One glDrawElements and model uniform per cube (of ``rows``, or all)"""
+    rows = np.arange(len(scene)) if rows is None else rows
+    # Every model matrix in one batch (column-major, hence transpose=False)
+    models = scene.model_matrices(rows)
+    for i, row in enumerate(rows):
+        # Apply polygon offset to reduce z-fighting
+        offset = row % len(OBJECTS) * 0.001
+        glPolygonOffset(offset, offset)
+        
+        # The view is a separate uniform
+        shader.set('model', models[i], transpose=False)
+        
+        # Draw
+        glDrawElements(GL_TRIANGLES, index_count, GL_UNSIGNED_INT, None)
+
+def draw_instanced(instances, index_count, scene, rows=None):
+    """All cubes (of ``rows``, or all) in one glDrawElementsInstanced: the
+    model matrices are computed together and uploaded with one glBufferSubData"""
+    count = len(scene) if rows is None else len(rows)
+    glPolygonOffset(0.0, 0.0)
+    scene.model_matrices(rows, out=instances.matrices[:count])
+    instances.upload(count)
+    instances.draw(GL_TRIANGLES, index_count, count)
+
+def set_camera_uniforms(shader, view, projection):
+    """Upload the view and the projection to ``shader`` (in use); the
+    projection is only sent when it changes"""
+    shader.set('view', view)
+    shader.set('projection', projection)
 
 def main():
+    # Optional object count: python main.py 100000
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else len(OBJECTS)
+    
     pygame.init()
     display = (1280, 720)
     pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
-    pygame.display.set_caption("Lab4 - Multiple Objects with Camera Control")
+    caption = "Lab4 - Multiple Objects with Camera Control"
+    pygame.display.set_caption(caption)
     pygame.mouse.set_visible(False)
     pygame.event.set_grab(True)
     
@@ -193,33 +262,45 @@ def main():
     glDepthFunc(GL_LEQUAL)  # Use LEQUAL to handle equal depth values better
     glEnable(GL_POLYGON_OFFSET_FILL)  # Enable polygon offset to reduce z-fighting
     
-    # Set up projection
-    glMatrixMode(GL_PROJECTION)
-    gluPerspective(45, (display[0] / display[1]), 0.1, 100.0)
-    glMatrixMode(GL_MODELVIEW)
+    # Set up projection; matrices are built on the CPU, nothing is read back
+    projection = perspective(45, (display[0] / display[1]), 0.1, 100.0)
     
-    # Create shader program
+    # Create shader programs: one model uniform per draw, or one model
+    # matrix per instance
     shader = create_shader_program()
+    instanced_shader = create_shader_program('shaders/vertex_instanced.glsl')
     
     # Create shared vertex buffer
     vertices, indices = create_cube_vertices()
-    vao, index_count = setup_vertex_buffer(vertices, indices)
+    vao, index_count, dequant = setup_vertex_buffer(vertices, indices)
+    
+    # Per-instance matrices live in the same VAO
+    glBindVertexArray(vao)
+    instances = InstanceBuffer(INSTANCE_LOCATION, count)
+    glBindVertexArray(0)
+    
+    # Position dequantization is the same for every object
+    for program in (shader, instanced_shader):
+        program.use()
+        set_dequantization(program, dequant)
     
     # Create camera
     camera = Camera()
     
-    # Object positions
-    objects = [
-        {'pos': (0.0, 0.0, 0.0), 'rotation': 0.0, 'axis': (1, 1, 0), 'offset': 0.0},
-        {'pos': (2.0, 0.5, -1.0), 'rotation': 0.0, 'axis': (0, 1, 1), 'offset': 0.001},
-        {'pos': (-2.0, -0.5, -1.5), 'rotation': 0.0, 'axis': (1, 0, 1), 'offset': 0.002},
-        {'pos': (0.0, 2.0, -2.0), 'rotation': 0.0, 'axis': (1, 1, 1), 'offset': 0.003},
-        {'pos': (1.5, -1.5, -0.5), 'rotation': 0.0, 'axis': (0, 1, 0), 'offset': 0.004},
-    ]
+    # Object positions, rotation axes, angles and speeds in one column store
+    scene = create_objects(count)
+    instanced = count > len(OBJECTS)
+    
+    # Frustum culling: a BVH over the cubes' bounds. The bounding sphere
+    # covers every rotation and the cubes never move, so it is built once.
+    radius = np.linalg.norm(vertices.reshape(-1, 9)[:, :3], axis=1).max()
+    bvh = BVH(*sphere_bounds(scene.positions, radius))
+    culling = True
     
     clock = pygame.time.Clock()
     last_x, last_y = display[0] // 2, display[1] // 2
     first_mouse = True
+    caption_time = 0
     
     running = True
     while running:
@@ -229,6 +310,10 @@ def main():
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
+                elif event.key == pygame.K_i:
+                    instanced = not instanced
+                elif event.key == pygame.K_f:
+                    culling = not culling
         
         # Mouse input
         mouse_x, mouse_y = pygame.mouse.get_pos()
@@ -250,57 +335,46 @@ def main():
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         glClearColor(0.1, 0.1, 0.15, 1.0)
         
-        # Use shader
-        glUseProgram(shader)
-        
-        # Set view matrix
-        glMatrixMode(GL_MODELVIEW)
-        glLoadIdentity()
-        camera.get_view_matrix()
+        # Use shader and set view and projection
+        program = instanced_shader if instanced else shader
+        program.use()
+        view = camera.get_view_matrix()
+        set_camera_uniforms(program, view, projection)
         
-        # Get matrices for shader
-        modelview = glGetFloatv(GL_MODELVIEW_MATRIX)
-        projection = glGetFloatv(GL_PROJECTION_MATRIX)
-        
-        model_loc = glGetUniformLocation(shader, "model")
-        view_loc = glGetUniformLocation(shader, "view")
-        proj_loc = glGetUniformLocation(shader, "projection")
-        
-        glUniformMatrix4fv(view_loc, 1, GL_FALSE, modelview)
-        glUniformMatrix4fv(proj_loc, 1, GL_FALSE, projection)
+        # Only the cubes whose bounds intersect the view frustum
+        rows = bvh.cull(frustum_planes(projection @ view)) if culling else None
         
         # Bind shared vertex array
         glBindVertexArray(vao)
         
         # Draw multiple objects using shared vertex buffer
-        for i, obj in enumerate(objects):
-            # Apply polygon offset to reduce z-fighting
-            glPolygonOffset(obj['offset'], obj['offset'])
-            
-            glPushMatrix()
-            
-            # Transform for this object
-            glTranslatef(*obj['pos'])
-            glRotatef(obj['rotation'], *obj['axis'])
-            
-            # Get model matrix and send to shader
-            model = glGetFloatv(GL_MODELVIEW_MATRIX)
-            glUniformMatrix4fv(model_loc, 1, GL_FALSE, model)
-            
-            # Draw
-            glDrawElements(GL_TRIANGLES, index_count, GL_UNSIGNED_INT, None)
-            
-            glPopMatrix()
-            
-            # Update rotation
-            obj['rotation'] += 0.5 + i * 0.1
+        if instanced:
+            draw_instanced(instances, index_count, scene, rows)
+        else:
+            draw_per_object(program, index_count, scene, rows)
+        
+        # Update every rotation at once
+        scene.update()
         
         pygame.display.flip()
         clock.tick(60)
+        now = pygame.time.get_ticks()
+        if now - caption_time >= 500:
+            caption_time = now
+            mode = "instanced" if instanced else "per-object"
+            if culling:
+                stats = bvh.stats
+                culled = f"{stats['visible']} drawn, {stats['culled']} culled, {stats['visited']} nodes visited"
+            else:
+                culled = "culling off"
+            pygame.display.set_caption(f"{caption} - {count} cubes, {mode} (I), {culled} (F), "
+                                       f"{clock.get_fps():.0f} FPS")
     
     # Cleanup
+    instances.delete()
     glDeleteVertexArrays(1, [vao])
-    glDeleteProgram(shader)
+    shader.delete()
+    instanced_shader.delete()
     pygame.quit()
 
 if __name__ == "__main__":
@@ -12,11 +12,16 @@ uniform mat4 model;
 uniform mat4 view;
 uniform mat4 projection;
 
+// Positions are stored as int16 relative to the mesh bounding box
+uniform vec3 positionScale;
+uniform vec3 positionOffset;
+
 void main()
 {
-    FragPos = vec3(model * vec4(aPos, 1.0));
+    vec3 position = aPos * positionScale + positionOffset;
+    FragPos = vec3(model * vec4(position, 1.0));
     Normal = mat3(transpose(inverse(model))) * aNormal;
     Color = aColor;
     
-    gl_Position = projection * view * model * vec4(aPos, 1.0);
+    gl_Position = projection * view * model * vec4(position, 1.0);
 }
\ No newline at end of file
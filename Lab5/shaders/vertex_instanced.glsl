@@ -0,0 +1,31 @@
+#version 330 core
+
+layout (location = 0) in vec3 aPos;
+layout (location = 1) in vec3 aNormal;
+layout (location = 2) in vec3 aColor;
+// Per-instance model matrix (locations 3-6, one column each, divisor 1)
+layout (location = 3) in mat4 instanceModel;
+
+out vec3 FragPos;
+out vec3 Normal;
+out vec3 Color;
+
+uniform mat4 view;
+uniform mat4 projection;
+
+// Positions are stored as int16 relative to the mesh bounding box
+uniform vec3 positionScale;
+uniform vec3 positionOffset;
+
+void main()
+{
+    vec3 position = aPos * positionScale + positionOffset;
+    vec4 worldPos = instanceModel * vec4(position, 1.0);
+    FragPos = vec3(worldPos);
+    // Instances are only rotated and translated, so the model matrix itself
+    // transforms normals (no per-vertex inverse)
+    Normal = mat3(instanceModel) * aNormal;
+    Color = aColor;
+    
+    gl_Position = projection * view * worldPos;
+}
@@ -0,0 +1,122 @@
+"""Frame time and texture memory: sampled textures vs analytic patterns.
+
+Renders the Lab6 scene (three cubes and the ground plane) in a hidden
+window, once with every object sampling its mipmapped texture and once with
+every object evaluating its pattern in the fragment shader. GPU time per
+frame comes from GL_TIME_ELAPSED queries. Run from the Lab6 directory.
+
+Usage: python benchmark_procedural.py [--frames 300] [--passes 4] [--size 1920 1080]
+"""
+import argparse
+import time
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.matrix_stack import look_at, perspective, translation
+from common.mipmap import stack_mip_chains, upload_mip_chain
+
+from main import (PATTERNS, TEXTURE_SIZE, create_cube_vertices, create_plane_vertices, create_shader_program,
+                  load_texture_levels, setup_vertex_buffer, texture_params)
+
+
+def upload_texture_array(patterns):
+    """The sampled path's textures; returns (texture, layers, bytes, seconds)"""
+    start = time.perf_counter()
+    levels = stack_mip_chains([load_texture_levels(pattern) for pattern in patterns])
+    texture = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D_ARRAY, texture)
+    upload_mip_chain(levels, GL_TEXTURE_2D_ARRAY)
+    for name, value in texture_params(True).items():
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, name, value)
+    glFinish()
+    seconds = time.perf_counter() - start
+    return texture, {pattern: layer for layer, pattern in enumerate(patterns)}, sum(l.nbytes for l in levels), seconds
+
+
+def render(shader, objects, layers, procedural, frames, passes):
+    """Mean GPU and CPU milliseconds per frame"""
+    shader.use()
+    query = glGenQueries(1)[0]
+    elapsed = np.zeros(1, dtype=np.uint64)
+    gpu = []
+    glFinish()
+    start = time.perf_counter()
+    for _ in range(frames):
+        glBeginQuery(GL_TIME_ELAPSED, query)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        # Redraw the scene to put more shaded fragments behind each frame
+        for _ in range(passes):
+            for obj in objects:
+                shader.set('model', obj['model'])
+                shader.set('proceduralPattern', PATTERNS.index(obj['texture']) if procedural else -1)
+                glVertexAttrib1f(3, layers[obj['texture']])
+                glBindVertexArray(obj['vao'])
+                glDrawElements(GL_TRIANGLES, obj['indices'], GL_UNSIGNED_INT, None)
+        glEndQuery(GL_TIME_ELAPSED)
+        glGetQueryObjectui64v(query, GL_QUERY_RESULT, elapsed)
+        gpu.append(int(elapsed[0]))
+        pygame.display.flip()
+    cpu = (time.perf_counter() - start) / frames
+    glDeleteQueries(1, [query])
+    return np.mean(gpu) / 1e6, cpu * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--passes', type=int, default=4, help="scene redraws per frame")
+    parser.add_argument('--size', type=int, nargs=2, default=[1920, 1080], metavar=('WIDTH', 'HEIGHT'))
+    args = parser.parse_args()
+
+    pygame.init()
+    width, height = args.size
+    pygame.display.set_mode((width, height), pygame.DOUBLEBUF | pygame.OPENGL | pygame.HIDDEN)
+    glViewport(0, 0, width, height)
+    glEnable(GL_DEPTH_TEST)
+    glDepthFunc(GL_LEQUAL)
+    glClearColor(0.2, 0.3, 0.4, 1.0)
+
+    shader = create_shader_program('shaders/fragment_array.glsl')
+    shader.use()
+    shader.set('view', look_at((0.0, 2.0, 8.0), (0.0, 0.0, 0.0)))
+    shader.set('projection', perspective(45, width / height, 0.1, 100.0))
+    shader.set('textureSampler', 0)
+
+    objects = []
+    for tex_scale, pos, pattern in ((1.0, (-3.0, 1.0, 0.0), 'checkerboard'),
+                                    (2.0, (0.0, 1.0, 0.0), 'brick'),
+                                    (4.0, (3.0, 1.0, 0.0), 'grid')):
+        vao, count = setup_vertex_buffer(*create_cube_vertices(tex_scale))
+        objects.append({'vao': vao, 'indices': count, 'model': translation(*pos), 'texture': pattern})
+    vao, count = setup_vertex_buffer(*create_plane_vertices(size=10.0, tex_scale=10.0))
+    objects.append({'vao': vao, 'indices': count, 'model': translation(0.0, 0.0, 0.0), 'texture': 'dots'})
+
+    texture, layers, nbytes, upload_seconds = upload_texture_array(PATTERNS)
+    glActiveTexture(GL_TEXTURE0)
+    glBindTexture(GL_TEXTURE_2D_ARRAY, texture)
+
+    print(f"{width}x{height}, {args.passes} scene passes per frame, {args.frames} frames")
+    print(f"{'mode':<12}{'GPU ms':>10}{'frame ms':>10}{'texture MB':>12}{'load ms':>10}")
+    for procedural in (False, True):
+        # Warm up (shader compilation, first use of the texture)
+        render(shader, objects, layers, procedural, 10, args.passes)
+        gpu_ms, cpu_ms = render(shader, objects, layers, procedural, args.frames, args.passes)
+        if procedural:
+            mode, memory, load = 'procedural', 0.0, 0.0
+        else:
+            mode, memory, load = 'sampled', nbytes / 2**20, upload_seconds * 1e3
+        print(f"{mode:<12}{gpu_ms:>10.3f}{cpu_ms:>10.3f}{memory:>12.2f}{load:>10.1f}")
+    print(f"(texture memory as uploaded: {len(PATTERNS)} layers of {TEXTURE_SIZE}x{TEXTURE_SIZE} RGB "
+          "with mipmaps; drivers may pad RGB to RGBA)")
+
+    glDeleteTextures(1, [texture])
+    shader.delete()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
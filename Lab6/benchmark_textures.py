@@ -0,0 +1,101 @@
+"""Compare the per-pixel procedural texture generator with the NumPy one.
+
+Usage: python benchmark_textures.py [--sizes 512 2048 8192] [--legacy-size 512]
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from main import generate_procedural_texture
+
+PATTERNS = ('checkerboard', 'brick', 'grid', 'dots')
+
+
+def legacy_generate_procedural_texture(width, height, pattern='checkerboard'):
+    """The original per-pixel generator, kept here as the baseline"""
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    
+    if pattern == 'checkerboard':
+        for i in range(height):
+            for j in range(width):
+                if (i // 32 + j // 32) % 2 == 0:
+                    image[i, j] = [255, 255, 255]
+                else:
+                    image[i, j] = [50, 50, 50]
+    
+    elif pattern == 'brick':
+        brick_height = 32
+        brick_width = 64
+        mortar = 4
+        
+        for i in range(height):
+            for j in range(width):
+                row = i // brick_height
+                offset = (row % 2) * (brick_width // 2)
+                col = (j + offset) % (brick_width + mortar)
+                
+                if i % brick_height < mortar or col < mortar:
+                    image[i, j] = [200, 200, 200]  # Mortar
+                else:
+                    # Brick color with variation
+                    variation = (i % brick_height + j % brick_width) % 30
+                    image[i, j] = [180 + variation, 80 + variation // 2, 50]
+    
+    elif pattern == 'grid':
+        grid_size = 64
+        line_width = 4
+        
+        for i in range(height):
+            for j in range(width):
+                if i % grid_size < line_width or j % grid_size < line_width:
+                    image[i, j] = [0, 255, 255]  # Cyan lines
+                else:
+                    image[i, j] = [30, 30, 50]  # Dark background
+    
+    elif pattern == 'dots':
+        for i in range(height):
+            for j in range(width):
+                x = j % 64 - 32
+                y = i % 64 - 32
+                dist = math.sqrt(x*x + y*y)
+                if dist < 20:
+                    image[i, j] = [255, 100, 200]  # Pink dots
+                else:
+                    image[i, j] = [240, 240, 255]  # Light background
+    
+    return image
+
+
+def timed(generator, size, pattern):
+    start = time.perf_counter()
+    image = generator(size, size, pattern)
+    return image, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[512, 2048, 8192],
+                        help="resolutions for the vectorized generator")
+    parser.add_argument('--legacy-size', type=int, default=512,
+                        help="resolution for the comparison with the per-pixel generator")
+    args = parser.parse_args()
+
+    size = args.legacy_size
+    print(f"{size}x{size}")
+    print(f"{'pattern':<14}{'legacy (s)':>12}{'numpy (s)':>12}{'speedup':>10}{'identical':>12}")
+    for pattern in PATTERNS:
+        old, old_t = timed(legacy_generate_procedural_texture, size, pattern)
+        new, new_t = timed(generate_procedural_texture, size, pattern)
+        same = np.array_equal(old, new)
+        print(f"{pattern:<14}{old_t:>12.3f}{new_t:>12.4f}{old_t / new_t:>9.0f}x{str(same):>12}")
+
+    print(f"\n{'size':<14}" + ''.join(f"{pattern:>14}" for pattern in PATTERNS))
+    for size in args.sizes:
+        times = [timed(generate_procedural_texture, size, pattern)[1] for pattern in PATTERNS]
+        print(f"{f'{size}x{size}':<14}" + ''.join(f"{t:>13.3f}s" for t in times))
+
+
+if __name__ == "__main__":
+    main()
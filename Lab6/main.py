@@ -1,11 +1,35 @@
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
-from OpenGL.GLU import *
 import numpy as np
 import math
 from PIL import Image
 
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.bvh import BVH, frustum_planes, sphere_bounds
+from common.matrix_stack import MatrixStack, look_at, perspective
+from common.mipmap import cached_mip_chain
+from common.scene import SceneStore
+from common.shader import Program
+from common.texture_compression import cached_compressed_chain, s3tc_supported
+from common.texture_streaming import TextureStreamer
+from common.text import GlyphAtlas, TextLabel
+
+# Bump when generate_procedural_texture changes its output, so cached
+# texture chains are rebuilt
+TEXTURE_VERSION = 1
+TEXTURE_SIZE = 512
+PATTERNS = ('checkerboard', 'brick', 'grid', 'dots')
+
+# Keep every pattern in one GL_TEXTURE_2D_ARRAY and pick the layer per object,
+# instead of one texture object per pattern that is rebound for every draw
+USE_TEXTURE_ARRAY = True
+
+# Store textures block-compressed (BC1, 4 bits per texel instead of 24) when
+# the driver supports S3TC; otherwise they are uploaded uncompressed
+USE_COMPRESSION = True
+
 class Camera:
     def __init__(self):
         self.position = np.array([0.0, 2.0, 8.0])
@@ -13,6 +37,7 @@ class Camera:
         self.pitch = -15.0
         self.speed = 0.05
         self.sensitivity = 0.1
+        self.view = np.identity(4, dtype=np.float32)
         
     def get_view_matrix(self):
         front = np.array([
@@ -25,10 +50,7 @@ class Camera:
         target = self.position + front
         up = np.array([0.0, 1.0, 0.0])
         
-        glLoadIdentity()
-        gluLookAt(self.position[0], self.position[1], self.position[2],
-                  target[0], target[1], target[2],
-                  up[0], up[1], up[2])
+        return look_at(self.position, target, up, out=self.view)
     
     def process_keyboard(self, keys):
         front = np.array([
@@ -80,13 +102,16 @@ def load_shader(shader_file, shader_type):
     
     return shader
 
-def create_shader_program():
+def create_shader_program(fragment_file='shaders/fragment.glsl'):
     vertex_shader = load_shader('shaders/vertex.glsl', GL_VERTEX_SHADER)
-    fragment_shader = load_shader('shaders/fragment.glsl', GL_FRAGMENT_SHADER)
+    fragment_shader = load_shader(fragment_file, GL_FRAGMENT_SHADER)
+    # The analytic patterns are a second fragment shader object, linked in
+    pattern_shader = load_shader('shaders/patterns.glsl', GL_FRAGMENT_SHADER)
     
     program = glCreateProgram()
     glAttachShader(program, vertex_shader)
     glAttachShader(program, fragment_shader)
+    glAttachShader(program, pattern_shader)
     glLinkProgram(program)
     
     if not glGetProgramiv(program, GL_LINK_STATUS):
@@ -96,90 +121,122 @@ def create_shader_program():
     
     glDeleteShader(vertex_shader)
     glDeleteShader(fragment_shader)
+    glDeleteShader(pattern_shader)
     
-    return program
+    return Program(program)
+
+def _select_colors(image, mask, color, background):
+    """Fill ``image`` with ``color`` where ``mask`` is set, else ``background``"""
+    # One channel at a time: much faster than broadcasting over (h, w, 3)
+    for c in range(3):
+        image[..., c] = np.where(mask, np.uint8(color[c]), np.uint8(background[c]))
 
 def generate_procedural_texture(width, height, pattern='checkerboard'):
     """Generate procedural textures"""
     image = np.zeros((height, width, 3), dtype=np.uint8)
     
+    # Row and column index grids. Every pattern reduces them to small 1D
+    # terms first, so only the final combination runs at full resolution.
+    i, j = np.ogrid[:height, :width]
+    
     if pattern == 'checkerboard':
-        for i in range(height):
-            for j in range(width):
-                if (i // 32 + j // 32) % 2 == 0:
-                    image[i, j] = [255, 255, 255]
-                else:
-                    image[i, j] = [50, 50, 50]
+        light = (i // 32 % 2) == (j // 32 % 2)
+        _select_colors(image, light, (255, 255, 255), (50, 50, 50))
     
     elif pattern == 'brick':
         brick_height = 32
         brick_width = 64
         mortar = 4
         
-        for i in range(height):
-            for j in range(width):
-                row = i // brick_height
-                offset = (row % 2) * (brick_width // 2)
-                col = (j + offset) % (brick_width + mortar)
-                
-                if i % brick_height < mortar or col < mortar:
-                    image[i, j] = [200, 200, 200]  # Mortar
-                else:
-                    # Brick color with variation
-                    variation = (i % brick_height + j % brick_width) % 30
-                    image[i, j] = [180 + variation, 80 + variation // 2, 50]
+        # Odd rows are shifted by half a brick
+        odd_row = (i // brick_height) % 2 == 1
+        col_even = j % (brick_width + mortar) < mortar
+        col_odd = (j + brick_width // 2) % (brick_width + mortar) < mortar
+        is_mortar = (i % brick_height < mortar) | np.where(odd_row, col_odd, col_even)
+        
+        # Brick color with variation
+        variation = ((i % brick_height).astype(np.uint8) + (j % brick_width).astype(np.uint8)) % 30
+        image[..., 0] = np.where(is_mortar, np.uint8(200), 180 + variation)
+        image[..., 1] = np.where(is_mortar, np.uint8(200), 80 + variation // 2)
+        image[..., 2] = np.where(is_mortar, np.uint8(200), np.uint8(50))  # Mortar is light grey
     
     elif pattern == 'grid':
         grid_size = 64
         line_width = 4
         
-        for i in range(height):
-            for j in range(width):
-                if i % grid_size < line_width or j % grid_size < line_width:
-                    image[i, j] = [0, 255, 255]  # Cyan lines
-                else:
-                    image[i, j] = [30, 30, 50]  # Dark background
+        line = (i % grid_size < line_width) | (j % grid_size < line_width)
+        # Cyan lines on a dark background
+        _select_colors(image, line, (0, 255, 255), (30, 30, 50))
     
     elif pattern == 'dots':
-        for i in range(height):
-            for j in range(width):
-                x = j % 64 - 32
-                y = i % 64 - 32
-                dist = math.sqrt(x*x + y*y)
-                if dist < 20:
-                    image[i, j] = [255, 100, 200]  # Pink dots
-                else:
-                    image[i, j] = [240, 240, 255]  # Light background
+        x = j % 64 - 32
+        y = i % 64 - 32
+        # dist < 20 on integer offsets, without the square root
+        dot = (x * x).astype(np.int16) + (y * y).astype(np.int16) < 20 * 20
+        # Pink dots on a light background
+        _select_colors(image, dot, (255, 100, 200), (240, 240, 255))
     
     return image
 
-def load_texture(pattern='checkerboard', use_mipmaps=True):
-    """Load texture with mipmapping support"""
-    texture = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, texture)
-    
-    # Generate procedural texture
-    img_data = generate_procedural_texture(512, 512, pattern)
-    
-    # Texture parameters
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-    
-    if use_mipmaps:
-        # Enable mipmapping with trilinear filtering
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        
-        # Upload texture and generate mipmaps
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, 512, 512, 0, GL_RGB, GL_UNSIGNED_BYTE, img_data)
-        glGenerateMipmap(GL_TEXTURE_2D)
-    else:
-        # No mipmapping, just bilinear filtering
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, 512, 512, 0, GL_RGB, GL_UNSIGNED_BYTE, img_data)
-    
-    return texture
+def texture_params(use_mipmaps):
+    """Wrap and filter settings shared by every Lab6 texture"""
+    return {
+        GL_TEXTURE_WRAP_S: GL_REPEAT,
+        GL_TEXTURE_WRAP_T: GL_REPEAT,
+        # Trilinear filtering with mipmaps, otherwise just bilinear
+        GL_TEXTURE_MIN_FILTER: GL_LINEAR_MIPMAP_LINEAR if use_mipmaps else GL_LINEAR,
+        GL_TEXTURE_MAG_FILTER: GL_LINEAR,
+    }
+
+def load_texture_levels(pattern, size=TEXTURE_SIZE, mip_filter='kaiser'):
+    """Cached mip chain of a procedural texture
+    
+    The base image and its mip chain are computed on the CPU once and kept
+    in the on-disk texture cache; later runs memory-map them.
+    """
+    return cached_mip_chain(f'texture:{pattern}:{size}',
+                            lambda: generate_procedural_texture(size, size, pattern),
+                            kind=mip_filter, version=TEXTURE_VERSION)
+
+def load_compressed_levels(pattern, size=TEXTURE_SIZE, mip_filter='kaiser', compression='bc1'):
+    """Cached block-compressed mip chain of a procedural texture
+    
+    Encoded from the cached uncompressed chain on the first run. Prints the
+    PSNR of the compressed texture.
+    """
+    levels, quality = cached_compressed_chain(f'texture:{pattern}:{size}:{mip_filter}',
+                                              lambda: load_texture_levels(pattern, size, mip_filter),
+                                              fmt=compression, version=TEXTURE_VERSION)
+    print(f"{pattern}: {compression.upper()} PSNR {quality[0]:.1f} dB (base), {min(quality):.1f} dB (worst level)")
+    return levels
+
+def _level_generator(pattern, size, mip_filter, compression):
+    if compression:
+        return lambda: load_compressed_levels(pattern, size, mip_filter, compression)
+    return lambda: load_texture_levels(pattern, size, mip_filter)
+
+def load_texture(streamer, pattern='checkerboard', use_mipmaps=True, size=TEXTURE_SIZE, mip_filter='kaiser',
+                 compression=None):
+    """Load texture with mipmapping support
+    
+    The levels are produced on a streaming worker and uploaded from a PBO a
+    few frames later; bind the returned texture's ``.texture``, which is a
+    placeholder until then. ``compression`` ('bc1') stores it compressed.
+    """
+    return streamer.load(_level_generator(pattern, size, mip_filter, compression), size, size,
+                         mipmaps=use_mipmaps, params=texture_params(use_mipmaps), compression=compression)
+
+def load_texture_array(streamer, patterns=PATTERNS, use_mipmaps=True, size=TEXTURE_SIZE, mip_filter='kaiser',
+                       compression=None):
+    """Load same-size textures as the layers of one GL_TEXTURE_2D_ARRAY
+    
+    Every layer streams in separately. Returns the streamed texture and a
+    {pattern: layer} mapping.
+    """
+    generators = [_level_generator(pattern, size, mip_filter, compression) for pattern in patterns]
+    texture = streamer.load(generators, size, size, mipmaps=use_mipmaps, target=GL_TEXTURE_2D_ARRAY,
+                            params=texture_params(use_mipmaps), compression=compression)
+    return texture, {pattern: layer for layer, pattern in enumerate(patterns)}
 
 def create_cube_vertices(tex_scale=1.0):
     """Create cube with texture coordinates (tiling controlled by tex_scale)"""
@@ -289,49 +346,86 @@ def main():
     glEnable(GL_DEPTH_TEST)
     glDepthFunc(GL_LEQUAL)
     
-    # Set up projection
-    glMatrixMode(GL_PROJECTION)
-    gluPerspective(45, (display[0] / display[1]), 0.1, 100.0)
-    glMatrixMode(GL_MODELVIEW)
+    # Set up projection; matrices are built on the CPU, nothing is read back
+    projection = perspective(45, (display[0] / display[1]), 0.1, 100.0)
+    # Its bottom level is the scene root: every object is pushed on top of it
+    stack = MatrixStack()
     
     # Create shader program
-    shader = create_shader_program()
-    
-    # Load multiple textures with different patterns
-    textures = {
-        'checkerboard': load_texture('checkerboard', use_mipmaps=True),
-        'brick': load_texture('brick', use_mipmaps=True),
-        'grid': load_texture('grid', use_mipmaps=True),
-        'dots': load_texture('dots', use_mipmaps=True),
-    }
+    if USE_TEXTURE_ARRAY:
+        shader = create_shader_program('shaders/fragment_array.glsl')
+    else:
+        shader = create_shader_program()
     
     # Create geometry with different tiling amounts
-    cube_vao1, cube_indices1 = setup_vertex_buffer(*create_cube_vertices(tex_scale=1.0))
-    cube_vao2, cube_indices2 = setup_vertex_buffer(*create_cube_vertices(tex_scale=2.0))
-    cube_vao3, cube_indices3 = setup_vertex_buffer(*create_cube_vertices(tex_scale=4.0))
-    plane_vao, plane_indices = setup_vertex_buffer(*create_plane_vertices(size=10.0, tex_scale=10.0))
+    # (mesh ids index this list: VAO and index count)
+    geometry = [
+        create_cube_vertices(tex_scale=1.0),
+        create_cube_vertices(tex_scale=2.0),
+        create_cube_vertices(tex_scale=4.0),
+        create_plane_vertices(size=10.0, tex_scale=10.0),
+    ]
+    meshes = [setup_vertex_buffer(vertices, indices) for vertices, indices in geometry]
+    # Bounding sphere radius of each mesh (vertex positions are the first 3 of 8 floats)
+    mesh_radii = np.array([np.linalg.norm(vertices.reshape(-1, 8)[:, :3], axis=1).max()
+                           for vertices, _ in geometry], dtype=np.float32)
     
     # Create camera
     camera = Camera()
     
-    # Objects with different textures and tiling
-    objects = [
-        {'vao': cube_vao1, 'indices': cube_indices1, 'pos': (-3.0, 1.0, 0.0), 
-         'rotation': 0.0, 'texture': 'checkerboard', 'label': '1x tiling'},
-        {'vao': cube_vao2, 'indices': cube_indices2, 'pos': (0.0, 1.0, 0.0), 
-         'rotation': 0.0, 'texture': 'brick', 'label': '2x tiling'},
-        {'vao': cube_vao3, 'indices': cube_indices3, 'pos': (3.0, 1.0, 0.0), 
-         'rotation': 0.0, 'texture': 'grid', 'label': '4x tiling'},
-        {'vao': plane_vao, 'indices': plane_indices, 'pos': (0.0, 0.0, 0.0), 
-         'rotation': 0.0, 'texture': 'dots', 'label': 'Ground plane - 10x tiling'},
-    ]
+    # Objects with different textures and tiling. 'procedural' objects
+    # evaluate their pattern in the fragment shader (shaders/patterns.glsl)
+    # instead of sampling a texture.
+    # Texture ids index the materials: (pattern, procedural)
+    materials = [('checkerboard', False), ('brick', False), ('grid', False), ('dots', True)]
+    scene = SceneStore()
+    scene.add((-3.0, 1.0, 0.0), angular_velocity=0.5, mesh=0, texture=0)  # 1x tiling
+    scene.add((0.0, 1.0, 0.0), angular_velocity=0.5, mesh=1, texture=1)   # 2x tiling
+    scene.add((3.0, 1.0, 0.0), angular_velocity=0.5, mesh=2, texture=2)   # 4x tiling
+    scene.add((0.0, 0.0, 0.0), mesh=3, texture=3)                         # Ground plane - 10x tiling
+    
+    # Objects only spin in place, so bounding spheres never need a refit
+    bvh = BVH(*sphere_bounds(scene.positions, mesh_radii[scene.meshes]))
+    culling = True
+    
+    # Load textures for the patterns that are sampled; procedural ones need
+    # none. They stream in on worker threads while the scene is already running.
+    used = {materials[texture] for texture in scene.textures}
+    sampled = [p for p in PATTERNS if (p, False) in used]
+    compression = None
+    if USE_COMPRESSION:
+        if s3tc_supported():
+            compression = 'bc1'
+        else:
+            print("S3TC texture compression is not supported; using uncompressed textures")
+    streamer = TextureStreamer()
+    texture_array = None
+    textures = {}
+    if USE_TEXTURE_ARRAY:
+        if sampled:
+            texture_array, layers = load_texture_array(streamer, sampled, use_mipmaps=True, compression=compression)
+    else:
+        textures = {pattern: load_texture(streamer, pattern, use_mipmaps=True, compression=compression)
+                    for pattern in sampled}
     
     clock = pygame.time.Clock()
     last_x, last_y = display[0] // 2, display[1] // 2
     first_mouse = True
     
-    # Font for UI
-    font = pygame.font.Font(None, 24)
+    # Overlay text: glyphs are rasterized once, the lines laid out once
+    text_atlas = GlyphAtlas(24)
+    info_label = TextLabel(text_atlas)
+    info_label.set_text([
+        "Lab 6 - Texture Mapping Features:",
+        "• Mipmapping: Enabled (trilinear filtering)",
+        "• Tiling: Multiple scales demonstrated",
+        "• Ground plane: analytic pattern in the shader (no texture)",
+        "• Perspective-correct interpolation: Automatic in shaders",
+        "",
+        "Controls: W/A/S/D - Move, Mouse - Look, Space/Shift - Up/Down",
+        "Press F to toggle frustum culling, H to toggle this info, ESC to exit"
+    ], x=10, y=10, line_height=25)
+    stats_label = TextLabel(text_atlas)
     
     running = True
     show_info = True
@@ -345,6 +439,8 @@ def main():
                     running = False
                 elif event.key == pygame.K_h:
                     show_info = not show_info
+                elif event.key == pygame.K_f:
+                    culling = not culling
         
         # Mouse input
         mouse_x, mouse_y = pygame.mouse.get_pos()
@@ -362,100 +458,91 @@ def main():
         keys = pygame.key.get_pressed()
         camera.process_keyboard(keys)
         
+        # Upload textures that finished loading (a bounded amount per frame)
+        streamer.update()
+        
         # Clear buffers
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         glClearColor(0.2, 0.3, 0.4, 1.0)
         
         # Use shader
-        glUseProgram(shader)
-        
-        # Set view matrix
-        glMatrixMode(GL_MODELVIEW)
-        glLoadIdentity()
-        camera.get_view_matrix()
+        shader.use()
         
-        # Get matrices for shader
-        modelview = glGetFloatv(GL_MODELVIEW_MATRIX)
-        projection = glGetFloatv(GL_PROJECTION_MATRIX)
+        # Only changed values reach the GL (the projection and sampler
+        # are sent once)
+        view = camera.get_view_matrix()
+        shader.set('view', view)
+        shader.set('projection', projection)
+        shader.set('textureSampler', 0)
         
-        model_loc = glGetUniformLocation(shader, "model")
-        view_loc = glGetUniformLocation(shader, "view")
-        proj_loc = glGetUniformLocation(shader, "projection")
-        tex_loc = glGetUniformLocation(shader, "textureSampler")
+        if texture_array is not None:
+            # A single bind covers every object in the scene
+            glActiveTexture(GL_TEXTURE0)
+            glBindTexture(GL_TEXTURE_2D_ARRAY, texture_array.texture)
         
-        glUniformMatrix4fv(view_loc, 1, GL_FALSE, modelview)
-        glUniformMatrix4fv(proj_loc, 1, GL_FALSE, projection)
-        glUniform1i(tex_loc, 0)
+        # Only objects whose bounds reach into the view frustum are drawn
+        rows = bvh.cull(frustum_planes(projection @ view)) if culling else np.arange(len(scene))
         
-        # Draw objects
-        for i, obj in enumerate(objects):
-            glPushMatrix()
-            
-            glTranslatef(*obj['pos'])
-            if i < 3:  # Rotate cubes only
-                glRotatef(obj['rotation'], 0, 1, 0)
-                obj['rotation'] += 0.5
+        # Draw objects; all model matrices are computed in one batch
+        # (column-major, so .T is the row-major matrix the stack works with)
+        models = scene.model_matrices(rows)
+        for model, row in zip(models, rows):
+            pattern, procedural = materials[scene.textures[row]]
+            vao, index_count = meshes[scene.meshes[row]]
             
-            model = glGetFloatv(GL_MODELVIEW_MATRIX)
-            glUniformMatrix4fv(model_loc, 1, GL_FALSE, model)
+            # Scene root times the object's transform; the view is a separate uniform
+            stack.push()
+            stack.multiply(model.T)
+            shader.set('model', stack.matrix)
+            stack.pop()
             
-            # Bind texture
-            glActiveTexture(GL_TEXTURE0)
-            glBindTexture(GL_TEXTURE_2D, textures[obj['texture']])
+            if procedural:
+                # The shader evaluates the pattern; no texture is involved
+                shader.set('proceduralPattern', PATTERNS.index(pattern))
+            else:
+                shader.set('proceduralPattern', -1)
+                if USE_TEXTURE_ARRAY:
+                    # Select the layer through a constant vertex attribute, so the
+                    # same layout works later as a per-instance attribute
+                    glVertexAttrib1f(3, layers[pattern])
+                else:
+                    # Bind texture
+                    glActiveTexture(GL_TEXTURE0)
+                    glBindTexture(GL_TEXTURE_2D, textures[pattern].texture)
             
             # Draw
-            glBindVertexArray(obj['vao'])
-            glDrawElements(GL_TRIANGLES, obj['indices'], GL_UNSIGNED_INT, None)
-            
-            glPopMatrix()
+            glBindVertexArray(vao)
+            glDrawElements(GL_TRIANGLES, index_count, GL_UNSIGNED_INT, None)
+        
+        # Spin the cubes (every object in one batched update)
+        scene.update()
         
         # Draw UI
         if show_info:
-            glUseProgram(0)
-            glMatrixMode(GL_PROJECTION)
-            glPushMatrix()
-            glLoadIdentity()
-            glOrtho(0, display[0], display[1], 0, -1, 1)
-            glMatrixMode(GL_MODELVIEW)
-            glPushMatrix()
-            glLoadIdentity()
-            
-            glDisable(GL_DEPTH_TEST)
-            
-            # Render text
-            info_texts = [
-                "Lab 6 - Texture Mapping Features:",
-                "• Mipmapping: Enabled (trilinear filtering)",
-                "• Tiling: Multiple scales demonstrated",
-                "• Perspective-correct interpolation: Automatic in shaders",
-                "",
-                "Controls: W/A/S/D - Move, Mouse - Look, Space/Shift - Up/Down",
-                "Press H to toggle this info, ESC to exit"
-            ]
-            
-            y_offset = 10
-            for text in info_texts:
-                surface = font.render(text, True, (255, 255, 255))
-                text_data = pygame.image.tostring(surface, "RGBA", True)
-                glRasterPos2f(10, y_offset)
-                glDrawPixels(surface.get_width(), surface.get_height(), 
-                           GL_RGBA, GL_UNSIGNED_BYTE, text_data)
-                y_offset += 25
-            
-            glEnable(GL_DEPTH_TEST)
-            
-            glMatrixMode(GL_PROJECTION)
-            glPopMatrix()
-            glMatrixMode(GL_MODELVIEW)
-            glPopMatrix()
+            info_label.draw(display)
+            if culling:
+                stats = bvh.stats
+                stats_text = (f"Culling: {stats['visible']} drawn, {stats['culled']} culled, "
+                              f"{stats['visited']} nodes visited")
+            else:
+                stats_text = f"Culling: off, {len(scene)} drawn"
+            # Laid out again only when the counts change
+            stats_label.set_text([stats_text], x=10, y=10 + 9 * 25, line_height=25)
+            stats_label.draw(display)
         
         pygame.display.flip()
         clock.tick(60)
     
     # Cleanup
+    streamer.shutdown()
     for texture in textures.values():
-        glDeleteTextures(1, [texture])
-    glDeleteProgram(shader)
+        glDeleteTextures(1, [texture.real])
+    if texture_array is not None:
+        glDeleteTextures(1, [texture_array.real])
+    info_label.delete()
+    stats_label.delete()
+    text_atlas.delete()
+    shader.delete()
     pygame.quit()
 
 if __name__ == "__main__":
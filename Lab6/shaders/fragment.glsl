@@ -7,13 +7,23 @@ in vec2 TexCoord;
 out vec4 FragColor;
 
 uniform sampler2D textureSampler;
+uniform int proceduralPattern;  // -1 samples the texture, else the pattern to evaluate
+
+// Defined in patterns.glsl
+vec3 evaluatePattern(int pattern, vec2 uv);
 
 void main()
 {
     // Sample texture with mipmapping
     // The GPU automatically selects the appropriate mipmap level
-    // based on the screen-space derivative of texture coordinates
-    vec4 texColor = texture(textureSampler, TexCoord);
+    // based on the screen-space derivative of texture coordinates.
+    // Procedural objects evaluate their pattern analytically instead,
+    // filtered over the pixel footprint rather than through mipmaps.
+    vec4 texColor;
+    if (proceduralPattern >= 0)
+        texColor = vec4(evaluatePattern(proceduralPattern, TexCoord), 1.0);
+    else
+        texColor = texture(textureSampler, TexCoord);
     
     // Simple directional lighting
     vec3 lightDir = normalize(vec3(0.5, 1.0, 0.3));
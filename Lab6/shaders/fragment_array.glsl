@@ -0,0 +1,46 @@
+#version 330 core
+
+in vec3 FragPos;
+in vec3 Normal;
+in vec2 TexCoord;
+flat in float Layer;
+
+out vec4 FragColor;
+
+uniform sampler2DArray textureSampler;
+uniform int proceduralPattern;  // -1 samples the texture, else the pattern to evaluate
+
+// Defined in patterns.glsl
+vec3 evaluatePattern(int pattern, vec2 uv);
+
+void main()
+{
+    // Sample texture with mipmapping
+    // The GPU automatically selects the appropriate mipmap level
+    // based on the screen-space derivative of texture coordinates.
+    // The layer selects the object's pattern within the texture array.
+    // Procedural objects evaluate their pattern analytically instead,
+    // filtered over the pixel footprint rather than through mipmaps.
+    vec4 texColor;
+    if (proceduralPattern >= 0)
+        texColor = vec4(evaluatePattern(proceduralPattern, TexCoord), 1.0);
+    else
+        texColor = texture(textureSampler, vec3(TexCoord, Layer));
+    
+    // Simple directional lighting
+    vec3 lightDir = normalize(vec3(0.5, 1.0, 0.3));
+    vec3 norm = normalize(Normal);
+    
+    // Ambient component
+    float ambientStrength = 0.4;
+    vec3 ambient = ambientStrength * texColor.rgb;
+    
+    // Diffuse component
+    float diff = max(dot(norm, lightDir), 0.0);
+    vec3 diffuse = diff * texColor.rgb;
+    
+    // Combine lighting with texture
+    vec3 result = ambient + diffuse;
+    
+    FragColor = vec4(result, texColor.a);
+}
\ No newline at end of file
@@ -0,0 +1,83 @@
+#version 330 core
+
+// Analytic versions of generate_procedural_texture's patterns, linked into
+// the fragment shader as a second shader object. Patterns are evaluated in
+// texel units of the 512x512 texture (so they line up with the sampled
+// path) and box-filtered over the pixel footprint, estimated with fwidth,
+// which takes the place of mipmapping.
+
+const float PATTERN_SIZE = 512.0;
+
+// Integral over [0, t] of a pulse train that is 1 where mod(x, period) < width
+float pulseIntegral(float t, float period, float width)
+{
+    return floor(t / period) * width + min(mod(t, period), width);
+}
+
+// Average of that pulse train over [x - w/2, x + w/2]
+float filteredPulse(float x, float w, float period, float width)
+{
+    w = max(w, 1e-4);
+    return (pulseIntegral(x + 0.5 * w, period, width) - pulseIntegral(x - 0.5 * w, period, width)) / w;
+}
+
+vec3 checkerboard(vec2 p, vec2 w)
+{
+    // Light where the cells along x and y are both even or both odd;
+    // the box filter is separable, so the fractions just multiply
+    float ex = filteredPulse(p.x, w.x, 64.0, 32.0);
+    float ey = filteredPulse(p.y, w.y, 64.0, 32.0);
+    float light = ex * ey + (1.0 - ex) * (1.0 - ey);
+    return mix(vec3(50.0), vec3(255.0), light) / 255.0;
+}
+
+vec3 brick(vec2 p, vec2 w)
+{
+    // 64x32 bricks with 4-texel mortar, odd rows shifted by half a brick
+    float offset = 32.0 * mod(floor(p.y / 32.0), 2.0);
+    float my = filteredPulse(p.y, w.y, 32.0, 4.0);
+    float mx = filteredPulse(p.x + offset, w.x, 68.0, 4.0);
+    float mortar = 1.0 - (1.0 - my) * (1.0 - mx);
+
+    // The per-texel color variation is a sawtooth; fade it to its mean
+    // once a pixel covers more than a texel
+    float variation = mod(mod(floor(p.y), 32.0) + mod(floor(p.x), 64.0), 30.0);
+    variation = mix(variation, 14.5, clamp(max(w.x, w.y) - 1.0, 0.0, 1.0));
+    vec3 color = vec3(180.0 + variation, 80.0 + floor(variation / 2.0), 50.0);
+    return mix(color, vec3(200.0), mortar) / 255.0;
+}
+
+vec3 grid(vec2 p, vec2 w)
+{
+    // Cyan 4-texel lines every 64 texels on a dark background
+    float lx = filteredPulse(p.x, w.x, 64.0, 4.0);
+    float ly = filteredPulse(p.y, w.y, 64.0, 4.0);
+    float line = 1.0 - (1.0 - lx) * (1.0 - ly);
+    return mix(vec3(30.0, 30.0, 50.0), vec3(0.0, 255.0, 255.0), line) / 255.0;
+}
+
+vec3 dots(vec2 p, vec2 w)
+{
+    // Pink dots of radius 20 in 64-texel cells; the center sits on a texel
+    // center, like the integer offsets of the CPU version
+    float d = length(mod(p, 64.0) - 32.5);
+    float edge = max(fwidth(d), 1e-4);
+    float coverage = clamp(0.5 - (d - 20.0) / edge, 0.0, 1.0);
+    // Fade to the average coverage as a pixel grows to a whole cell
+    coverage = mix(coverage, 0.304, clamp(max(w.x, w.y) / 32.0 - 1.0, 0.0, 1.0));
+    return mix(vec3(240.0, 240.0, 255.0), vec3(255.0, 100.0, 200.0), coverage) / 255.0;
+}
+
+// 0 checkerboard, 1 brick, 2 grid, 3 dots (the order of PATTERNS in main.py)
+vec3 evaluatePattern(int pattern, vec2 uv)
+{
+    vec2 p = uv * PATTERN_SIZE;
+    vec2 w = fwidth(p);
+    if (pattern == 0)
+        return checkerboard(p, w);
+    if (pattern == 1)
+        return brick(p, w);
+    if (pattern == 2)
+        return grid(p, w);
+    return dots(p, w);
+}
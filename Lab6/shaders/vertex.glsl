@@ -3,10 +3,12 @@
 layout (location = 0) in vec3 aPos;
 layout (location = 1) in vec3 aNormal;
 layout (location = 2) in vec2 aTexCoord;
+layout (location = 3) in float aLayer;  // texture array layer (constant per object)
 
 out vec3 FragPos;
 out vec3 Normal;
 out vec2 TexCoord;
+flat out float Layer;
 
 uniform mat4 model;
 uniform mat4 view;
@@ -24,6 +26,7 @@ void main()
     // Perspective-correct interpolation is automatic in modern OpenGL
     // The GPU automatically divides by w (perspective divide) for varying variables
     TexCoord = aTexCoord;
+    Layer = aLayer;
     
     // Calculate final position with perspective divide
     gl_Position = projection * view * model * vec4(aPos, 1.0);
@@ -0,0 +1,130 @@
+"""Compare the line-by-line OBJ loader with the bulk NumPy parser.
+
+Usage: python benchmark_obj.py [triangles] [--obj path/to/model.obj] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from obj_loader import parse_obj, parse_obj_parallel
+
+
+def legacy_load_obj(filename):
+    """The original per-line loader, kept here as the baseline"""
+    vertices = []
+    normals = []
+    faces = []
+
+    temp_vertices = []
+    temp_normals = []
+
+    with open(filename, 'r') as f:
+        for line in f:
+            if line.startswith('v '):
+                parts = line.split()
+                temp_vertices.append([float(parts[1]), float(parts[2]), float(parts[3])])
+            elif line.startswith('vn '):
+                parts = line.split()
+                temp_normals.append([float(parts[1]), float(parts[2]), float(parts[3])])
+            elif line.startswith('f '):
+                parts = line.split()[1:]
+                face = []
+                for part in parts:
+                    indices = part.split('/')
+                    v_idx = int(indices[0]) - 1
+                    n_idx = int(indices[2]) - 1 if len(indices) > 2 and indices[2] else v_idx
+                    face.append((v_idx, n_idx))
+                faces.append(face)
+
+    for face in faces:
+        for v_idx, n_idx in face:
+            vertices.extend(temp_vertices[v_idx])
+            if n_idx < len(temp_normals):
+                normals.extend(temp_normals[n_idx])
+            else:
+                normals.extend([0.0, 1.0, 0.0])
+
+    return np.array(vertices, dtype=np.float32), np.array(normals, dtype=np.float32)
+
+
+def write_test_obj(path, triangles):
+    """Write a UV sphere with roughly ``triangles`` faces (v/vt/vn records)"""
+    n = max(4, int(np.sqrt(triangles / 2)))
+    theta, phi = np.meshgrid(np.linspace(0, np.pi, n + 1), np.linspace(0, 2 * np.pi, n + 1), indexing='ij')
+    pos = np.stack([np.sin(theta) * np.cos(phi), np.cos(theta), np.sin(theta) * np.sin(phi)], axis=-1).reshape(-1, 3)
+    uv = np.stack([phi / (2 * np.pi), theta / np.pi], axis=-1).reshape(-1, 2)
+
+    i, j = np.meshgrid(np.arange(n), np.arange(n), indexing='ij')
+    a = (i * (n + 1) + j).ravel() + 1
+    b, c, d = a + n + 1, a + n + 2, a + 1
+    tris = np.concatenate([np.stack([a, c, b], 1), np.stack([a, d, c], 1)])
+
+    with open(path, 'w') as f:
+        f.write("# benchmark sphere\n")
+        np.savetxt(f, pos, fmt='v %.6f %.6f %.6f')
+        np.savetxt(f, uv, fmt='vt %.6f %.6f')
+        np.savetxt(f, pos, fmt='vn %.6f %.6f %.6f')
+        np.savetxt(f, np.repeat(tris, 3, axis=1), fmt='f %d/%d/%d %d/%d/%d %d/%d/%d')
+    return len(tris)
+
+
+def measure(loader, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = loader(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('triangles', nargs='?', type=int, default=200000)
+    parser.add_argument('--obj', help="benchmark an existing OBJ file instead")
+    parser.add_argument('--workers', type=int, nargs='*', default=[],
+                        help="also time the multi-process parser with these pool sizes")
+    args = parser.parse_args()
+
+    tmp = None
+    path = args.obj
+    if path is None:
+        tmp = tempfile.NamedTemporaryFile(suffix='.obj', delete=False)
+        tmp.close()
+        path = tmp.name
+        count = write_test_obj(path, args.triangles)
+        print(f"Generated {count} triangles ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+    try:
+        (old_v, old_n), old_t, old_mem = measure(legacy_load_obj, path)
+        (new_v, new_n), new_t, new_mem = measure(lambda p: parse_obj(p).deindex(), path)
+        parallel = []
+        for workers in args.workers:
+            start = time.perf_counter()
+            par_v, par_n = parse_obj_parallel(path, workers, min_size=0).deindex()
+            elapsed = time.perf_counter() - start
+            same = np.array_equal(par_v, new_v) and np.array_equal(par_n, new_n)
+            parallel.append((workers, elapsed, same))
+    finally:
+        if tmp is not None:
+            os.remove(path)
+
+    identical = np.array_equal(old_v, new_v) and np.array_equal(old_n, new_n)
+    print(f"{'loader':<10}{'time (s)':>12}{'peak MB':>12}")
+    print(f"{'legacy':<10}{old_t:>12.3f}{old_mem / 1e6:>12.1f}")
+    print(f"{'bulk':<10}{new_t:>12.3f}{new_mem / 1e6:>12.1f}")
+    print(f"Speedup: {old_t / new_t:.1f}x, memory: {old_mem / max(new_mem, 1):.1f}x less")
+    print(f"Identical output: {identical}")
+
+    if parallel:
+        print(f"\n{'workers':<10}{'time (s)':>12}{'speedup':>12}{'identical':>12}")
+        for workers, elapsed, same in parallel:
+            print(f"{workers:<10}{elapsed:>12.3f}{new_t / elapsed:>11.1f}x{str(same):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Vertex memory and accuracy of the compact vertex formats on a Lab7 mesh.
+
+Usage: python benchmark_vertex_format.py [triangles] [--obj path/to/model.obj]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.vertex_format import Attribute, VertexLayout
+
+from benchmark_obj import write_test_obj
+from main import VERTEX_LAYOUT
+from obj_loader import parse_obj
+
+LAYOUTS = {
+    'float32 (original)': VertexLayout([Attribute('position', 0, 3), Attribute('normal', 1, 3)]),
+    'half position': VertexLayout([Attribute('position', 0, 3, 'float16'),
+                                   Attribute('normal', 1, 3, 'int_2_10_10_10_rev')]),
+    'snorm16 position': VERTEX_LAYOUT,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('triangles', nargs='?', type=int, default=200000)
+    parser.add_argument('--obj', help="measure an existing OBJ file instead")
+    args = parser.parse_args()
+
+    path = args.obj
+    if path is None:
+        with tempfile.NamedTemporaryFile(suffix='.obj', delete=False) as tmp:
+            path = tmp.name
+        try:
+            write_test_obj(path, args.triangles)
+            vertices, normals, _ = parse_obj(path).indexed()
+        finally:
+            os.remove(path)
+    else:
+        vertices, normals, _ = parse_obj(path).indexed()
+
+    count = len(vertices) // 3
+    baseline = vertices.nbytes + normals.nbytes
+    print(f"{count} vertices")
+    print(f"{'layout':<20}{'bytes/vertex':>14}{'MB':>8}{'ratio':>8}{'position error (bound)':>28}{'normal error (bound)':>26}")
+    for name, layout in LAYOUTS.items():
+        data, dequant = layout.pack(position=vertices, normal=normals)
+        accuracy = layout.accuracy(data, dequant, position=vertices, normal=normals)
+        columns = ''.join(f"{f'{error:.2e} ({bound:.2e})':>{width}}"
+                          for (error, bound), width in zip(accuracy.values(), (28, 26)))
+        print(f"{name:<20}{layout.stride:>14}{data.nbytes / 1e6:>8.2f}{baseline / data.nbytes:>7.1f}x{columns}")
+
+
+if __name__ == "__main__":
+    main()
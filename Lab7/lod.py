@@ -0,0 +1,252 @@
+import math
+
+import numpy as np
+
+from normals import smooth_normals
+from obj_loader import index_dtype, unique_rows
+
+# Reduction of each level relative to the one before it.
+DEFAULT_LOD_RATIOS = (0.5, 0.25, 0.125)
+
+# Meshes smaller than this are not worth simplifying.
+MIN_LOD_TRIANGLES = 64
+
+# Boundary edges get a perpendicular plane with this weight, so open
+# borders do not shrink away.
+BOUNDARY_WEIGHT = 100.0
+
+# A collapse is rejected if it turns any surrounding face by more than
+# about 75 degrees (cosine below this value).
+FLIP_THRESHOLD = 0.25
+
+
+def weld_positions(vertices, indices):
+    """Merge vertices with identical positions, ignoring their normals.
+
+    Returns (positions (m, 3), triangles (n, 3)) for simplification, where
+    normal and UV seams would otherwise look like holes in the surface.
+    """
+    positions = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    first, inverse = unique_rows(positions.view(np.int32))
+    triangles = inverse[np.asarray(indices, dtype=np.int64)].reshape(-1, 3)
+    return positions[first], triangles
+
+
+def _bincount16(index, values, size):
+    return np.stack([np.bincount(index, weights=values[:, k], minlength=size) for k in range(16)], axis=1)
+
+
+def _plane_quadrics(normals, points, weights):
+    """Weighted fundamental quadrics (flattened 4x4) of planes through ``points``"""
+    planes = np.concatenate([normals, -np.einsum('ij,ij->i', normals, points)[:, None]], axis=1)
+    return (planes[:, :, None] * planes[:, None, :]).reshape(-1, 16) * weights[:, None]
+
+
+def _vertex_quadrics(positions, triangles):
+    """Sum of face plane quadrics (area weighted) around every vertex"""
+    p = positions[triangles].astype(np.float64)
+    n = np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+    double_area = np.linalg.norm(n, axis=1)
+    unit = np.divide(n, double_area[:, None], out=np.zeros_like(n), where=double_area[:, None] > 0)
+
+    face_q = _plane_quadrics(unit, p[:, 0], double_area / 2)
+    quadrics = np.zeros((len(positions), 16))
+    for k in range(3):
+        quadrics += _bincount16(triangles[:, k], face_q, len(positions))
+
+    # Boundary half-edges (used by a single face) get a plane through the
+    # edge, perpendicular to the face.
+    half_a = triangles.reshape(-1)
+    half_b = np.roll(triangles, -1, axis=1).reshape(-1)
+    first, inverse = unique_rows(np.stack([np.minimum(half_a, half_b), np.maximum(half_a, half_b)], axis=1))
+    boundary = np.bincount(inverse, minlength=len(first))[inverse] == 1
+    if boundary.any():
+        a, b = half_a[boundary], half_b[boundary]
+        face = np.flatnonzero(boundary) // 3
+        edge = positions[b].astype(np.float64) - positions[a]
+        bn = np.cross(edge, unit[face])
+        length = np.linalg.norm(bn, axis=1)
+        bn = np.divide(bn, length[:, None], out=np.zeros_like(bn), where=length[:, None] > 0)
+        edge_q = _plane_quadrics(bn, positions[a].astype(np.float64), BOUNDARY_WEIGHT * np.einsum('ij,ij->i', edge, edge))
+        quadrics += _bincount16(a, edge_q, len(positions)) + _bincount16(b, edge_q, len(positions))
+
+    return quadrics.reshape(-1, 4, 4)
+
+
+def _quadric_error(q, points):
+    homogeneous = np.concatenate([points, np.ones((len(points), 1))], axis=1)
+    return np.einsum('ei,eij,ej->e', homogeneous, q, homogeneous)
+
+
+def _collapse_targets(q, pa, pb):
+    """Best position and error for collapsing each edge.
+
+    Uses the quadric minimizer where the 3x3 system is well conditioned,
+    and otherwise the best of the two endpoints and the midpoint.
+    """
+    candidates = [pa, pb, (pa + pb) / 2]
+    a = q[:, :3, :3]
+    det = np.linalg.det(a)
+    scale = np.trace(a, axis1=1, axis2=2) / 3
+    ok = np.abs(det) > 1e-9 * np.abs(scale) ** 3
+    if ok.any():
+        optimum = candidates[2].copy()
+        optimum[ok] = np.linalg.solve(a[ok], -q[ok, :3, 3][:, :, None])[:, :, 0]
+        candidates.append(optimum)
+
+    errors = np.stack([_quadric_error(q, c) for c in candidates])
+    if len(candidates) == 4:
+        errors[3, ~ok] = np.inf
+    best = np.argmin(errors, axis=0)
+    points = np.stack(candidates)[best, np.arange(len(best))]
+    return points, errors[best, np.arange(len(best))]
+
+
+def _face_normals(positions, triangles):
+    p = positions[triangles]
+    return np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+
+
+def simplify(positions, triangles, target_triangles):
+    """Quadric error metric edge-collapse simplification.
+
+    Each pass computes the collapse cost of every edge, picks a set of
+    cheapest edges that share no vertex (an edge is taken if it is the
+    cheapest one at both of its endpoints), rejects collapses that would
+    flip a neighbouring face, and collapses the rest at once. Passes repeat
+    until the triangle budget is met or no edge can be collapsed.
+
+    Returns compacted (positions, triangles).
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3).copy()
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    quadrics = _vertex_quadrics(positions, triangles)
+    n_vertices = len(positions)
+
+    while len(triangles) > target_triangles:
+        half_a = triangles.reshape(-1)
+        half_b = np.roll(triangles, -1, axis=1).reshape(-1)
+        edges = np.stack([np.minimum(half_a, half_b), np.maximum(half_a, half_b)], axis=1)
+        edges = edges[unique_rows(edges)[0]]
+        ea, eb = edges[:, 0], edges[:, 1]
+
+        q = quadrics[ea] + quadrics[eb]
+        points, cost = _collapse_targets(q, positions[ea], positions[eb])
+
+        # Rank edges by (cost, id); an edge wins if it has the best rank at
+        # both endpoints, which makes the chosen edges vertex-disjoint.
+        rank = np.empty(len(edges), dtype=np.int64)
+        rank[np.argsort(cost, kind='stable')] = np.arange(len(edges))
+        best = np.full(n_vertices, len(edges), dtype=np.int64)
+        np.minimum.at(best, ea, rank)
+        np.minimum.at(best, eb, rank)
+        chosen = np.flatnonzero((best[ea] == rank) & (best[eb] == rank))
+
+        # An interior collapse removes two faces; do not overshoot the budget.
+        budget = max(1, (len(triangles) - target_triangles + 1) // 2)
+        chosen = chosen[np.argsort(rank[chosen])][:budget]
+
+        old_normals = _face_normals(positions, triangles)
+        while len(chosen):
+            remap = np.arange(n_vertices)
+            remap[eb[chosen]] = ea[chosen]
+            moved = positions.copy()
+            moved[ea[chosen]] = points[chosen]
+            new_triangles = remap[triangles]
+
+            alive = ((new_triangles[:, 0] != new_triangles[:, 1]) & (new_triangles[:, 1] != new_triangles[:, 2])
+                     & (new_triangles[:, 2] != new_triangles[:, 0]))
+            new_normals = _face_normals(moved, new_triangles)
+            dots = np.einsum('ij,ij->i', new_normals, old_normals)
+            lengths = np.linalg.norm(new_normals, axis=1) * np.linalg.norm(old_normals, axis=1)
+            flipped = alive & (dots < FLIP_THRESHOLD * lengths)
+            if not flipped.any():
+                break
+
+            # Drop every chosen collapse that touches a flipped face.
+            bad = np.zeros(n_vertices, dtype=bool)
+            bad[new_triangles[flipped].reshape(-1)] = True
+            chosen = chosen[~bad[ea[chosen]]]
+
+        if len(chosen) == 0:
+            break
+
+        positions = moved
+        quadrics[ea[chosen]] = q[chosen]
+        triangles = new_triangles[alive]
+
+    used, compact = np.unique(triangles, return_inverse=True)
+    return positions[used].astype(np.float32), compact.reshape(-1, 3)
+
+
+def build_lod_chain(vertices, normals, indices, ratios=DEFAULT_LOD_RATIOS, crease_angle=None):
+    """Build a chain of simplified levels below an indexed base mesh.
+
+    Level 0 is the input itself; every further level targets ``ratio`` of
+    the base triangle count and is simplified from the previous level.
+    Simplified levels get freshly generated smooth normals. Returns a list
+    of (vertices, normals, indices) tuples, stopping early once the mesh
+    cannot be reduced further.
+    """
+    levels = [(vertices, normals, indices)]
+    base_triangles = len(indices) // 3
+    positions, triangles = weld_positions(vertices, indices)
+
+    for ratio in ratios:
+        target = int(base_triangles * ratio)
+        if target < MIN_LOD_TRIANGLES or target >= len(triangles):
+            break
+        positions, triangles = simplify(positions, triangles, target)
+        if len(triangles) >= len(levels[-1][2]) // 3:
+            break
+
+        level_normals, corner_normal = smooth_normals(positions, triangles, crease_angle=crease_angle)
+        keys = np.stack([triangles.reshape(-1), corner_normal.reshape(-1)], axis=1)
+        first, inverse = unique_rows(keys)
+        levels.append((positions[keys[first, 0]].reshape(-1),
+                       level_normals[keys[first, 1]].reshape(-1),
+                       inverse.astype(index_dtype(len(first)))))
+
+    return levels
+
+
+def bounding_sphere(vertices):
+    """Center and radius of a sphere enclosing all vertices (box-centered)"""
+    points = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    center = (points.min(axis=0) + points.max(axis=0)) / 2
+    radius = float(np.sqrt(((points - center) ** 2).sum(axis=1).max())) if len(points) else 0.0
+    return center, radius
+
+
+class LodSelector:
+    """Pick a level of detail from the projected size of a bounding sphere.
+
+    Level ``k + 1`` takes over once the sphere's projected radius drops
+    below ``base_pixels / 2**k`` pixels. To avoid flickering at a boundary, a
+    switch to a coarser level needs the size to fall ``hysteresis`` below
+    the threshold, and a switch back needs it to rise that much above.
+    """
+
+    def __init__(self, level_count, radius, base_pixels=240.0, hysteresis=0.15):
+        self.level_count = level_count
+        self.radius = radius
+        self.thresholds = [base_pixels / 2 ** k for k in range(level_count - 1)]
+        self.hysteresis = hysteresis
+        self.level = 0
+
+    def projected_radius(self, distance, projection, viewport_height):
+        """Sphere radius in pixels for a perspective ``projection`` matrix"""
+        if distance <= self.radius:
+            return math.inf
+        return self.radius * projection[1][1] * viewport_height / 2 / distance
+
+    def update(self, pixels):
+        level = self.level
+        # Coarsen while we are clearly below the threshold of the next level.
+        while level < self.level_count - 1 and pixels < self.thresholds[level] * (1 - self.hysteresis):
+            level += 1
+        # Refine while we are clearly above the threshold of the current level.
+        while level > 0 and pixels > self.thresholds[level - 1] * (1 + self.hysteresis):
+            level -= 1
+        self.level = level
+        return level
@@ -5,6 +5,21 @@ from OpenGL.GLU import *
 import numpy as np
 import math
 
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.shader import Program
+from common.vertex_format import Attribute, VertexLayout, create_vertex_buffer, set_dequantization
+
+from obj_loader import parse_obj_parallel, index_vertices
+from mesh_cache import load_cached_mesh, load_cached_lods, optimize_level
+from lod import DEFAULT_LOD_RATIOS, LodSelector, bounding_sphere
+
+# One interleaved 12-byte vertex instead of two float32 buffers (24 bytes)
+VERTEX_LAYOUT = VertexLayout([
+    Attribute('position', 0, 3, 'snorm16'),
+    Attribute('normal', 1, 3, 'int_2_10_10_10_rev'),
+])
+
 class Camera:
     def __init__(self):
         self.position = np.array([0.0, 2.0, 5.0])
@@ -75,47 +90,29 @@ class Camera:
 
 class ModelLoader:
     @staticmethod
-    def load_obj(filename):
-        vertices = []
-        normals = []
-        faces = []
-        
-        temp_vertices = []
-        temp_normals = []
+    def load_obj(filename, use_cache=True, workers=None, crease_angle=None, optimize=True):
+        try:
+            if use_cache:
+                return load_cached_mesh(filename, workers=workers, crease_angle=crease_angle, optimize=optimize)
+            mesh = parse_obj_parallel(filename, workers).indexed(crease_angle=crease_angle)
+            return optimize_level(0, *mesh) if optimize else mesh
         
+        except FileNotFoundError:
+            print(f"Model file {filename} not found. Creating default cube.")
+            return index_vertices(*ModelLoader.create_cube())
+    
+    @staticmethod
+    def load_obj_lods(filename, workers=None, crease_angle=None, lod_ratios=DEFAULT_LOD_RATIOS, optimize=True,
+                      layout=None):
+        """Load a model plus its simplified levels of detail (finest first).
+        With ``layout`` the cached levels also carry their packed vertices."""
         try:
-            with open(filename, 'r') as f:
-                for line in f:
-                    if line.startswith('v '):
-                        parts = line.split()
-                        temp_vertices.append([float(parts[1]), float(parts[2]), float(parts[3])])
-                    elif line.startswith('vn '):
-                        parts = line.split()
-                        temp_normals.append([float(parts[1]), float(parts[2]), float(parts[3])])
-                    elif line.startswith('f '):
-                        parts = line.split()[1:]
-                        face = []
-                        for part in parts:
-                            indices = part.split('/')
-                            v_idx = int(indices[0]) - 1
-                            n_idx = int(indices[2]) - 1 if len(indices) > 2 and indices[2] else v_idx
-                            face.append((v_idx, n_idx))
-                        faces.append(face)
-            
-            # Build vertex data with normals
-            for face in faces:
-                for v_idx, n_idx in face:
-                    vertices.extend(temp_vertices[v_idx])
-                    if n_idx < len(temp_normals):
-                        normals.extend(temp_normals[n_idx])
-                    else:
-                        normals.extend([0.0, 1.0, 0.0])
-            
-            return np.array(vertices, dtype=np.float32), np.array(normals, dtype=np.float32)
+            return load_cached_lods(filename, workers=workers, crease_angle=crease_angle, lod_ratios=lod_ratios,
+                                    optimize=optimize, layout=layout)
         
         except FileNotFoundError:
             print(f"Model file {filename} not found. Creating default cube.")
-            return ModelLoader.create_cube()
+            return [index_vertices(*ModelLoader.create_cube())]
     
     @staticmethod
     def create_cube():
@@ -189,27 +186,26 @@ def create_shader_program():
     glDeleteShader(vertex_shader)
     glDeleteShader(fragment_shader)
     
-    return program
+    return Program(program)
 
-def setup_model(vertices, normals):
+def setup_model(vertices, normals, indices, data=None, dequant=None):
     vao = glGenVertexArrays(1)
     glBindVertexArray(vao)
     
-    vbo_vertices = glGenBuffers(1)
-    glBindBuffer(GL_ARRAY_BUFFER, vbo_vertices)
-    glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
-    glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
-    glEnableVertexAttribArray(0)
+    # Cached levels arrive packed (memory-mapped); only the fallback cube is packed here
+    if data is None:
+        data, dequant = VERTEX_LAYOUT.pack(position=vertices, normal=normals)
+    create_vertex_buffer(VERTEX_LAYOUT, data)
     
-    vbo_normals = glGenBuffers(1)
-    glBindBuffer(GL_ARRAY_BUFFER, vbo_normals)
-    glBufferData(GL_ARRAY_BUFFER, normals.nbytes, normals, GL_STATIC_DRAW)
-    glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 0, None)
-    glEnableVertexAttribArray(1)
+    # Index buffer: shared corners are stored once and hit the post-transform cache
+    ebo = glGenBuffers(1)
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ebo)
+    glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
     
     glBindVertexArray(0)
     
-    return vao, len(vertices) // 3
+    index_type = GL_UNSIGNED_SHORT if indices.dtype == np.uint16 else GL_UNSIGNED_INT
+    return vao, len(indices), index_type, dequant
 
 def main():
     pygame.init()
@@ -227,9 +223,14 @@ def main():
     # Create shader program
     shader_program = create_shader_program()
     
-    # Load model (tries to load model.obj, falls back to cube)
-    vertices, normals = ModelLoader.load_obj('model.obj')
-    vao, vertex_count = setup_model(vertices, normals)
+    # Load model and its LOD chain (tries to load model.obj, falls back to cube)
+    levels = ModelLoader.load_obj_lods('model.obj', layout=VERTEX_LAYOUT)
+    lods = [setup_model(*level) for level in levels]
+    
+    # LOD selection from the model's projected bounding sphere
+    model_center, model_radius = bounding_sphere(levels[0][0])
+    lod_selector = LodSelector(len(lods), model_radius)
+    current_lod = None
     
     # Setup camera
     camera = Camera()
@@ -280,7 +281,7 @@ def main():
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         glClearColor(0.1, 0.1, 0.15, 1.0)
         
-        glUseProgram(shader_program)
+        shader_program.use()
         
         # Update rotation
         rotation_angle += 20.0 * delta_time
@@ -292,27 +293,34 @@ def main():
         # View matrix
         view = camera.get_view_matrix().astype(np.float32)
         
-        # Set uniforms
-        model_loc = glGetUniformLocation(shader_program, "model")
-        view_loc = glGetUniformLocation(shader_program, "view")
-        proj_loc = glGetUniformLocation(shader_program, "projection")
+        # Choose the level of detail for this frame
+        world_center = (model @ np.append(model_center, 1.0))[:3]
+        distance = np.linalg.norm(camera.position - world_center)
+        lod = lod_selector.update(lod_selector.projected_radius(distance, projection, display[1]))
+        vao, index_count, index_type, dequant = lods[lod]
+        if lod != current_lod:
+            current_lod = lod
+            pygame.display.set_caption(f"3D Model with Phong Lighting - LOD {lod} ({index_count // 3} triangles)")
         
-        glUniformMatrix4fv(model_loc, 1, GL_TRUE, model)
-        glUniformMatrix4fv(view_loc, 1, GL_TRUE, view)
-        glUniformMatrix4fv(proj_loc, 1, GL_TRUE, projection)
+        # Set uniforms; the program skips values that have not changed
+        # (projection, the dequantization unless the LOD switched, lighting)
+        shader_program.set('model', model)
+        shader_program.set('view', view)
+        shader_program.set('projection', projection)
+        set_dequantization(shader_program, dequant)
         
         # Lighting uniforms
-        glUniform3fv(glGetUniformLocation(shader_program, "lightPos"), 1, light_pos)
-        glUniform3fv(glGetUniformLocation(shader_program, "viewPos"), 1, camera.position.astype(np.float32))
-        glUniform3fv(glGetUniformLocation(shader_program, "lightColor"), 1, light_color)
-        glUniform3fv(glGetUniformLocation(shader_program, "objectColor"), 1, object_color)
-        glUniform1f(glGetUniformLocation(shader_program, "ambientStrength"), ambient_strength)
-        glUniform1f(glGetUniformLocation(shader_program, "specularStrength"), specular_strength)
-        glUniform1f(glGetUniformLocation(shader_program, "shininess"), shininess)
+        shader_program.set('lightPos', light_pos)
+        shader_program.set('viewPos', camera.position)
+        shader_program.set('lightColor', light_color)
+        shader_program.set('objectColor', object_color)
+        shader_program.set('ambientStrength', ambient_strength)
+        shader_program.set('specularStrength', specular_strength)
+        shader_program.set('shininess', shininess)
         
         # Draw model
         glBindVertexArray(vao)
-        glDrawArrays(GL_TRIANGLES, 0, vertex_count)
+        glDrawElements(GL_TRIANGLES, index_count, index_type, None)
         glBindVertexArray(0)
         
         pygame.display.flip()
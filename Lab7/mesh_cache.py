@@ -0,0 +1,119 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.cache import ArrayCache, content_hash, file_signature
+
+from lod import DEFAULT_LOD_RATIOS, build_lod_chain
+from mesh_optimize import optimize_mesh
+from obj_loader import parse_obj_parallel
+
+# Bump whenever the cooked mesh layout or the loader's output changes, so
+# stale cache entries are rebuilt instead of being reused.
+MESH_VERSION = 5
+
+
+def load_cached_mesh(filename, cache=None, workers=None, crease_angle=None, optimize=True):
+    """Load an indexed OBJ mesh through the on-disk binary cache.
+
+    Returns (vertices, normals, indices) like ``ObjData.indexed()``. On a
+    hit the arrays are memory-mapped views of the cache entry. An entry is
+    reused when the source path, size and mtime still match; if only the
+    mtime changed, the content hash decides. Otherwise the OBJ file is
+    parsed again (see ``parse_obj_parallel`` for ``workers``) and the entry
+    rewritten. ``crease_angle`` is passed to normal generation and is part
+    of the entry's identity. With ``optimize`` the mesh goes through
+    ``mesh_optimize.optimize_mesh`` before it is stored.
+    """
+    return load_cached_lods(filename, cache, workers, crease_angle, lod_ratios=(), optimize=optimize)[0]
+
+
+def load_cached_lods(filename, cache=None, workers=None, crease_angle=None, lod_ratios=DEFAULT_LOD_RATIOS,
+                     optimize=True, layout=None):
+    """Like ``load_cached_mesh`` but returns the whole LOD chain.
+
+    The simplified levels from ``lod.build_lod_chain`` are stored in the
+    same cache entry as the base mesh, so they are only built once per
+    model and LOD configuration.
+
+    With a ``common.vertex_format.VertexLayout`` (attributes ``position``
+    and ``normal``), every level is also stored packed in that layout and
+    returned as (vertices, normals, indices, data, dequant), so a hit can
+    upload the mapped ``data`` without quantizing the mesh again.
+    """
+    cache = cache or ArrayCache()
+    signature = file_signature(filename)
+    key = 'mesh:' + signature['path']
+    if lod_ratios:
+        key += ':lod=' + ','.join(str(r) for r in lod_ratios)
+
+    digest = None
+    entry = cache.load(key)
+    if entry is not None:
+        meta, arrays = entry
+        if (meta.get('mesh_version') == MESH_VERSION and meta.get('crease_angle') == crease_angle
+                and meta.get('optimized') == optimize and meta.get('layout') == layout_signature(layout)
+                and meta['size'] == signature['size']):
+            if meta['mtime_ns'] != signature['mtime_ns']:
+                # Touched but possibly unchanged (checkout, copy): compare contents.
+                # On a match only the mtime is recorded, in the entry's sidecar,
+                # since the mapped entry itself cannot be replaced on Windows.
+                digest = content_hash(filename)
+                if digest == meta['hash']:
+                    cache.update_meta(key, mtime_ns=signature['mtime_ns'])
+                else:
+                    arrays = None
+            if arrays is not None:
+                return [cached_level(arrays, k, meta['dequant']) for k in range(meta['levels'])]
+        # Release the mapping before the entry is rewritten below.
+        entry = arrays = None
+
+    levels = [parse_obj_parallel(filename, workers).indexed(crease_angle=crease_angle)]
+    if lod_ratios:
+        levels = build_lod_chain(*levels[0], ratios=lod_ratios, crease_angle=crease_angle)
+    if optimize:
+        levels = [optimize_level(k, *level) for k, level in enumerate(levels)]
+    if layout is not None:
+        levels = [level + layout.pack(position=level[0], normal=level[1]) for level in levels]
+
+    dequant_names = sorted(levels[0][4]) if layout is not None else None
+    meta = dict(signature, mesh_version=MESH_VERSION, crease_angle=crease_angle, optimized=optimize,
+                layout=layout_signature(layout), dequant=dequant_names, levels=len(levels),
+                hash=digest or content_hash(filename))
+    arrays = {}
+    for k, level in enumerate(levels):
+        vertices, normals, indices = level[:3]
+        arrays.update({f'lod{k}_vertices': vertices, f'lod{k}_normals': normals, f'lod{k}_indices': indices})
+        if layout is not None:
+            data, dequant = level[3:]
+            arrays[f'lod{k}_packed'] = data
+            # (2, components): scale row, offset row
+            arrays.update({f'lod{k}_dequant_{name}': np.stack(dequant[name]) for name in dequant_names})
+    cache.store(key, meta, arrays)
+    return levels
+
+
+def layout_signature(layout):
+    """JSON-able identity of a vertex layout (None for unpacked entries)"""
+    if layout is None:
+        return None
+    return [[a.name, a.location, a.components, a.format] for a in layout.attributes]
+
+
+def cached_level(arrays, level, dequant_names):
+    """One level of a cache entry, with its packed vertices if it has them"""
+    mesh = (arrays[f'lod{level}_vertices'], arrays[f'lod{level}_normals'], arrays[f'lod{level}_indices'])
+    if dequant_names is None:
+        return mesh
+    dequant = {name: tuple(arrays[f'lod{level}_dequant_{name}']) for name in dequant_names}
+    return mesh + (arrays[f'lod{level}_packed'], dequant)
+
+
+def optimize_level(level, vertices, normals, indices):
+    """Run the vertex cache / overdraw / fetch pass and report the result"""
+    vertices, normals, indices, report = optimize_mesh(vertices, normals, indices)
+    print(f"LOD {level}: ACMR {report['acmr_before']:.3f} -> {report['acmr_after']:.3f}, "
+          f"ATVR {report['atvr_before']:.3f} -> {report['atvr_after']:.3f}")
+    return vertices, normals, indices
@@ -0,0 +1,108 @@
+import numpy as np
+
+DEFAULT_NORMAL = (0.0, 1.0, 0.0)
+
+
+def face_normals(positions, triangles):
+    """Unnormalized face normals; their length is twice the triangle area"""
+    p0 = positions[triangles[:, 0]]
+    return np.cross(positions[triangles[:, 1]] - p0, positions[triangles[:, 2]] - p0)
+
+
+def corner_weights(positions, triangles, weighting='area'):
+    """Weighted normal contribution of every triangle corner, shape (n, 3, 3).
+
+    ``'area'`` weights each face by its area, ``'angle'`` by the interior
+    angle at the corner, which is independent of how a surface is split
+    into triangles.
+    """
+    n = face_normals(positions, triangles).astype(np.float64)
+    if weighting == 'area':
+        return np.repeat(n[:, None, :], 3, axis=1)
+    if weighting != 'angle':
+        raise ValueError(f"Unknown normal weighting: {weighting}")
+
+    # |a x b| is twice the triangle area at every corner, so only the dot
+    # products differ between the three corner angles.
+    double_area = np.linalg.norm(n, axis=1)
+    unit = np.divide(n, double_area[:, None], out=np.zeros_like(n), where=double_area[:, None] > 0)
+
+    p = positions[triangles].astype(np.float64)
+    edges = np.roll(p, -1, axis=1) - p   # p1-p0, p2-p1, p0-p2
+    dots = -np.einsum('ijk,ijk->ij', edges, np.roll(edges, 1, axis=1))
+    angles = np.arctan2(double_area[:, None], dots)
+    return unit[:, None, :] * angles[:, :, None]
+
+
+def _normalize(v):
+    length = np.linalg.norm(v, axis=1, keepdims=True)
+    out = np.empty(v.shape, dtype=np.float32)
+    ok = length[:, 0] > 0
+    out[ok] = v[ok] / length[ok]
+    out[~ok] = DEFAULT_NORMAL
+    return out
+
+
+def _accumulate(index, values, size):
+    """Sum (n, 3) ``values`` into ``size`` buckets given by ``index``"""
+    return np.stack([np.bincount(index, weights=values[:, k], minlength=size) for k in range(3)], axis=1)
+
+
+def smooth_normals(positions, triangles, weighting='area', crease_angle=None):
+    """Generate smooth vertex normals for an indexed triangle mesh.
+
+    Returns ``(normals, corner_normal)``: a float32 (m, 3) normal array and,
+    for every triangle corner, the index of its normal. Without a crease
+    angle there is one normal per position. With ``crease_angle`` (degrees),
+    a corner only averages the faces around its vertex whose normals are
+    within that angle of its own face, so hard edges get split normals.
+    """
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    weights = corner_weights(positions, triangles, weighting)
+
+    corner_v = triangles.reshape(-1)
+    contrib = weights.reshape(-1, 3)
+    vertex_normals = _normalize(_accumulate(corner_v, contrib, len(positions)))
+    if crease_angle is None or len(triangles) == 0:
+        return vertex_normals, triangles.copy()
+
+    unit_face = _normalize(face_normals(positions, triangles).astype(np.float64))
+    corner_face = np.repeat(unit_face, 3, axis=0)
+    cos_crease = np.cos(np.radians(crease_angle))
+
+    # A vertex whose faces all lie within half the crease angle of its smooth
+    # normal has every pair within the crease angle, so it needs no split.
+    dots = np.einsum('ij,ij->i', corner_face, vertex_normals[corner_v])
+    sharp_vertex = np.zeros(len(positions), dtype=bool)
+    sharp_vertex[corner_v[dots < np.cos(np.radians(crease_angle) / 2)]] = True
+    sharp = np.flatnonzero(sharp_vertex[corner_v])
+    if len(sharp) == 0:
+        return vertex_normals, triangles.copy()
+
+    # Pair every sharp corner with all corners around the same vertex.
+    order = sharp[np.argsort(corner_v[sharp], kind='stable')]
+    v_sorted = corner_v[order]
+    group_start = np.flatnonzero(np.concatenate([[True], v_sorted[1:] != v_sorted[:-1]]))
+    group_size = np.diff(np.append(group_start, len(order)))
+    size_of = np.repeat(group_size, group_size)
+    start_of = np.repeat(group_start, group_size)
+
+    pair_i = np.repeat(np.arange(len(order)), size_of)
+    pair_offset = np.arange(len(pair_i)) - np.repeat(np.cumsum(size_of) - size_of, size_of)
+    pair_j = np.repeat(start_of, size_of) + pair_offset
+
+    ci, cj = order[pair_i], order[pair_j]
+    within = np.einsum('ij,ij->i', corner_face[ci], corner_face[cj]) >= cos_crease
+    split = _normalize(_accumulate(pair_i[within], contrib[cj[within]], len(order)))
+
+    # Corners of one smoothing group end up with identical normals; weld
+    # them per vertex so they share a single entry.
+    keys = np.concatenate([v_sorted[:, None].astype(np.int64),
+                           split.view(np.int32).astype(np.int64)], axis=1)
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    normals = np.concatenate([vertex_normals, split[first]])
+
+    corner_normal = corner_v.copy()
+    corner_normal[order] = len(vertex_normals) + inverse.reshape(-1)
+    return normals, corner_normal.reshape(-1, 3)
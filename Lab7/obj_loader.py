@@ -0,0 +1,477 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from normals import smooth_normals
+
+# Bytes read from disk per parsing step; large enough that the NumPy passes
+# dominate, small enough that the per-byte temporaries (about 15x the block)
+# stay modest.
+BLOCK_SIZE = 2 * 1024 * 1024
+
+# Files smaller than this parse faster serially than a process pool starts up.
+PARALLEL_MIN_SIZE = 32 * 1024 * 1024
+
+NEWLINE = ord('\n')
+SPACE = ord(' ')
+SLASH = ord('/')
+HASH = ord('#')
+
+
+class ObjData:
+    """Raw OBJ contents: attribute pools plus per-corner indices into them.
+
+    Corner indices are 0-based and already resolved (negative OBJ indices are
+    turned into absolute ones); a missing texcoord/normal index is -1.
+    """
+
+    def __init__(self, positions, texcoords, normals, corner_v, corner_vt, corner_vn, face_sizes):
+        self.positions = positions
+        self.texcoords = texcoords
+        self.normals = normals
+        self.corner_v = corner_v
+        self.corner_vt = corner_vt
+        self.corner_vn = corner_vn
+        self.face_sizes = face_sizes
+
+    def corner_normals(self, weighting='area', crease_angle=None):
+        """Normal pool plus the index of every face corner's normal in it.
+
+        Corners with a valid ``vn`` index use the file's normals. When some
+        corners have none, smooth normals are generated for the whole
+        triangulated mesh (see ``normals.smooth_normals``) and appended to
+        the pool for those corners.
+        """
+        missing = (self.corner_vn < 0) | (self.corner_vn >= len(self.normals))
+        if not missing.any():
+            return self.normals, self.corner_vn
+
+        tris = self.triangles()
+        generated, tri_normal = smooth_normals(self.positions, self.corner_v[tris], weighting, crease_angle)
+        # Corners of degenerate faces belong to no triangle; the generated
+        # pool starts with one smooth normal per position, so use that.
+        generated_of_corner = self.corner_v.copy()
+        generated_of_corner[tris.reshape(-1)] = tri_normal.reshape(-1)
+
+        corner_n = self.corner_vn.copy()
+        corner_n[missing] = len(self.normals) + generated_of_corner[missing]
+        return np.concatenate([self.normals, generated]), corner_n
+
+    def deindex(self, crease_angle=None):
+        """Expand every face corner into flat float32 position/normal arrays"""
+        vertices = self.positions[self.corner_v]
+        normal_pool, corner_n = self.corner_normals(crease_angle=crease_angle)
+        return vertices.reshape(-1), normal_pool[corner_n].reshape(-1)
+
+    def triangles(self):
+        """Fan-triangulate every face, returning (n, 3) corner numbers"""
+        return triangulate(self.face_sizes)
+
+    def indexed(self, use_texcoords=False, crease_angle=None):
+        """Build a unique-vertex mesh plus a triangle index buffer.
+
+        Corners are deduplicated on their (position, normal[, texcoord])
+        index tuple, so shared corners are stored and shaded only once.
+        Returns flat float32 positions and normals (plus texcoords when
+        ``use_texcoords`` is set) and a uint16/uint32 index array.
+        """
+        corners = self.triangles().reshape(-1)
+        normal_pool, corner_n = self.corner_normals(crease_angle=crease_angle)
+
+        keys = [self.corner_v, corner_n]
+        if use_texcoords:
+            keys.append(self.corner_vt)
+        keys = np.stack(keys, axis=1)[corners]
+
+        first, inverse = unique_rows(keys)
+        unique = keys[first]
+        vertices = self.positions[unique[:, 0]].reshape(-1)
+        normals = normal_pool[unique[:, 1]].reshape(-1)
+        indices = inverse.astype(index_dtype(len(first)))
+
+        if use_texcoords:
+            texcoords = np.zeros((len(first), 2), dtype=np.float32)
+            has_uv = unique[:, 2] >= 0
+            texcoords[has_uv] = self.texcoords[unique[has_uv, 2]]
+            return vertices, normals, texcoords.reshape(-1), indices
+        return vertices, normals, indices
+
+
+def triangulate(face_sizes):
+    """Fan-triangulate polygons given their corner counts.
+
+    Returns an (n, 3) array of corner numbers (positions in the flat corner
+    list), so triangles stay in file order.
+    """
+    face_sizes = np.asarray(face_sizes, dtype=np.int64)
+    tri_counts = np.maximum(face_sizes - 2, 0)
+    face_start = np.cumsum(face_sizes) - face_sizes
+    tri_face = np.repeat(np.arange(len(face_sizes)), tri_counts)
+    # Position of each triangle within its fan: 1 .. size-2
+    fan = np.arange(len(tri_face)) - np.repeat(np.cumsum(tri_counts) - tri_counts, tri_counts) + 1
+    first = face_start[tri_face]
+    return np.stack([first, first + fan, first + fan + 1], axis=1)
+
+
+def unique_rows(rows):
+    """Deduplicate the rows of an (n, k) integer array.
+
+    Returns the index of the first occurrence of every distinct row (in order
+    of first appearance, which keeps the vertex order close to the file's)
+    and, for every input row, the number of its distinct row.
+    """
+    rows = np.asarray(rows)
+    if len(rows) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # Pack the row into one int64 when the value ranges allow it; a single
+    # argsort is several times faster than a multi-key lexsort.
+    lo = rows.min(axis=0).astype(np.int64)
+    dims = rows.max(axis=0).astype(np.int64) - lo + 1
+    if np.prod(dims.astype(object)) < 2 ** 62:
+        key = np.ravel_multi_index((rows - lo).T, dims)
+        order = np.argsort(key, kind='stable')
+        sorted_key = key[order]
+        boundary = sorted_key[1:] != sorted_key[:-1]
+    else:
+        order = np.lexsort(rows.T[::-1])
+        sorted_rows = rows[order]
+        boundary = np.any(sorted_rows[1:] != sorted_rows[:-1], axis=1)
+
+    group = np.concatenate([[0], np.cumsum(boundary)])
+    # Stable sort: the first row of each group is its earliest occurrence.
+    group_first = order[np.concatenate([[0], np.flatnonzero(boundary) + 1])]
+
+    # Renumber groups by first appearance.
+    by_first = np.argsort(group_first)
+    rank = np.empty_like(by_first)
+    rank[by_first] = np.arange(len(by_first))
+
+    inverse = np.empty(len(rows), dtype=np.int64)
+    inverse[order] = rank[group]
+    return group_first[by_first], inverse
+
+
+def index_dtype(vertex_count):
+    """Smallest GL index type that can address ``vertex_count`` vertices"""
+    return np.uint16 if vertex_count <= 0xFFFF + 1 else np.uint32
+
+
+def index_vertices(vertices, normals):
+    """Weld identical (position, normal) pairs of a de-indexed triangle list.
+
+    Returns unique flat float32 positions and normals plus an index buffer
+    that reproduces the input triangles.
+    """
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    normals = np.asarray(normals, dtype=np.float32).reshape(-1, 3)
+    # Compare bit patterns, so the weld is exact.
+    bits = np.concatenate([vertices, normals], axis=1).view(np.int32)
+    first, inverse = unique_rows(bits)
+    return (vertices[first].reshape(-1), normals[first].reshape(-1),
+            inverse.astype(index_dtype(len(first))))
+
+
+class _Block:
+    """Parse result for one newline-aligned byte range of an OBJ file.
+
+    Negative (relative) OBJ indices are stored relative to the start of the
+    block and flagged in ``relative``, so the caller can add
+    the number of records that precede the block once it is known.
+    """
+
+    def __init__(self, positions, texcoords, normals, corners, relative, face_sizes):
+        self.positions = positions
+        self.texcoords = texcoords
+        self.normals = normals
+        self.corners = corners
+        self.relative = relative
+        self.face_sizes = face_sizes
+
+    def counts(self):
+        return np.array([len(self.positions), len(self.texcoords), len(self.normals)], dtype=np.int64)
+
+
+def _line_layout(buf):
+    """Start offsets and lengths (including the newline) of every line"""
+    ends = np.flatnonzero(buf == NEWLINE)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    return starts, ends - starts + 1
+
+
+def _extract_lines(buf, starts, lengths, selected, prefix_len):
+    """Copy the selected lines out of ``buf`` with their record tag blanked"""
+    text = buf[np.repeat(selected, lengths)]
+    sel_lengths = lengths[selected]
+    sel_starts = np.cumsum(sel_lengths) - sel_lengths
+    for k in range(prefix_len):
+        text[sel_starts + k] = SPACE
+
+    # Strip trailing comments, keeping the newline so lines stay separate.
+    is_hash = text == HASH
+    if is_hash.any():
+        seen = np.cumsum(is_hash, dtype=np.int64)
+        before_line = seen[sel_starts] - is_hash[sel_starts]
+        inside = (seen - np.repeat(before_line, sel_lengths)) > 0
+        text[inside & (text != NEWLINE)] = SPACE
+
+    return text
+
+
+def _token_starts(text):
+    """Offsets of the first byte of every whitespace-separated token"""
+    is_space = text <= SPACE
+    starts = ~is_space
+    starts[1:] &= is_space[:-1]
+    return np.flatnonzero(starts)
+
+
+def _parse_floats(text, n_lines, width):
+    """Parse one record type into an (n_lines, width) float32 array.
+
+    Extra components (``v x y z w`` or vertex colours) are dropped and missing
+    ones are zero-filled, like taking the first ``width`` fields of each line.
+    """
+    if n_lines == 0:
+        return np.zeros((0, width), dtype=np.float32)
+
+    values = np.fromstring(text.tobytes(), dtype=np.float64, sep=' ')
+    if len(values) == n_lines * width:
+        return values.astype(np.float32).reshape(n_lines, width)
+
+    line_ends = np.flatnonzero(text == NEWLINE)
+    per_line = np.bincount(np.searchsorted(line_ends, _token_starts(text)), minlength=n_lines)
+    offsets = np.cumsum(per_line) - per_line
+    out = np.zeros((n_lines, width), dtype=np.float32)
+    for k in range(width):
+        has = per_line > k
+        out[has, k] = values[offsets[has] + k]
+    return out
+
+
+def _parse_faces(text, n_lines, before):
+    """Parse face records into per-corner (v, vt, vn) indices.
+
+    ``before`` holds, for every face line, how many v/vt/vn records precede
+    it inside the block; it is used to resolve negative indices.
+    """
+    if n_lines == 0:
+        empty = np.zeros((3, 0), dtype=np.int64)
+        return empty, empty.astype(bool), np.zeros(0, dtype=np.int32)
+
+    # Make every slot explicit: "1//3" -> "1/0/3", "1/2/" -> "1/2/0".
+    data = text.tobytes().replace(b'//', b'/0/')
+    for ws in (b' ', b'\t', b'\r', b'\n'):
+        data = data.replace(b'/' + ws, b'/0' + ws)
+    text = np.frombuffer(data, dtype=np.uint8).copy()
+
+    line_ends = np.flatnonzero(text == NEWLINE)
+    corner_pos = _token_starts(text)
+    face_sizes = np.bincount(np.searchsorted(line_ends, corner_pos), minlength=n_lines).astype(np.int32)
+
+    # Components per corner: 1 + number of slashes inside the token.
+    slash_pos = np.flatnonzero(text == SLASH)
+    slashes = np.bincount(np.searchsorted(corner_pos, slash_pos, side='right') - 1, minlength=len(corner_pos))
+    comps = slashes + 1
+
+    text[slash_pos] = SPACE
+    values = np.fromstring(text.tobytes(), dtype=np.int64, sep=' ')
+    if len(values) != comps.sum():
+        raise ValueError("Malformed face record in OBJ file")
+
+    offsets = np.cumsum(comps) - comps
+    corners = np.zeros((3, len(comps)), dtype=np.int64)
+    for k in range(3):
+        has = comps > k
+        corners[k, has] = values[offsets[has] + k]
+
+    # OBJ indices are 1-based; negative ones count back from the last record
+    # defined so far, and 0 marks an absent slot.
+    relative = corners < 0
+    missing = corners == 0
+    corners[corners > 0] -= 1
+    corners[missing] = -1
+    corner_before = np.repeat(before, face_sizes, axis=1)
+    corners[relative] += corner_before[relative]
+
+    return corners, relative, face_sizes
+
+
+def _parse_block(data):
+    """Parse a newline-terminated chunk of OBJ text into NumPy arrays"""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    starts, lengths = _line_layout(buf)
+
+    # Classify lines by their first three bytes ("v ", "vt ", "vn ", "f ").
+    padded = np.concatenate([buf, np.zeros(3, dtype=np.uint8)])
+    c0, c1, c2 = padded[starts], padded[starts + 1], padded[starts + 2]
+    sep1 = (c1 == SPACE) | (c1 == ord('\t'))
+    sep2 = (c2 == SPACE) | (c2 == ord('\t'))
+    is_v = (c0 == ord('v')) & sep1
+    is_vt = (c0 == ord('v')) & (c1 == ord('t')) & sep2
+    is_vn = (c0 == ord('v')) & (c1 == ord('n')) & sep2
+    is_f = (c0 == ord('f')) & sep1
+
+    positions = _parse_floats(_extract_lines(buf, starts, lengths, is_v, 1), int(is_v.sum()), 3)
+    texcoords = _parse_floats(_extract_lines(buf, starts, lengths, is_vt, 2), int(is_vt.sum()), 2)
+    normals = _parse_floats(_extract_lines(buf, starts, lengths, is_vn, 2), int(is_vn.sum()), 3)
+
+    # Records of each kind seen before every line, for relative indices.
+    before = np.stack([np.cumsum(m) - m for m in (is_v, is_vt, is_vn)])[:, is_f]
+    corners, relative, face_sizes = _parse_faces(
+        _extract_lines(buf, starts, lengths, is_f, 1), int(is_f.sum()), before)
+
+    return _Block(positions, texcoords, normals, corners, relative, face_sizes)
+
+
+def _read_blocks(filename, block_size, start=0, end=None):
+    """Yield newline-terminated chunks of roughly ``block_size`` bytes.
+
+    ``start``/``end`` restrict reading to a byte range that is already
+    aligned to line boundaries.
+    """
+    tail = b''
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        remaining = float('inf') if end is None else end - start
+        while remaining > 0:
+            chunk = f.read(int(min(block_size, remaining)))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            data = tail + chunk
+            cut = data.rfind(b'\n') + 1
+            tail = data[cut:]
+            if cut:
+                yield data[:cut]
+    if tail.strip():
+        yield tail + b'\n'
+
+
+def _concat_blocks(blocks):
+    """Join consecutive blocks into one.
+
+    Relative indices of each block are shifted by the records of the blocks
+    before it, so they end up relative to the start of the first block.
+    """
+    base = np.zeros(3, dtype=np.int64)
+    for block in blocks:
+        for k in range(3):
+            block.corners[k, block.relative[k]] += base[k]
+        base += block.counts()
+
+    def cat(arrays, shape, dtype, axis=0):
+        arrays = [a for a in arrays if a.shape[axis]]
+        return np.concatenate(arrays, axis=axis) if arrays else np.zeros(shape, dtype=dtype)
+
+    return _Block(
+        cat([b.positions for b in blocks], (0, 3), np.float32),
+        cat([b.texcoords for b in blocks], (0, 2), np.float32),
+        cat([b.normals for b in blocks], (0, 3), np.float32),
+        cat([b.corners for b in blocks], (3, 0), np.int64, axis=1),
+        cat([b.relative for b in blocks], (3, 0), bool, axis=1),
+        cat([b.face_sizes for b in blocks], (0,), np.int32),
+    )
+
+
+def _to_obj_data(block):
+    """Wrap a block that starts at the beginning of the file as ObjData"""
+    return ObjData(block.positions, block.texcoords, block.normals,
+                   block.corners[0], block.corners[1], block.corners[2], block.face_sizes)
+
+
+def parse_obj(filename, block_size=BLOCK_SIZE):
+    """Parse an OBJ file in large blocks with bulk NumPy operations"""
+    return _to_obj_data(_concat_blocks([_parse_block(data) for data in _read_blocks(filename, block_size)]))
+
+
+def _chunk_bounds(filename, count):
+    """Split a file into ``count`` byte ranges that end on line boundaries"""
+    size = os.path.getsize(filename)
+    bounds = [0]
+    with open(filename, 'rb') as f:
+        for i in range(1, count):
+            pos = size * i // count
+            if pos <= bounds[-1]:
+                continue
+            # Finish the line that contains ``pos``; it belongs to this chunk.
+            f.seek(pos - 1)
+            f.readline()
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+_BLOCK_FIELDS = ('positions', 'texcoords', 'normals', 'corners', 'relative', 'face_sizes')
+
+
+def _parse_range(args):
+    """Worker: parse one byte range and publish the arrays in shared memory.
+
+    Only the segment name and the array layout travel back through the pool's
+    pipe; the parent copies the data out and unlinks the segment.
+    """
+    filename, start, end = args
+    block = _concat_blocks([_parse_block(data) for data in _read_blocks(filename, BLOCK_SIZE, start, end)])
+
+    arrays = [np.ascontiguousarray(getattr(block, name)) for name in _BLOCK_FIELDS]
+    layout = []
+    offset = 0
+    for a in arrays:
+        layout.append((a.dtype.str, a.shape, offset))
+        offset += (a.nbytes + 63) // 64 * 64
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    try:
+        for a, (dtype, shape, off) in zip(arrays, layout):
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off)[...] = a
+    finally:
+        shm.close()
+    return shm.name, layout
+
+
+def _collect_range(name, layout):
+    """Copy a worker's arrays out of shared memory and free the segment"""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        arrays = [np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off).copy()
+                  for dtype, shape, off in layout]
+    finally:
+        shm.close()
+        shm.unlink()
+    return _Block(*arrays)
+
+
+def parse_obj_parallel(filename, workers=None, min_size=PARALLEL_MIN_SIZE):
+    """Parse an OBJ file with a process pool, one line-aligned byte range per task.
+
+    Each worker runs the same block parser as ``parse_obj`` and hands its
+    arrays back through shared memory. Relative (negative) indices are fixed
+    up here once the record counts of all preceding ranges are known, so the
+    result is identical to the serial parser. Small files, or ``workers=1``,
+    are parsed serially.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or os.path.getsize(filename) < min_size:
+        return parse_obj(filename)
+
+    # A few ranges per worker keeps the pool busy when chunks parse unevenly.
+    ranges = _chunk_bounds(filename, workers * 4)
+    # Start the tracker before forking so workers and parent share it and
+    # the segments' lifetime is tied to this process.
+    resource_tracker.ensure_running()
+    blocks = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            for name, layout in pool.map(_parse_range, [(filename, a, b) for a, b in ranges]):
+                blocks.append(_collect_range(name, layout))
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            raise
+    return _to_obj_data(_concat_blocks(blocks))
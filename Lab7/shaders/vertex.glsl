@@ -10,9 +10,13 @@ uniform mat4 model;
 uniform mat4 view;
 uniform mat4 projection;
 
+// Positions are stored as int16 relative to the mesh bounding box
+uniform vec3 positionScale;
+uniform vec3 positionOffset;
+
 void main()
 {
-    FragPos = vec3(model * vec4(aPos, 1.0));
+    FragPos = vec3(model * vec4(aPos * positionScale + positionOffset, 1.0));
     Normal = mat3(transpose(inverse(model))) * aNormal;
     
     gl_Position = projection * view * vec4(FragPos, 1.0);
@@ -0,0 +1,170 @@
+# bvh.py
+"""Bounding volume hierarchy over object AABBs, for view-frustum culling.
+
+The tree is a linear BVH: objects are sorted along a Morton (Z-order)
+curve through their box centers, cut into leaves of ``leaf_size``
+consecutive objects, and a complete binary tree is laid over the leaves in
+heap order (node i has children 2i and 2i + 1; the root is 1). Building is
+one sort, refitting after objects move is one pass per tree level, and
+culling walks the tree a level at a time, testing every node of the level
+against the frustum planes at once::
+
+    bvh = BVH(*sphere_bounds(scene.positions, radii))
+    ...
+    rows = bvh.cull(frustum_planes(projection @ view))
+    bvh.refit(*sphere_bounds(scene.positions, radii))   # after objects moved
+
+A subtree that is entirely inside the frustum is accepted without visiting
+its children, and one entirely outside is dropped, so the work per frame
+grows with the frustum's boundary rather than with the object count.
+Refitting keeps the object order; rebuild once objects have moved far
+(the boxes get looser) or after objects were added or removed.
+"""
+import numpy as np
+
+LEAF_SIZE = 8
+MORTON_BITS = 10
+
+
+def sphere_bounds(centers, radii):
+    """AABBs of spheres: bounds of objects under any rotation about ``centers``"""
+    centers = np.asarray(centers, dtype=np.float32)
+    radii = np.broadcast_to(np.asarray(radii, dtype=np.float32), len(centers))[:, None]
+    return centers - radii, centers + radii
+
+
+def frustum_planes(matrix):
+    """(6, 4) planes (a, b, c, d) of the frustum of a row-major
+    ``projection @ view`` matrix, normalized, with the inside where
+    a*x + b*y + c*z + d >= 0 (left, right, bottom, top, near, far)"""
+    m = np.asarray(matrix, dtype=np.float64)
+    planes = np.array([m[3] + m[0], m[3] - m[0], m[3] + m[1], m[3] - m[1], m[3] + m[2], m[3] - m[2]])
+    planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+    return planes.astype(np.float32)
+
+
+def classify_boxes(mins, maxs, planes):
+    """(outside, inside) masks of AABBs against frustum planes.
+
+    ``outside``: entirely behind some plane; ``inside``: entirely in front of
+    all of them. Boxes that are neither straddle the frustum's boundary.
+    Empty boxes (max < min) are outside.
+    """
+    # Empty boxes are infinite (inverted); their NaN tests come out False
+    with np.errstate(invalid='ignore'):
+        centers = (mins + maxs) * 0.5
+        extents = (maxs - mins) * 0.5
+        distance = centers @ planes[:, :3].T + planes[:, 3]
+        radius = extents @ np.abs(planes[:, :3]).T
+    outside = (distance < -radius).any(axis=1) | (maxs < mins).any(axis=1)
+    inside = (distance >= radius).all(axis=1)
+    return outside, inside
+
+
+def _morton_codes(points):
+    """30-bit Morton codes of points quantized to their bounding box"""
+    low = points.min(axis=0)
+    span = np.maximum(points.max(axis=0) - low, 1e-12)
+    scale = (1 << MORTON_BITS) - 1
+    q = ((points - low) / span * scale).astype(np.uint64)
+    # Spread the 10 bits of each coordinate to every third bit
+    q = (q | q << np.uint64(16)) & np.uint64(0x030000FF)
+    q = (q | q << np.uint64(8)) & np.uint64(0x0300F00F)
+    q = (q | q << np.uint64(4)) & np.uint64(0x030C30C3)
+    q = (q | q << np.uint64(2)) & np.uint64(0x09249249)
+    return q[:, 0] << np.uint64(2) | q[:, 1] << np.uint64(1) | q[:, 2]
+
+
+def _expand_ranges(starts, ends):
+    """Concatenation of arange(s, e) for every range"""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total)
+
+
+class BVH:
+    def __init__(self, mins, maxs, leaf_size=LEAF_SIZE):
+        self.leaf_size = leaf_size
+        self.stats = {'visited': 0, 'tested': 0, 'visible': 0, 'culled': 0}
+        self.build(mins, maxs)
+
+    def build(self, mins, maxs):
+        """Sort the objects along the Morton curve and fit the tree"""
+        mins = np.asarray(mins, dtype=np.float32)
+        maxs = np.asarray(maxs, dtype=np.float32)
+        self.count = len(mins)
+        leaves = max(1, -(-self.count // self.leaf_size))
+        self.depth = int(np.ceil(np.log2(leaves)))
+        self.first_leaf = 1 << self.depth   # leaves are nodes first_leaf .. 2 * first_leaf - 1
+        self.order = np.argsort(_morton_codes((mins + maxs) * 0.5), kind='stable') if self.count else \
+            np.zeros(0, dtype=np.int64)
+        self.node_min = np.empty((2 * self.first_leaf, 3), dtype=np.float32)
+        self.node_max = np.empty((2 * self.first_leaf, 3), dtype=np.float32)
+        self.refit(mins, maxs)
+
+    def refit(self, mins, maxs):
+        """Recompute every node's box from the objects' current boxes"""
+        mins = np.asarray(mins, dtype=np.float32)[self.order]
+        maxs = np.asarray(maxs, dtype=np.float32)[self.order]
+        leaves = slice(self.first_leaf, 2 * self.first_leaf)
+        # Empty leaves (past the last object) get inverted boxes
+        self.node_min[leaves] = np.inf
+        self.node_max[leaves] = -np.inf
+        if self.count:
+            starts = np.arange(0, self.count, self.leaf_size)
+            used = slice(self.first_leaf, self.first_leaf + len(starts))
+            self.node_min[used] = np.minimum.reduceat(mins, starts)
+            self.node_max[used] = np.maximum.reduceat(maxs, starts)
+        # Then each level from its children, bottom-up
+        level = self.first_leaf
+        while level > 1:
+            parents = np.arange(level // 2, level)
+            np.minimum(self.node_min[2 * parents], self.node_min[2 * parents + 1], out=self.node_min[level // 2:level])
+            np.maximum(self.node_max[2 * parents], self.node_max[2 * parents + 1], out=self.node_max[level // 2:level])
+            level //= 2
+        self._object_min, self._object_max = mins, maxs
+
+    def _object_ranges(self, nodes):
+        """[start, end) positions in ``order`` of the objects under ``nodes``"""
+        depth = np.frexp(nodes.astype(np.float64))[1] - 1
+        shift = self.depth - depth
+        first = (nodes << shift) - self.first_leaf
+        starts = np.minimum(first * self.leaf_size, self.count)
+        ends = np.minimum((first + (1 << shift)) * self.leaf_size, self.count)
+        return starts, ends
+
+    def cull(self, planes):
+        """Rows of the objects whose boxes are not outside the frustum.
+
+        ``stats`` afterwards holds the nodes visited, the objects tested one by
+        one (in leaves straddling the boundary), and the visible and culled
+        object counts.
+        """
+        planes = np.asarray(planes, dtype=np.float32)
+        accepted_starts, accepted_ends, visible = [], [], []
+        visited = tested = 0
+        frontier = np.ones(1, dtype=np.int64)
+        while len(frontier):
+            visited += len(frontier)
+            outside, inside = classify_boxes(self.node_min[frontier], self.node_max[frontier], planes)
+            starts, ends = self._object_ranges(frontier[inside])
+            accepted_starts.append(starts)
+            accepted_ends.append(ends)
+            straddling = frontier[~outside & ~inside]
+            leaves = straddling[straddling >= self.first_leaf]
+            if len(leaves):
+                # Test the objects of boundary leaves individually
+                positions = _expand_ranges(*self._object_ranges(leaves))
+                tested += len(positions)
+                out, _ = classify_boxes(self._object_min[positions], self._object_max[positions], planes)
+                visible.append(positions[~out])
+            inner = straddling[straddling < self.first_leaf]
+            frontier = np.concatenate([2 * inner, 2 * inner + 1])
+        positions = np.concatenate([_expand_ranges(np.concatenate(accepted_starts), np.concatenate(accepted_ends))]
+                                   + visible)
+        rows = self.order[positions]
+        self.stats = {'visited': visited, 'tested': tested, 'visible': len(rows), 'culled': self.count - len(rows)}
+        return rows
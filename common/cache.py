@@ -0,0 +1,221 @@
+# cache.py
+# On-disk cache of named NumPy arrays. Entries are flat binary files that are
+# memory-mapped on load, so cached data can go straight to glBufferData /
+# glTexImage2D without any parsing.
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+
+import numpy as np
+
+MAGIC = b'CSC402C\0'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache')
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def _align(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def file_signature(path):
+    """Cheap identity of a source file: absolute path, size and mtime"""
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def content_hash(path, chunk_size=1024 * 1024):
+    """BLAKE2b digest of a file's contents"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ArrayCache:
+    """Directory of cached array bundles with a total size cap.
+
+    Each entry file is laid out as::
+
+        MAGIC | u32 format version | u32 header length | JSON header | arrays
+
+    The JSON header holds the caller's metadata and, for every array, its
+    dtype, shape and byte offset from the end of the header. The header and
+    every array start on 64-byte boundaries. Small metadata updates go to a
+    JSON sidecar next to the entry (see ``update_meta``), so an entry that is
+    still memory-mapped never has to be rewritten.
+    Least recently used entries are evicted once the directory grows past
+    ``max_bytes``.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def entry_path(self, key):
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name + '.bin')
+
+    def sidecar_path(self, key):
+        return self.entry_path(key)[:-len('.bin')] + '.json'
+
+    def load(self, key):
+        """Return (meta, arrays) for ``key``, or None on a miss.
+
+        Arrays are read-only views into a memory map of the entry file.
+        Entries with a different format version or a mismatched key are
+        treated as misses.
+        """
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        prefix = len(MAGIC) + 8
+        if len(mm) < prefix or mm[:len(MAGIC)] != MAGIC:
+            return None
+        version, header_len = np.frombuffer(mm, dtype='<u4', count=2, offset=len(MAGIC))
+        if version != FORMAT_VERSION:
+            return None
+        try:
+            header = json.loads(bytes(mm[prefix:prefix + header_len]).decode('utf-8'))
+        except ValueError:
+            return None
+        if header.get('key') != key:
+            return None
+        meta = dict(header['meta'], **self._load_sidecar(key))
+
+        data_start = _align(prefix + header_len)
+        arrays = {}
+        for spec in header['arrays']:
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            offset = data_start + spec['offset']
+            if offset + count * dtype.itemsize > len(mm):
+                return None
+            if count == 0:
+                arrays[spec['name']] = np.zeros(spec['shape'], dtype=dtype)
+                continue
+            arrays[spec['name']] = np.frombuffer(
+                mm, dtype=dtype, count=count, offset=offset).reshape(spec['shape'])
+
+        # Mark as recently used for eviction.
+        os.utime(path)
+        return meta, arrays
+
+    def _load_sidecar(self, key):
+        try:
+            with open(self.sidecar_path(key), 'r', encoding='utf-8') as f:
+                sidecar = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        if sidecar.get('key') != key:
+            return {}
+        return sidecar['meta']
+
+    def update_meta(self, key, **fields):
+        """Override metadata fields of an existing entry without rewriting it.
+
+        The fields are written to a small JSON sidecar and merged over the
+        entry's own metadata by ``load``; the next ``store`` drops them.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        meta = dict(self._load_sidecar(key), **fields)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'key': key, 'meta': meta}, f)
+            os.replace(tmp, self.sidecar_path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def store(self, key, meta, arrays):
+        """Write ``arrays`` (a name -> ndarray dict) with JSON-able ``meta``"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.entry_path(key)
+
+        arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+        # Array offsets are relative to the (aligned) end of the header.
+        specs = []
+        offset = 0
+        for name, a in arrays.items():
+            specs.append({'name': name, 'dtype': a.dtype.str, 'shape': list(a.shape), 'offset': offset})
+            offset = _align(offset + a.nbytes)
+        header_bytes = json.dumps({'key': key, 'meta': meta, 'arrays': specs}).encode('utf-8')
+        data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(MAGIC)
+                f.write(np.array([FORMAT_VERSION, len(header_bytes)], dtype='<u4').tobytes())
+                f.write(header_bytes)
+                for spec, a in zip(specs, arrays.values()):
+                    if a.nbytes:
+                        f.seek(data_start + spec['offset'])
+                        f.write(memoryview(a).cast('B'))
+                f.truncate(data_start + offset)
+            # Atomic replace so readers never see a half-written entry.
+            # Callers must drop their views of the old entry first: Windows
+            # refuses to replace a file that is still memory-mapped.
+            os.replace(tmp, path)
+            self._remove_sidecar(path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        self.evict(keep=path)
+        return path
+
+    @staticmethod
+    def _remove_sidecar(path):
+        try:
+            os.remove(path[:-len('.bin')] + '.json')
+        except FileNotFoundError:
+            pass
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits ``max_bytes``.
+
+        Entries that cannot be deleted (on Windows, ones another texture or
+        mesh still has memory-mapped) are skipped.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        entries = []
+        for name in names:
+            if not name.endswith('.bin'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            self._remove_sidecar(path)
+            total -= size
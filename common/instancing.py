@@ -0,0 +1,106 @@
+# instancing.py
+"""Per-instance model matrices for glDrawElementsInstanced.
+
+The matrices of all instances are computed in a few vectorized NumPy
+operations and live in one float32 array that is uploaded with a single
+glBufferSubData per frame::
+
+    instances = InstanceBuffer(location=3)   # with the mesh's VAO bound
+    ...
+    model_matrices(positions, axes, angles, out=instances.matrices[:count])
+    instances.upload(count)
+    instances.draw(GL_TRIANGLES, index_count, count)
+
+In the shader the matrix is a ``mat4`` attribute: it takes four locations
+(one per column) with an attribute divisor of 1.
+"""
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+MATRIX_BYTES = 64
+
+
+def rotation_matrices(axes, angles, out, unit_axes=False):
+    """3x3 rotations about ``axes`` by ``angles`` degrees, as glRotatef builds them.
+
+    ``out`` is any (n, 3, 3) view, indexed [instance, row, column].
+    ``unit_axes`` skips normalizing axes that already have length 1.
+    """
+    axes = np.asarray(axes, dtype=np.float32)
+    if not unit_axes:
+        axes = axes / np.linalg.norm(axes, axis=1, keepdims=True)
+    radians = np.radians(np.asarray(angles, dtype=np.float32))
+    c, s = np.cos(radians), np.sin(radians)
+    x, y, z = axes[:, 0], axes[:, 1], axes[:, 2]
+    t = 1 - c
+    out[:, 0, 0] = x * x * t + c
+    out[:, 0, 1] = x * y * t - z * s
+    out[:, 0, 2] = x * z * t + y * s
+    out[:, 1, 0] = y * x * t + z * s
+    out[:, 1, 1] = y * y * t + c
+    out[:, 1, 2] = y * z * t - x * s
+    out[:, 2, 0] = z * x * t - y * s
+    out[:, 2, 1] = z * y * t + x * s
+    out[:, 2, 2] = z * z * t + c
+    return out
+
+
+def model_matrices(positions, axes, angles, out=None, unit_axes=False):
+    """Translate(position) * Rotate(angle, axis) for every instance.
+
+    Returns (n, 4, 4) float32 in GL (column-major) order: ``out[i, column]``
+    is a column, so the array can be uploaded as is.
+    """
+    positions = np.asarray(positions, dtype=np.float32)
+    if out is None:
+        out = np.empty((len(positions), 4, 4), dtype=np.float32)
+    # Column-major storage = the row-major matrix transposed
+    rotation_matrices(axes, angles, out[:, :3, :3].transpose(0, 2, 1), unit_axes)
+    out[:, :3, 3] = 0.0
+    out[:, 3, :3] = positions
+    out[:, 3, 3] = 1.0
+    return out
+
+
+class InstanceBuffer:
+    """A growable GL buffer of per-instance mat4s bound to the current VAO"""
+
+    def __init__(self, location, capacity=1024):
+        self.location = location
+        self.vbo = glGenBuffers(1)
+        self.capacity = 0
+        self.matrices = np.zeros((0, 4, 4), dtype=np.float32)
+        self.reserve(capacity)
+        # A mat4 attribute is four vec4 columns at consecutive locations
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        for column in range(4):
+            glVertexAttribPointer(location + column, 4, GL_FLOAT, GL_FALSE, MATRIX_BYTES,
+                                  ctypes.c_void_p(column * 16))
+            glEnableVertexAttribArray(location + column)
+            glVertexAttribDivisor(location + column, 1)
+
+    def reserve(self, count):
+        """Make room for ``count`` instances (keeps the current matrices)"""
+        if count <= self.capacity:
+            return
+        capacity = max(count, 2 * self.capacity)
+        matrices = np.zeros((capacity, 4, 4), dtype=np.float32)
+        matrices[:len(self.matrices)] = self.matrices
+        self.matrices = matrices
+        self.capacity = capacity
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.matrices.nbytes, None, GL_DYNAMIC_DRAW)
+
+    def upload(self, count):
+        """Send the first ``count`` matrices in one glBufferSubData"""
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, count * MATRIX_BYTES, self.matrices[:count])
+
+    def draw(self, mode, index_count, count):
+        """One instanced draw of ``count`` instances (the VAO must be bound)"""
+        glDrawElementsInstanced(mode, index_count, GL_UNSIGNED_INT, None, count)
+
+    def delete(self):
+        glDeleteBuffers(1, [self.vbo])
@@ -0,0 +1,159 @@
+# matrix_stack.py
+"""A NumPy replacement for the fixed-function matrix stack.
+
+Builds the same matrices as glTranslatef/glRotatef/gluLookAt/gluPerspective
+without a GL context and without reading anything back from the driver
+(glGetFloatv), so it also works on core-profile contexts. Matrices are
+row-major float32 and are uploaded with ``transpose=GL_TRUE``::
+
+    stack = MatrixStack()
+    stack.push()
+    stack.translate(*position)
+    stack.rotate(angle, *axis)
+    glUniformMatrix4fv(model_loc, 1, GL_TRUE, stack.matrix)
+    stack.pop()
+
+The builder functions write into ``out`` when given one, and the stack
+keeps all of its levels in one preallocated array, so a frame allocates
+no matrices.
+"""
+import math
+
+import numpy as np
+
+
+def identity(out=None):
+    if out is None:
+        out = np.empty((4, 4), dtype=np.float32)
+    out[...] = 0.0
+    out[0, 0] = out[1, 1] = out[2, 2] = out[3, 3] = 1.0
+    return out
+
+
+def translation(x, y, z, out=None):
+    out = identity(out)
+    out[0, 3], out[1, 3], out[2, 3] = x, y, z
+    return out
+
+
+def rotation(angle, x, y, z, out=None):
+    """Rotation by ``angle`` degrees about (x, y, z), like glRotatef"""
+    out = identity(out)
+    length = math.sqrt(x * x + y * y + z * z)
+    if length == 0.0:
+        return out
+    x, y, z = x / length, y / length, z / length
+    c = math.cos(math.radians(angle))
+    s = math.sin(math.radians(angle))
+    t = 1.0 - c
+    out[0, 0], out[0, 1], out[0, 2] = x * x * t + c, x * y * t - z * s, x * z * t + y * s
+    out[1, 0], out[1, 1], out[1, 2] = y * x * t + z * s, y * y * t + c, y * z * t - x * s
+    out[2, 0], out[2, 1], out[2, 2] = z * x * t - y * s, z * y * t + x * s, z * z * t + c
+    return out
+
+
+def scaling(x, y, z, out=None):
+    out = identity(out)
+    out[0, 0], out[1, 1], out[2, 2] = x, y, z
+    return out
+
+
+def perspective(fovy, aspect, near, far, out=None):
+    """Projection matrix of gluPerspective (``fovy`` in degrees)"""
+    if out is None:
+        out = np.empty((4, 4), dtype=np.float32)
+    f = 1.0 / math.tan(math.radians(fovy) / 2.0)
+    out[...] = 0.0
+    out[0, 0] = f / aspect
+    out[1, 1] = f
+    out[2, 2] = (far + near) / (near - far)
+    out[2, 3] = 2.0 * far * near / (near - far)
+    out[3, 2] = -1.0
+    return out
+
+
+def look_at(eye, target, up=(0.0, 1.0, 0.0), out=None):
+    """View matrix of gluLookAt"""
+    out = identity(out)
+    ex, ey, ez = (float(v) for v in eye)
+    fx, fy, fz = float(target[0]) - ex, float(target[1]) - ey, float(target[2]) - ez
+    length = math.sqrt(fx * fx + fy * fy + fz * fz)
+    fx, fy, fz = fx / length, fy / length, fz / length
+    ux, uy, uz = (float(v) for v in up)
+    # side = forward x up, then the true up = side x forward
+    sx, sy, sz = fy * uz - fz * uy, fz * ux - fx * uz, fx * uy - fy * ux
+    length = math.sqrt(sx * sx + sy * sy + sz * sz)
+    sx, sy, sz = sx / length, sy / length, sz / length
+    ux, uy, uz = sy * fz - sz * fy, sz * fx - sx * fz, sx * fy - sy * fx
+    out[0, 0], out[0, 1], out[0, 2], out[0, 3] = sx, sy, sz, -(sx * ex + sy * ey + sz * ez)
+    out[1, 0], out[1, 1], out[1, 2], out[1, 3] = ux, uy, uz, -(ux * ex + uy * ey + uz * ez)
+    out[2, 0], out[2, 1], out[2, 2], out[2, 3] = -fx, -fy, -fz, fx * ex + fy * ey + fz * ez
+    return out
+
+
+class MatrixStack:
+    """push/pop and post-multiplying transforms, like one GL matrix mode.
+
+    ``matrix`` is a view of the current top; it changes in place, so copy
+    it if it must outlive the next call.
+    """
+
+    def __init__(self, depth=32):
+        self._levels = np.empty((depth, 4, 4), dtype=np.float32)
+        self._top = 0
+        identity(self._levels[0])
+        self._operand = np.empty((4, 4), dtype=np.float32)
+        self._product = np.empty((4, 4), dtype=np.float32)
+
+    @property
+    def matrix(self):
+        return self._levels[self._top]
+
+    def push(self):
+        if self._top + 1 == len(self._levels):
+            raise OverflowError("Matrix stack overflow")
+        self._levels[self._top + 1] = self._levels[self._top]
+        self._top += 1
+
+    def pop(self):
+        if self._top == 0:
+            raise IndexError("Matrix stack underflow")
+        self._top -= 1
+
+    def __enter__(self):
+        self.push()
+        return self
+
+    def __exit__(self, *exc):
+        self.pop()
+
+    def load_identity(self):
+        identity(self.matrix)
+
+    def load(self, matrix):
+        self.matrix[...] = matrix
+
+    def multiply(self, matrix):
+        """Current = current @ matrix"""
+        np.matmul(self.matrix, matrix, out=self._product)
+        self.matrix[...] = self._product
+
+    def translate(self, x, y, z):
+        # Only the last column changes: M @ T = M with M[:, 3] += M[:, :3] @ t
+        m = self.matrix
+        m[:, 3] += m[:, 0] * x + m[:, 1] * y + m[:, 2] * z
+
+    def rotate(self, angle, x, y, z):
+        self.multiply(rotation(angle, x, y, z, out=self._operand))
+
+    def scale(self, x, y, z):
+        m = self.matrix
+        m[:, 0] *= x
+        m[:, 1] *= y
+        m[:, 2] *= z
+
+    def look_at(self, eye, target, up=(0.0, 1.0, 0.0)):
+        self.multiply(look_at(eye, target, up, out=self._operand))
+
+    def perspective(self, fovy, aspect, near, far):
+        self.multiply(perspective(fovy, aspect, near, far, out=self._operand))
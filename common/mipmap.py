@@ -0,0 +1,140 @@
+# mipmap.py
+# CPU mip chain generation with separable box or Kaiser-windowed sinc
+# filters, an on-disk cache of finished chains and direct per-level upload.
+import numpy as np
+from OpenGL.GL import *
+
+from common.cache import ArrayCache
+
+# Kaiser filter half-width (in destination texels) and shape parameter; the
+# same defaults as NVIDIA Texture Tools.
+KAISER_WIDTH = 3.0
+KAISER_ALPHA = 4.0
+
+MIP_FILTERS = ('box', 'kaiser')
+
+
+def mip_sizes(width, height):
+    """(width, height) of every level down to 1x1, following the GL rule"""
+    sizes = [(width, height)]
+    while sizes[-1] != (1, 1):
+        w, h = sizes[-1]
+        sizes.append((max(1, w // 2), max(1, h // 2)))
+    return sizes
+
+
+def _kaiser(x):
+    t = np.clip(x / KAISER_WIDTH, -1.0, 1.0)
+    return np.sinc(x) * np.i0(KAISER_ALPHA * np.sqrt(1 - t * t)) / np.i0(KAISER_ALPHA)
+
+
+def _filter_taps(src, dst, kind):
+    """Source indices and weights, shape (dst, taps), for one axis.
+
+    Texel ``k`` of the destination covers ``[k, k + 1) * src / dst`` in
+    source texel units. The box filter weights source texels by how much of
+    that footprint they overlap (a plain 2x2 average for even sizes); the
+    Kaiser filter is a windowed sinc at the destination rate. Indices wrap,
+    matching GL_REPEAT.
+    """
+    scale = src / dst
+    centers = (np.arange(dst) + 0.5) * scale          # footprint centers
+    if kind == 'box':
+        radius = scale / 2
+    elif kind == 'kaiser':
+        radius = KAISER_WIDTH * scale
+    else:
+        raise ValueError(f"Unknown mip filter: {kind}")
+
+    first = np.floor(centers - radius).astype(np.int64)
+    taps = int(np.ceil(2 * radius)) + 2
+    index = first[:, None] + np.arange(taps)
+    if kind == 'box':
+        overlap = (np.minimum(index + 1, centers[:, None] + radius)
+                   - np.maximum(index, centers[:, None] - radius))
+        weights = np.maximum(overlap, 0.0)
+    else:
+        weights = _kaiser((index + 0.5 - centers[:, None]) / scale)
+    weights /= weights.sum(axis=1, keepdims=True)
+    return index % src, weights.astype(np.float32)
+
+
+def _resample_axis(image, size, axis, kind):
+    index, weights = _filter_taps(image.shape[axis], size, kind)
+    out = 0.0
+    for t in range(index.shape[1]):
+        shape = [1] * image.ndim
+        shape[axis] = size
+        out = out + np.take(image, index[:, t], axis=axis) * weights[:, t].reshape(shape)
+    return out
+
+
+def build_mip_chain(image, kind='kaiser'):
+    """All mip levels of a uint8 (height, width, channels) image, finest first.
+
+    Every level is filtered from the full-precision previous one and
+    rounded to uint8 once, so errors do not accumulate down the chain.
+    """
+    levels = [np.ascontiguousarray(image)]
+    current = image.astype(np.float32)
+    height, width = image.shape[:2]
+    for w, h in mip_sizes(width, height)[1:]:
+        current = _resample_axis(_resample_axis(current, h, 0, kind), w, 1, kind)
+        levels.append(np.clip(np.rint(current), 0, 255).astype(np.uint8))
+    return levels
+
+
+def cached_mip_chain(key, generate, kind='kaiser', version=1, cache=None):
+    """Mip chain for ``key``, built from ``generate()`` only on a cache miss.
+
+    ``version`` belongs to the caller: bump it when ``generate`` changes its
+    output so old chains are rebuilt. On a hit, the levels are read-only
+    memory-mapped views of the cache entry.
+    """
+    cache = cache or ArrayCache()
+    key = f'{key}:{kind}'
+    entry = cache.load(key)
+    if entry is not None:
+        meta, arrays = entry
+        if meta.get('version') == version:
+            return [arrays[f'level{k}'] for k in range(meta['levels'])]
+        # Stale: release the mapping so the entry can be replaced.
+        entry = arrays = None
+
+    levels = build_mip_chain(generate(), kind)
+    cache.store(key, {'version': version, 'levels': len(levels)},
+                {f'level{k}': level for k, level in enumerate(levels)})
+    return levels
+
+
+def stack_mip_chains(chains):
+    """Combine same-size mip chains into per-level (layers, h, w, c) arrays"""
+    shapes = {chain[0].shape for chain in chains}
+    if len(shapes) != 1:
+        raise ValueError(f"Texture array layers must have the same size, got {sorted(shapes)}")
+    return [np.stack(level) for level in zip(*chains)]
+
+
+def upload_mip_chain(levels, target=GL_TEXTURE_2D):
+    """Upload precomputed levels to the bound texture.
+
+    ``GL_TEXTURE_2D`` levels are (h, w, c) images uploaded with
+    glTexImage2D; ``GL_TEXTURE_2D_ARRAY`` levels are (layers, h, w, c)
+    stacks from ``stack_mip_chains``, uploaded with glTexImage3D.
+    """
+    formats = {1: GL_RED, 3: GL_RGB, 4: GL_RGBA}
+    is_array = target == GL_TEXTURE_2D_ARRAY
+    image_rank = 4 if is_array else 3
+    fmt = formats[levels[0].shape[-1] if levels[0].ndim == image_rank else 1]
+    # Small levels have rows that are not 4-byte aligned
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    for level, image in enumerate(levels):
+        data = np.ascontiguousarray(image)
+        if is_array:
+            layers, height, width = image.shape[:3]
+            glTexImage3D(target, level, fmt, width, height, layers, 0, fmt, GL_UNSIGNED_BYTE, data)
+        else:
+            height, width = image.shape[:2]
+            glTexImage2D(target, level, fmt, width, height, 0, fmt, GL_UNSIGNED_BYTE, data)
+    glTexParameteri(target, GL_TEXTURE_BASE_LEVEL, 0)
+    glTexParameteri(target, GL_TEXTURE_MAX_LEVEL, len(levels) - 1)
@@ -0,0 +1,183 @@
+# scene.py
+"""Scene objects as contiguous NumPy columns instead of a list of dicts.
+
+Every object has a position, a rotation axis and angle (degrees), an
+angular velocity (degrees per update), a mesh id and a texture id; what the
+ids refer to is up to the lab. Objects are packed into the first
+``len(store)`` rows, so per-frame work is a few whole-column operations::
+
+    store = SceneStore()
+    handle = store.add((0.0, 1.0, 0.0), axis=(0, 1, 0), angular_velocity=0.5, mesh=0, texture=2)
+    ...
+    store.update()                  # every object's rotation at once
+    models = store.model_matrices() # (n, 4, 4), column-major for GL
+    store.remove(handle)
+
+Handles stay valid until their object is removed; rows move (the last
+object fills a removed one's row), so use ``slot(handle)`` instead of
+keeping row numbers across a ``remove``.
+"""
+import numpy as np
+
+from common.instancing import model_matrices
+
+# column -> (dtype, components)
+COLUMNS = {
+    'positions': (np.float32, 3),
+    'axes': (np.float32, 3),
+    'angles': (np.float32, 1),
+    'angular_velocities': (np.float32, 1),
+    'meshes': (np.int32, 1),
+    'textures': (np.int32, 1),
+    'handles': (np.int64, 1),
+}
+
+
+class SceneStore:
+    def __init__(self, capacity=64):
+        self._count = 0
+        self._capacity = 0
+        self._columns = {name: np.zeros((0, components) if components > 1 else 0, dtype=dtype)
+                         for name, (dtype, components) in COLUMNS.items()}
+        # handle -> row, -1 once removed; handles are never reused
+        self._slots = np.zeros(0, dtype=np.int64)
+        self._next_handle = 0
+        self._matrices = np.zeros((0, 4, 4), dtype=np.float32)
+        self.reserve(capacity)
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, handle):
+        return 0 <= handle < self._next_handle and self._slots[handle] >= 0
+
+    # Columns of the live objects (views; writes go to the store)
+    @property
+    def positions(self):
+        return self._columns['positions'][:self._count]
+
+    @property
+    def axes(self):
+        return self._columns['axes'][:self._count]
+
+    @property
+    def angles(self):
+        return self._columns['angles'][:self._count]
+
+    @property
+    def angular_velocities(self):
+        return self._columns['angular_velocities'][:self._count]
+
+    @property
+    def meshes(self):
+        return self._columns['meshes'][:self._count]
+
+    @property
+    def textures(self):
+        return self._columns['textures'][:self._count]
+
+    @property
+    def handles(self):
+        """Handle of the object in each row"""
+        return self._columns['handles'][:self._count]
+
+    def reserve(self, count):
+        """Make room for ``count`` objects"""
+        if count <= self._capacity:
+            return
+        capacity = max(count, 2 * self._capacity)
+        for name, column in self._columns.items():
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self._count] = column[:self._count]
+            self._columns[name] = grown
+        self._matrices = np.zeros((capacity, 4, 4), dtype=np.float32)
+        self._capacity = capacity
+
+    def _new_handles(self, count):
+        handles = np.arange(self._next_handle, self._next_handle + count, dtype=np.int64)
+        self._next_handle += count
+        if self._next_handle > len(self._slots):
+            slots = np.full(max(self._next_handle, 2 * len(self._slots)), -1, dtype=np.int64)
+            slots[:len(self._slots)] = self._slots
+            self._slots = slots
+        return handles
+
+    def add(self, position, axis=(0.0, 1.0, 0.0), angle=0.0, angular_velocity=0.0, mesh=0, texture=0):
+        """Add one object; returns its handle"""
+        return int(self.add_many([position], [axis], angle, angular_velocity, mesh, texture)[0])
+
+    def add_many(self, positions, axes=(0.0, 1.0, 0.0), angles=0.0, angular_velocities=0.0, meshes=0, textures=0):
+        """Add ``len(positions)`` objects at once (other columns broadcast);
+        returns their handles"""
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        count = len(positions)
+        self.reserve(self._count + count)
+        rows = slice(self._count, self._count + count)
+        axes = np.broadcast_to(np.asarray(axes, dtype=np.float32), (count, 3))
+        columns = self._columns
+        columns['positions'][rows] = positions
+        # Zero axes fall back to +y instead of turning the matrices into NaN
+        lengths = np.linalg.norm(axes, axis=1, keepdims=True)
+        np.divide(axes, lengths, out=columns['axes'][rows], where=lengths > 0)
+        columns['axes'][rows][lengths[:, 0] == 0] = (0.0, 1.0, 0.0)
+        columns['angles'][rows] = angles
+        columns['angular_velocities'][rows] = angular_velocities
+        columns['meshes'][rows] = meshes
+        columns['textures'][rows] = textures
+        handles = self._new_handles(count)
+        columns['handles'][rows] = handles
+        self._slots[handles] = np.arange(rows.start, rows.stop)
+        self._count += count
+        return handles
+
+    def slot(self, handle):
+        """Current row of ``handle``"""
+        if handle not in self:
+            raise KeyError(f"No scene object with handle {handle}")
+        return int(self._slots[handle])
+
+    def remove(self, handle):
+        """Remove an object; the last row moves into its place"""
+        row = self.slot(handle)
+        last = self._count - 1
+        if row != last:
+            for column in self._columns.values():
+                column[row] = column[last]
+            self._slots[self._columns['handles'][row]] = row
+        self._slots[handle] = -1
+        self._count -= 1
+
+    def update(self, steps=1.0):
+        """Advance every rotation by its angular velocity times ``steps``"""
+        angles = self.angles
+        angles += self.angular_velocities * steps
+        np.remainder(angles, 360.0, out=angles)
+
+    def model_matrices(self, rows=None, out=None):
+        """Translate(position) * Rotate(angle, axis) of every object, or of
+        ``rows`` only, (n, 4, 4) column-major (``out[i]`` uploads with
+        transpose=GL_FALSE).
+
+        Without ``out`` the result is a view of a buffer owned by the store
+        and is overwritten by the next call.
+        """
+        if rows is None:
+            positions, axes, angles = self.positions, self.axes, self.angles
+        else:
+            positions, axes, angles = self.positions[rows], self.axes[rows], self.angles[rows]
+        if out is None:
+            out = self._matrices[:len(positions)]
+        return model_matrices(positions, axes, angles, out=out, unit_axes=True)
+
+    def batches(self):
+        """Rows grouped by (mesh, texture): a list of ``(mesh, texture, rows)``
+        in mesh-then-texture order, for drawing with few state changes"""
+        if not self._count:
+            return []
+        keys = self.meshes.astype(np.int64) << 32 | (self.textures.astype(np.int64) & 0xFFFFFFFF)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], len(order)]
+        return [(int(self.meshes[order[s]]), int(self.textures[order[s]]), order[s:e])
+                for s, e in zip(starts, ends)]
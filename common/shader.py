@@ -2,6 +2,8 @@
 from OpenGL.GL import *
 import ctypes
 
+import numpy as np
+
 def compile_shader(source, shader_type):
     shader = glCreateShader(shader_type)
     glShaderSource(shader, source)
@@ -38,3 +40,122 @@ def create_program_from_files(vertex_path, fragment_path):
     glDeleteShader(vert)
     glDeleteShader(frag)
     return prog
+
+# GL type -> (glUniform*v setter, components, dtype); samplers, images and
+# other integer types fall back to glUniform1iv
+_VECTOR_SETTERS = {
+    GL_FLOAT: (glUniform1fv, 1, 'float32'),
+    GL_FLOAT_VEC2: (glUniform2fv, 2, 'float32'),
+    GL_FLOAT_VEC3: (glUniform3fv, 3, 'float32'),
+    GL_FLOAT_VEC4: (glUniform4fv, 4, 'float32'),
+    GL_INT_VEC2: (glUniform2iv, 2, 'int32'),
+    GL_INT_VEC3: (glUniform3iv, 3, 'int32'),
+    GL_INT_VEC4: (glUniform4iv, 4, 'int32'),
+    GL_BOOL_VEC2: (glUniform2iv, 2, 'int32'),
+    GL_BOOL_VEC3: (glUniform3iv, 3, 'int32'),
+    GL_BOOL_VEC4: (glUniform4iv, 4, 'int32'),
+    GL_UNSIGNED_INT: (glUniform1uiv, 1, 'uint32'),
+    GL_UNSIGNED_INT_VEC2: (glUniform2uiv, 2, 'uint32'),
+    GL_UNSIGNED_INT_VEC3: (glUniform3uiv, 3, 'uint32'),
+    GL_UNSIGNED_INT_VEC4: (glUniform4uiv, 4, 'uint32'),
+}
+_MATRIX_SETTERS = {
+    GL_FLOAT_MAT2: (glUniformMatrix2fv, 4),
+    GL_FLOAT_MAT3: (glUniformMatrix3fv, 9),
+    GL_FLOAT_MAT4: (glUniformMatrix4fv, 16),
+}
+
+
+class Uniform:
+    """An active uniform: location, GL type, array size and last value sent"""
+
+    def __init__(self, name, location, gl_type, size):
+        self.name = name
+        self.location = location
+        self.type = gl_type
+        self.size = size
+        self.matrix = gl_type in _MATRIX_SETTERS
+        if self.matrix:
+            self.setter, self.components = _MATRIX_SETTERS[gl_type]
+            self.dtype = np.float32
+        else:
+            self.setter, self.components, dtype = _VECTOR_SETTERS.get(gl_type, (glUniform1iv, 1, 'int32'))
+            self.dtype = np.dtype(dtype)
+        self.value = None
+        self.transpose = None
+
+
+class Program:
+    """A linked program whose active uniforms are looked up once.
+
+    Setters convert the value to the uniform's type and skip the GL call
+    when it equals what was last sent, so constant uniforms (projection,
+    light color, samplers) cost one comparison per frame::
+
+        program = Program(create_shader_program())
+        program.use()
+        program.set('projection', projection)   # row-major, sent transposed
+        program['lightColor'] = light_color
+
+    GL uniform calls go to the program in use, so call ``use()`` first.
+    Values set with raw glUniform* calls bypass the cache. Names that are
+    not active uniforms (unused ones the compiler dropped) are ignored.
+    """
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.uniforms = {}
+        # Calls made and calls skipped because the value had not changed
+        self.uploads = 0
+        self.skipped = 0
+        for index in range(glGetProgramiv(handle, GL_ACTIVE_UNIFORMS)):
+            name, size, gl_type = glGetActiveUniform(handle, index)
+            name = name.decode() if isinstance(name, bytes) else name
+            location = glGetUniformLocation(handle, name)
+            if location < 0:
+                continue  # In a uniform block
+            # Arrays are reported as "name[0]"; set them by their base name
+            if name.endswith('[0]'):
+                name = name[:-3]
+            self.uniforms[name] = Uniform(name, location, int(gl_type), int(size))
+
+    @classmethod
+    def from_files(cls, vertex_path, fragment_path):
+        return cls(create_program_from_files(vertex_path, fragment_path))
+
+    def use(self):
+        glUseProgram(self.handle)
+
+    def location(self, name):
+        uniform = self.uniforms.get(name)
+        return -1 if uniform is None else uniform.location
+
+    def set(self, name, value, transpose=True):
+        """Send ``value`` unless it is what ``name`` already holds.
+
+        Matrices are row-major (``transpose=True``) like the NumPy matrices
+        in the labs. Returns whether a GL call was made.
+        """
+        uniform = self.uniforms.get(name)
+        if uniform is None:
+            return False
+        data = np.asarray(value, dtype=uniform.dtype)
+        if (uniform.value is not None and uniform.transpose == transpose
+                and np.array_equal(uniform.value, data)):
+            self.skipped += 1
+            return False
+        count = max(data.size // uniform.components, 1)
+        if uniform.matrix:
+            uniform.setter(uniform.location, count, GL_TRUE if transpose else GL_FALSE, data)
+        else:
+            uniform.setter(uniform.location, count, data)
+        uniform.value = data.copy()
+        uniform.transpose = transpose
+        self.uploads += 1
+        return True
+
+    def __setitem__(self, name, value):
+        self.set(name, value)
+
+    def delete(self):
+        glDeleteProgram(self.handle)
@@ -0,0 +1,14 @@
+#version 330 core
+
+in vec2 TexCoord;
+
+out vec4 FragColor;
+
+uniform sampler2D glyphAtlas;   // single channel: glyph coverage
+uniform vec4 textColor;
+
+void main()
+{
+    float coverage = texture(glyphAtlas, TexCoord).r;
+    FragColor = vec4(textColor.rgb, textColor.a * coverage);
+}
@@ -0,0 +1,15 @@
+#version 330 core
+
+layout (location = 0) in vec2 aPos;       // pixels, origin at the top-left corner
+layout (location = 1) in vec2 aTexCoord;
+
+out vec2 TexCoord;
+
+uniform vec2 screenSize;
+
+void main()
+{
+    vec2 ndc = aPos / screenSize * 2.0 - 1.0;
+    gl_Position = vec4(ndc.x, -ndc.y, 0.0, 1.0);
+    TexCoord = aTexCoord;
+}
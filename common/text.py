@@ -0,0 +1,169 @@
+# text.py
+# Screen-space text from a glyph atlas. Glyphs are rasterized once into a
+# single-channel texture; a TextLabel lays its lines out into a vertex buffer
+# that is only rebuilt when the text changes, and draws them in one call.
+import ctypes
+import os
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+from common.shader import create_program_from_files
+
+SHADER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shaders')
+
+# Printable ASCII plus the bullet used in the lab overlays
+DEFAULT_CHARACTERS = ''.join(chr(c) for c in range(32, 127)) + '•'
+
+ATLAS_WIDTH = 512
+GLYPH_PADDING = 1
+
+
+def rasterize_glyphs(font, characters=DEFAULT_CHARACTERS):
+    """Pack the glyphs of a pygame font into one coverage image.
+
+    Glyphs go left to right in rows (shelf packing). Returns the uint8
+    (height, ATLAS_WIDTH) atlas and, per character, its
+    (width, height, advance, (u0, v0, u1, v1)).
+    """
+    images = {}
+    placements = {}
+    x = y = row_height = 0
+    for ch in dict.fromkeys(characters):
+        surface = font.render(ch, True, (255, 255, 255))
+        coverage = np.frombuffer(pygame.image.tostring(surface, 'RGBA'), dtype=np.uint8)
+        coverage = coverage.reshape(surface.get_height(), surface.get_width(), 4)[..., 3]
+        height, width = coverage.shape
+        if x + width + GLYPH_PADDING > ATLAS_WIDTH:
+            x, y, row_height = 0, y + row_height + GLYPH_PADDING, 0
+        images[ch] = coverage
+        placements[ch] = (x, y, width, font.size(ch)[0])
+        x += width + GLYPH_PADDING
+        row_height = max(row_height, height)
+    height = y + row_height
+
+    atlas = np.zeros((height, ATLAS_WIDTH), dtype=np.uint8)
+    glyphs = {}
+    for ch, (gx, gy, width, advance) in placements.items():
+        image = images[ch]
+        atlas[gy:gy + image.shape[0], gx:gx + width] = image
+        uv = (gx / ATLAS_WIDTH, gy / height, (gx + width) / ATLAS_WIDTH, (gy + image.shape[0]) / height)
+        glyphs[ch] = (width, image.shape[0], advance, uv)
+    return atlas, glyphs
+
+
+class GlyphAtlas:
+    """Glyphs of one pygame font in a GL_R8 texture, plus the text shader.
+
+    Works with any GL context (pygame or glfw); only ``pygame.font`` is
+    used, which does not need a pygame window.
+    """
+
+    def __init__(self, font_size=24, font_name=None, characters=DEFAULT_CHARACTERS):
+        pygame.font.init()
+        font = pygame.font.Font(font_name, font_size)
+        self.line_height = font.get_linesize()
+        atlas, self.glyphs = rasterize_glyphs(font, characters)
+        self.fallback = self.glyphs.get('?')
+        height = atlas.shape[0]
+
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_R8, ATLAS_WIDTH, height, 0, GL_RED, GL_UNSIGNED_BYTE, atlas)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+
+        self.program = create_program_from_files(os.path.join(SHADER_DIR, 'text_vertex.glsl'),
+                                                 os.path.join(SHADER_DIR, 'text_fragment.glsl'))
+        self.screen_size_loc = glGetUniformLocation(self.program, "screenSize")
+        self.color_loc = glGetUniformLocation(self.program, "textColor")
+        self.atlas_loc = glGetUniformLocation(self.program, "glyphAtlas")
+
+    def layout(self, lines, x=0.0, y=0.0, line_height=None):
+        """Two triangles per visible glyph: float32 (n, 4) rows of x, y, u, v"""
+        line_height = line_height or self.line_height
+        quads = []
+        for row, line in enumerate(lines):
+            pen = x
+            top = y + row * line_height
+            for ch in line:
+                width, height, advance, (u0, v0, u1, v1) = self.glyphs.get(ch, self.fallback)
+                if ch != ' ':
+                    x1, y1 = pen + width, top + height
+                    quads.append([(pen, top, u0, v0), (x1, top, u1, v0), (x1, y1, u1, v1),
+                                  (x1, y1, u1, v1), (pen, y1, u0, v1), (pen, top, u0, v0)])
+                pen += advance
+        return np.array(quads, dtype=np.float32).reshape(-1, 4)
+
+    def delete(self):
+        glDeleteTextures(1, [self.texture])
+        glDeleteProgram(self.program)
+
+
+class TextLabel:
+    """A block of text lines with its own vertex buffer"""
+
+    def __init__(self, atlas):
+        self.atlas = atlas
+        self.text = None
+        self.vertex_count = 0
+
+        self.vao = glGenVertexArrays(1)
+        glBindVertexArray(self.vao)
+        self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        stride = 4 * 4
+        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(8))
+        glEnableVertexAttribArray(1)
+        glBindVertexArray(0)
+
+    def set_text(self, lines, x=0.0, y=0.0, line_height=None):
+        """Lay the lines out at pixel position (x, y); a no-op if nothing changed"""
+        if isinstance(lines, str):
+            lines = lines.split('\n')
+        text = (tuple(lines), x, y, line_height)
+        if text == self.text:
+            return
+        self.text = text
+
+        vertices = self.atlas.layout(lines, x, y, line_height)
+        self.vertex_count = len(vertices)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices if len(vertices) else None, GL_DYNAMIC_DRAW)
+
+    def draw(self, screen_size, color=(1.0, 1.0, 1.0, 1.0)):
+        """Draw on top of the scene; leaves depth testing and blending as they were"""
+        if self.vertex_count == 0:
+            return
+        depth_test = glIsEnabled(GL_DEPTH_TEST)
+        blend = glIsEnabled(GL_BLEND)
+        glDisable(GL_DEPTH_TEST)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+        atlas = self.atlas
+        glUseProgram(atlas.program)
+        glUniform2f(atlas.screen_size_loc, *screen_size)
+        glUniform4f(atlas.color_loc, *color)
+        glUniform1i(atlas.atlas_loc, 0)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, atlas.texture)
+
+        glBindVertexArray(self.vao)
+        glDrawArrays(GL_TRIANGLES, 0, self.vertex_count)
+        glBindVertexArray(0)
+
+        if depth_test:
+            glEnable(GL_DEPTH_TEST)
+        if not blend:
+            glDisable(GL_BLEND)
+
+    def delete(self):
+        glDeleteVertexArrays(1, [self.vao])
+        glDeleteBuffers(1, [self.vbo])
@@ -0,0 +1,303 @@
+# texture_compression.py
+# NumPy BC1/BC3 (S3TC, DXT1/DXT5) encoder and decoder, an on-disk cache of
+# compressed mip chains and upload with glCompressedTexImage.
+#
+# Colors are fitted per 4x4 block along the principal axis of the block's
+# colors, then refined once by least squares on the chosen indices; every
+# step runs on all blocks of a level at once.
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.GL.EXT.texture_compression_s3tc import (GL_COMPRESSED_RGB_S3TC_DXT1_EXT,
+                                                    GL_COMPRESSED_RGBA_S3TC_DXT5_EXT)
+
+from common.cache import ArrayCache, file_signature
+from common.mipmap import build_mip_chain, mip_sizes
+
+# Format name -> (GL internal format, bytes per 4x4 block, channels)
+COMPRESSED_FORMATS = {
+    'bc1': (GL_COMPRESSED_RGB_S3TC_DXT1_EXT, 8, 3),
+    'bc3': (GL_COMPRESSED_RGBA_S3TC_DXT5_EXT, 16, 4),
+}
+
+# Blocks encoded per step; bounds the size of the temporaries
+CHUNK_BLOCKS = 1 << 15
+
+# BC1 palette order: index -> weight of endpoint 0
+_COLOR_WEIGHTS = np.array([1.0, 0.0, 2.0 / 3.0, 1.0 / 3.0], dtype=np.float32)
+# BC3 alpha palette order (8-value mode): index -> weight of endpoint 0
+_ALPHA_WEIGHTS = np.array([7, 0, 6, 5, 4, 3, 2, 1], dtype=np.float32) / 7.0
+
+
+def compressed_size(width, height, fmt):
+    """Bytes of one compressed level (partial blocks count as whole ones)"""
+    return ((width + 3) // 4) * ((height + 3) // 4) * COMPRESSED_FORMATS[fmt][1]
+
+
+def s3tc_supported():
+    """Whether the current GL context can use S3TC textures"""
+    count = glGetIntegerv(GL_NUM_EXTENSIONS)
+    for i in range(count):
+        name = glGetStringi(GL_EXTENSIONS, i)
+        if name in (b'GL_EXT_texture_compression_s3tc', 'GL_EXT_texture_compression_s3tc'):
+            return True
+    return False
+
+
+def _to_blocks(image):
+    """(height, width, c) -> float32 (blocks, 16, c), padding by edge replication"""
+    height, width, channels = image.shape
+    ph, pw = -height % 4, -width % 4
+    if ph or pw:
+        image = np.pad(image, ((0, ph), (0, pw), (0, 0)), mode='edge')
+    bh, bw = image.shape[0] // 4, image.shape[1] // 4
+    blocks = image.reshape(bh, 4, bw, 4, channels).transpose(0, 2, 1, 3, 4)
+    return blocks.reshape(-1, 16, channels).astype(np.float32)
+
+
+def _from_blocks(blocks, width, height):
+    """Inverse of _to_blocks, cropping the padding"""
+    channels = blocks.shape[-1]
+    bh, bw = (height + 3) // 4, (width + 3) // 4
+    image = blocks.reshape(bh, bw, 4, 4, channels).transpose(0, 2, 1, 3, 4)
+    return image.reshape(bh * 4, bw * 4, channels)[:height, :width]
+
+
+def _quantize_565(colors):
+    r, g, b = (np.clip(np.rint(colors[..., c] * scale / 255.0), 0, scale).astype(np.uint16)
+               for c, scale in ((0, 31), (1, 63), (2, 31)))
+    return (r << 11) | (g << 5) | b
+
+
+def _expand_565(packed):
+    packed = packed.astype(np.uint32)
+    r, g, b = packed >> 11, (packed >> 5) & 63, packed & 31
+    # Replicate the high bits into the low ones, as decoders do
+    return np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], axis=-1).astype(np.float32)
+
+
+def _fit_indices(pixels, c0, c1):
+    """Nearest palette entry per texel and the block's squared error"""
+    e0, e1 = _expand_565(c0), _expand_565(c1)
+    palette = (_COLOR_WEIGHTS[:, None] * e0[:, None] + (1 - _COLOR_WEIGHTS[:, None]) * e1[:, None])
+    distance = ((pixels[:, :, None] - palette[:, None]) ** 2).sum(axis=-1)
+    indices = distance.argmin(axis=-1)
+    return indices, np.take_along_axis(distance, indices[..., None], axis=-1).sum(axis=(1, 2))
+
+
+def _principal_endpoints(pixels):
+    """Extremes of the block's colors along their principal axis"""
+    mean = pixels.mean(axis=1)
+    centered = pixels - mean[:, None]
+    covariance = np.einsum('nki,nkj->nij', centered, centered)
+    axis = np.full(mean.shape, 1 / np.sqrt(3), dtype=np.float32)
+    for _ in range(8):
+        v = np.einsum('nij,nj->ni', covariance, axis)
+        norm = np.linalg.norm(v, axis=1, keepdims=True)
+        axis = np.where(norm > 1e-6, v / np.maximum(norm, 1e-6), axis)
+    t = np.einsum('nki,ni->nk', centered, axis)
+    hi = mean + t.max(axis=1, keepdims=True) * axis
+    lo = mean + t.min(axis=1, keepdims=True) * axis
+    return hi, lo
+
+
+def _least_squares_endpoints(pixels, indices, hi, lo):
+    """Endpoints minimizing the error for fixed indices (unchanged where singular)"""
+    w = _COLOR_WEIGHTS[indices]
+    u = 1 - w
+    aa, ab, bb = (w * w).sum(1), (w * u).sum(1), (u * u).sum(1)
+    wx = np.einsum('nk,nki->ni', w, pixels)
+    ux = np.einsum('nk,nki->ni', u, pixels)
+    det = aa * bb - ab * ab
+    ok = (np.abs(det) > 1e-6)[:, None]
+    det = np.where(ok[:, 0], det, 1.0)[:, None]
+    a = (bb[:, None] * wx - ab[:, None] * ux) / det
+    b = (aa[:, None] * ux - ab[:, None] * wx) / det
+    return np.where(ok, np.clip(a, 0, 255), hi), np.where(ok, np.clip(b, 0, 255), lo)
+
+
+def _encode_color(pixels):
+    """float32 (n, 16, 3) -> uint8 (n, 8) BC1 color blocks, always 4-color mode"""
+    hi, lo = _principal_endpoints(pixels)
+    c0, c1 = _quantize_565(hi), _quantize_565(lo)
+    indices, error = _fit_indices(pixels, c0, c1)
+
+    # One refinement pass; keep whichever fit is better per block
+    hi2, lo2 = _least_squares_endpoints(pixels, indices, hi, lo)
+    r0, r1 = _quantize_565(hi2), _quantize_565(lo2)
+    refined, refined_error = _fit_indices(pixels, r0, r1)
+    better = refined_error < error
+    c0, c1 = np.where(better, r0, c0), np.where(better, r1, c1)
+    indices = np.where(better[:, None], refined, indices)
+
+    # 4-color mode needs c0 > c1: swap the endpoints and the indices
+    # (0 <-> 1, 2 <-> 3); equal endpoints only ever need index 0
+    swap = c0 < c1
+    c0, c1 = np.where(swap, c1, c0), np.where(swap, c0, c1)
+    indices = np.where(swap[:, None], indices ^ 1, indices)
+    indices = np.where((c0 == c1)[:, None], 0, indices)
+
+    bits = (indices.astype(np.uint32) << (2 * np.arange(16, dtype=np.uint32))).sum(axis=1, dtype=np.uint32)
+    out = np.empty((len(pixels), 8), dtype=np.uint8)
+    out[:, 0:2] = c0.astype('<u2').view(np.uint8).reshape(-1, 2)
+    out[:, 2:4] = c1.astype('<u2').view(np.uint8).reshape(-1, 2)
+    out[:, 4:8] = bits.astype('<u4').view(np.uint8).reshape(-1, 4)
+    return out
+
+
+def _encode_alpha(alpha):
+    """float32 (n, 16) -> uint8 (n, 8) BC3 alpha blocks, always 8-value mode"""
+    a0 = alpha.max(axis=1).astype(np.uint8)
+    a1 = alpha.min(axis=1).astype(np.uint8)
+    palette = _ALPHA_WEIGHTS * a0[:, None] + (1 - _ALPHA_WEIGHTS) * a1[:, None]
+    indices = np.abs(alpha[:, :, None] - palette[:, None]).argmin(axis=-1)
+    bits = (indices.astype(np.uint64) << (3 * np.arange(16, dtype=np.uint64))).sum(axis=1, dtype=np.uint64)
+    out = np.empty((len(alpha), 8), dtype=np.uint8)
+    out[:, 0] = a0
+    out[:, 1] = a1
+    out[:, 2:8] = bits.astype('<u8').view(np.uint8).reshape(-1, 8)[:, :6]
+    return out
+
+
+def compress_image(image, fmt='bc1'):
+    """Encode a uint8 (height, width, channels) image.
+
+    ``bc1`` keeps RGB, ``bc3`` RGBA (images without alpha get an opaque
+    one). Returns uint8 (blocks_y, blocks_x, block_bytes) in the layout
+    glCompressedTexImage2D expects.
+    """
+    image = np.asarray(image)
+    if image.ndim == 2:
+        image = image[..., None].repeat(3, axis=2)
+    if image.shape[2] == 3 and fmt == 'bc3':
+        image = np.concatenate([image, np.full(image.shape[:2] + (1,), 255, dtype=np.uint8)], axis=2)
+    height, width = image.shape[:2]
+    blocks = _to_blocks(image)
+    block_bytes = COMPRESSED_FORMATS[fmt][1]
+    out = np.empty((len(blocks), block_bytes), dtype=np.uint8)
+    for start in range(0, len(blocks), CHUNK_BLOCKS):
+        chunk = blocks[start:start + CHUNK_BLOCKS]
+        if fmt == 'bc1':
+            out[start:start + len(chunk)] = _encode_color(chunk[..., :3])
+        else:
+            out[start:start + len(chunk), :8] = _encode_alpha(chunk[..., 3])
+            out[start:start + len(chunk), 8:] = _encode_color(chunk[..., :3])
+    return out.reshape((height + 3) // 4, (width + 3) // 4, block_bytes)
+
+
+def _decode_color(blocks):
+    c0 = blocks[:, 0:2].copy().view('<u2')[:, 0]
+    c1 = blocks[:, 2:4].copy().view('<u2')[:, 0]
+    bits = blocks[:, 4:8].copy().view('<u4')[:, 0]
+    indices = (bits[:, None] >> (2 * np.arange(16, dtype=np.uint32))) & 3
+    e0, e1 = _expand_565(c0), _expand_565(c1)
+    # 4-color blocks interpolate; c0 <= c1 selects 3 colors plus black
+    four = (c0 > c1)[:, None]
+    palette = np.stack([e0, e1,
+                        np.where(four, (2 * e0 + e1) / 3, (e0 + e1) / 2),
+                        np.where(four, (e0 + 2 * e1) / 3, 0.0)], axis=1)
+    return np.take_along_axis(palette, indices[..., None].astype(np.intp), axis=1)
+
+
+def _decode_alpha(blocks):
+    a0 = blocks[:, 0].astype(np.float32)
+    a1 = blocks[:, 1].astype(np.float32)
+    bits = np.zeros((len(blocks), 8), dtype=np.uint8)
+    bits[:, :6] = blocks[:, 2:8]
+    bits = bits.view('<u8')[:, 0]
+    indices = (bits[:, None] >> (3 * np.arange(16, dtype=np.uint64))) & 7
+    eight = (a0 > a1)[:, None]
+    six = np.array([1.0, 0.0, 4 / 5, 3 / 5, 2 / 5, 1 / 5], dtype=np.float32)
+    palette8 = _ALPHA_WEIGHTS * a0[:, None] + (1 - _ALPHA_WEIGHTS) * a1[:, None]
+    palette6 = np.concatenate([six * a0[:, None] + (1 - six) * a1[:, None],
+                               np.zeros((len(blocks), 1)), np.full((len(blocks), 1), 255.0)], axis=1)
+    palette = np.where(eight, palette8, palette6)
+    return np.take_along_axis(palette, indices.astype(np.intp), axis=1)
+
+
+def decompress_image(blocks, width, height, fmt='bc1'):
+    """Decode the output of ``compress_image`` back to a uint8 image"""
+    blocks = np.asarray(blocks, dtype=np.uint8).reshape(-1, COMPRESSED_FORMATS[fmt][1])
+    if fmt == 'bc1':
+        texels = _decode_color(blocks)
+    else:
+        texels = np.concatenate([_decode_color(blocks[:, 8:]), _decode_alpha(blocks[:, :8])[..., None]], axis=2)
+    return np.clip(np.rint(_from_blocks(texels, width, height)), 0, 255).astype(np.uint8)
+
+
+def psnr(original, decoded):
+    """Peak signal-to-noise ratio in dB over every channel (inf if identical)"""
+    mse = np.mean((np.asarray(original, dtype=np.float64) - decoded) ** 2)
+    return float('inf') if mse == 0 else float(10 * np.log10(255.0 ** 2 / mse))
+
+
+def compress_mip_chain(levels, fmt='bc1'):
+    """Compress every level; returns (compressed levels, PSNR of each level)"""
+    compressed, quality = [], []
+    for level in levels:
+        height, width = level.shape[:2]
+        blocks = compress_image(level, fmt)
+        decoded = decompress_image(blocks, width, height, fmt)
+        original = level if level.ndim == 3 else level[..., None].repeat(3, axis=2)
+        channels = min(original.shape[2], decoded.shape[2])
+        quality.append(psnr(original[..., :channels], decoded[..., :channels]))
+        compressed.append(blocks)
+    return compressed, quality
+
+
+def cached_compressed_chain(key, generate, fmt='bc1', version=1, cache=None):
+    """Compressed mip chain for ``key``, encoded from ``generate()`` only on a miss.
+
+    ``generate`` returns the uncompressed chain (a list of uint8 levels,
+    finest first). Returns (compressed levels, per-level PSNR); on a hit the
+    levels are read-only memory-mapped views of the cache entry.
+    """
+    cache = cache or ArrayCache()
+    key = f'{key}:{fmt}'
+    entry = cache.load(key)
+    if entry is not None:
+        meta, arrays = entry
+        if meta.get('version') == version:
+            return [arrays[f'level{k}'] for k in range(meta['levels'])], meta['psnr']
+        # Stale: release the mapping so the entry can be replaced.
+        entry = arrays = None
+
+    compressed, quality = compress_mip_chain(generate(), fmt)
+    cache.store(key, {'version': version, 'levels': len(compressed), 'psnr': quality},
+                {f'level{k}': level for k, level in enumerate(compressed)})
+    return compressed, quality
+
+
+def compressed_image_chain(path, fmt='bc1', mipmaps=True, kind='kaiser', cache=None):
+    """Load an image file with PIL and return its cached compressed chain.
+
+    The cache entry is keyed by the file's path, size and mtime, so editing
+    the image rebuilds it. Returns (compressed levels, per-level PSNR).
+    """
+    from PIL import Image
+
+    def generate():
+        mode = 'RGBA' if COMPRESSED_FORMATS[fmt][2] == 4 else 'RGB'
+        image = np.asarray(Image.open(path).convert(mode))
+        return build_mip_chain(image, kind) if mipmaps else [image]
+
+    signature = file_signature(path)
+    key = f"image:{signature['path']}:{signature['size']}:{signature['mtime_ns']}:{mipmaps}:{kind}"
+    return cached_compressed_chain(key, generate, fmt, cache=cache)
+
+
+def upload_compressed_chain(levels, width, height, fmt='bc1', target=GL_TEXTURE_2D):
+    """Upload compressed levels to the bound texture.
+
+    For ``GL_TEXTURE_2D_ARRAY`` every level is a sequence of per-layer
+    blocks and the layers go up together with glCompressedTexImage3D.
+    """
+    internal_format = COMPRESSED_FORMATS[fmt][0]
+    for level, (w, h) in enumerate(mip_sizes(width, height)[:len(levels)]):
+        if target == GL_TEXTURE_2D_ARRAY:
+            data = np.ascontiguousarray(np.stack(levels[level]))
+            glCompressedTexImage3D(target, level, internal_format, w, h, len(levels[level]), 0, data.nbytes, data)
+        else:
+            data = np.ascontiguousarray(levels[level])
+            glCompressedTexImage2D(target, level, internal_format, w, h, 0, data.nbytes, data)
+    glTexParameteri(target, GL_TEXTURE_BASE_LEVEL, 0)
+    glTexParameteri(target, GL_TEXTURE_MAX_LEVEL, len(levels) - 1)
@@ -0,0 +1,245 @@
+# texture_streaming.py
+# Background texture loading through pixel unpack buffers (PBOs).
+#
+# The render thread maps a PBO and hands the pointer to a worker thread,
+# which generates or decodes the image (all mip levels) straight into it.
+# Each frame, update() uploads a bounded number of finished images from
+# their PBOs with glTexSubImage2D/3D; until every part of a texture has
+# arrived, StreamedTexture.texture is a small placeholder. Block-compressed
+# (BC1/BC3) levels stream the same way, with glCompressedTexSubImage.
+import ctypes
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from OpenGL.GL import *
+
+from common.mipmap import mip_sizes
+from common.texture_compression import COMPRESSED_FORMATS, compressed_size
+
+FORMATS = {1: GL_RED, 3: GL_RGB, 4: GL_RGBA}
+PLACEHOLDER_COLOR = (128, 128, 128)
+
+
+class StreamedTexture:
+    """A texture whose parts (2D image or array layers) arrive over time.
+
+    Bind ``texture``: it is the placeholder until the last part has been
+    uploaded, then the real texture.
+    """
+
+    def __init__(self, target, real, placeholder, parts):
+        self.target = target
+        self.real = real
+        self.placeholder = placeholder
+        self.remaining = parts
+        self.texture = placeholder
+
+    @property
+    def ready(self):
+        return self.remaining == 0
+
+
+class _Job:
+    def __init__(self, streamed, layer, generate, sizes, channels, compression):
+        self.streamed = streamed
+        self.layer = layer
+        self.generate = generate
+        self.sizes = sizes
+        self.channels = channels
+        self.compression = compression
+        if compression:
+            self.level_bytes = [compressed_size(w, h, compression) for w, h in sizes]
+        else:
+            self.level_bytes = [w * h * channels for w, h in sizes]
+        self.nbytes = sum(self.level_bytes)
+        self.pbo = None
+        self.future = None
+
+
+def _fill(destination, generate, sizes, level_bytes, compressed):
+    """Worker: write the generated levels back to back into mapped memory"""
+    levels = generate()
+    if isinstance(levels, np.ndarray):
+        levels = [levels]
+    if len(levels) < len(sizes):
+        raise ValueError(f"Expected {len(sizes)} mip levels, got {len(levels)}")
+    offset = 0
+    for (w, h), n, level in zip(sizes, level_bytes, levels):
+        if compressed:
+            if level.nbytes != n:
+                raise ValueError(f"Expected {n} bytes of blocks for a {w}x{h} level, got {level.nbytes}")
+        elif level.shape[:2] != (h, w):
+            raise ValueError(f"Expected a {w}x{h} level, got {level.shape[1]}x{level.shape[0]}")
+        np.copyto(destination[offset:offset + n], np.asarray(level, dtype=np.uint8).reshape(-1))
+        offset += n
+
+
+class TextureStreamer:
+    """Load textures in worker threads and upload them a few per frame.
+
+    ``uploads_per_frame`` bounds the glTexSubImage work in ``update()``;
+    ``max_in_flight`` bounds the number of mapped PBOs (and so the memory
+    held by images waiting for upload).
+    """
+
+    def __init__(self, workers=2, uploads_per_frame=2, max_in_flight=4):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='texture-stream')
+        self.uploads_per_frame = uploads_per_frame
+        self.max_in_flight = max_in_flight
+        self.queued = []
+        self.in_flight = []
+        self.free_pbos = []
+        self.placeholders = {}
+
+    def _placeholder(self, target, channels):
+        """Shared 1x1 texture (a single layer for arrays: layer lookups clamp to it)"""
+        key = (target, channels)
+        if key not in self.placeholders:
+            texture = glGenTextures(1)
+            glBindTexture(target, texture)
+            fmt = FORMATS[channels]
+            pixel = np.array(PLACEHOLDER_COLOR[:channels] + (255,) * (channels - 3), dtype=np.uint8)
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+            if target == GL_TEXTURE_2D_ARRAY:
+                glTexImage3D(target, 0, fmt, 1, 1, 1, 0, fmt, GL_UNSIGNED_BYTE, pixel)
+            else:
+                glTexImage2D(target, 0, fmt, 1, 1, 0, fmt, GL_UNSIGNED_BYTE, pixel)
+            glTexParameteri(target, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(target, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+            self.placeholders[key] = texture
+        return self.placeholders[key]
+
+    def load(self, generators, width, height, mipmaps=True, channels=3, target=GL_TEXTURE_2D, params=None,
+             compression=None):
+        """Start streaming a texture and return its ``StreamedTexture``.
+
+        ``generators`` is one callable for a 2D texture or a list of them,
+        one per layer, for ``GL_TEXTURE_2D_ARRAY``. Each runs on a worker
+        thread and returns the mip chain (a list of uint8 (h, w, channels)
+        levels, finest first; just the base image without ``mipmaps``).
+        ``params`` are glTexParameteri settings for the real texture.
+        With ``compression`` ('bc1' or 'bc3', see texture_compression) the
+        levels are the encoded blocks instead, and the texture is stored
+        compressed; ``channels`` is then implied by the format.
+        """
+        if callable(generators):
+            generators = [generators]
+        is_array = target == GL_TEXTURE_2D_ARRAY
+        if not is_array and len(generators) != 1:
+            raise ValueError("Only GL_TEXTURE_2D_ARRAY textures have several layers")
+        sizes = mip_sizes(width, height) if mipmaps else [(width, height)]
+
+        # Allocate storage for every level now (no pixel transfer), so
+        # uploads are glTexSubImage calls into existing storage.
+        if compression:
+            internal_format, _, channels = COMPRESSED_FORMATS[compression]
+            fmt = FORMATS[channels]
+        else:
+            internal_format = fmt = FORMATS[channels]
+        texture = glGenTextures(1)
+        glBindTexture(target, texture)
+        for level, (w, h) in enumerate(sizes):
+            if is_array:
+                glTexImage3D(target, level, internal_format, w, h, len(generators), 0, fmt, GL_UNSIGNED_BYTE, None)
+            else:
+                glTexImage2D(target, level, internal_format, w, h, 0, fmt, GL_UNSIGNED_BYTE, None)
+        glTexParameteri(target, GL_TEXTURE_BASE_LEVEL, 0)
+        glTexParameteri(target, GL_TEXTURE_MAX_LEVEL, len(sizes) - 1)
+        for name, value in (params or {}).items():
+            glTexParameteri(target, name, value)
+
+        streamed = StreamedTexture(target, texture, self._placeholder(target, channels), len(generators))
+        for layer, generate in enumerate(generators):
+            self.queued.append(_Job(streamed, layer, generate, sizes, channels, compression))
+        self._dispatch()
+        return streamed
+
+    @property
+    def busy(self):
+        return bool(self.queued or self.in_flight)
+
+    def _dispatch(self):
+        """Map PBOs for queued jobs and hand them to the workers"""
+        while self.queued and len(self.in_flight) < self.max_in_flight:
+            job = self.queued.pop(0)
+            job.pbo = self.free_pbos.pop() if self.free_pbos else glGenBuffers(1)
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, job.pbo)
+            # Orphan the old storage so mapping never waits for an upload
+            glBufferData(GL_PIXEL_UNPACK_BUFFER, job.nbytes, None, GL_STREAM_DRAW)
+            address = glMapBufferRange(GL_PIXEL_UNPACK_BUFFER, 0, job.nbytes,
+                                       GL_MAP_WRITE_BIT | GL_MAP_INVALIDATE_BUFFER_BIT)
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+            if isinstance(address, ctypes.c_void_p):
+                address = address.value
+            destination = np.ctypeslib.as_array((ctypes.c_ubyte * job.nbytes).from_address(address))
+            job.future = self.executor.submit(_fill, destination, job.generate, job.sizes, job.level_bytes,
+                                              bool(job.compression))
+            self.in_flight.append(job)
+
+    def update(self):
+        """Upload up to ``uploads_per_frame`` finished images; call once per frame.
+
+        Returns the number of images uploaded. Exceptions raised by a
+        generator are re-raised here.
+        """
+        uploaded = 0
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        for job in list(self.in_flight):
+            if uploaded >= self.uploads_per_frame:
+                break
+            if not job.future.done():
+                continue
+            self.in_flight.remove(job)
+
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, job.pbo)
+            glUnmapBuffer(GL_PIXEL_UNPACK_BUFFER)
+            self.free_pbos.append(job.pbo)
+            job.future.result()
+
+            streamed = job.streamed
+            fmt = FORMATS[job.channels]
+            glBindTexture(streamed.target, streamed.real)
+            offset = 0
+            for level, ((w, h), n) in enumerate(zip(job.sizes, job.level_bytes)):
+                # With a PBO bound the data argument is an offset into it
+                if job.compression:
+                    internal_format = COMPRESSED_FORMATS[job.compression][0]
+                    if streamed.target == GL_TEXTURE_2D_ARRAY:
+                        glCompressedTexSubImage3D(streamed.target, level, 0, 0, job.layer, w, h, 1, internal_format,
+                                                  n, ctypes.c_void_p(offset))
+                    else:
+                        glCompressedTexSubImage2D(streamed.target, level, 0, 0, w, h, internal_format, n,
+                                                  ctypes.c_void_p(offset))
+                elif streamed.target == GL_TEXTURE_2D_ARRAY:
+                    glTexSubImage3D(streamed.target, level, 0, 0, job.layer, w, h, 1, fmt, GL_UNSIGNED_BYTE,
+                                    ctypes.c_void_p(offset))
+                else:
+                    glTexSubImage2D(streamed.target, level, 0, 0, w, h, fmt, GL_UNSIGNED_BYTE,
+                                    ctypes.c_void_p(offset))
+                offset += n
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+
+            streamed.remaining -= 1
+            if streamed.ready:
+                streamed.texture = streamed.real
+            uploaded += 1
+
+        self._dispatch()
+        return uploaded
+
+    def shutdown(self):
+        """Wait for the workers and release the PBOs and placeholders"""
+        self.queued.clear()
+        self.executor.shutdown(wait=True)
+        for job in self.in_flight:
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, job.pbo)
+            glUnmapBuffer(GL_PIXEL_UNPACK_BUFFER)
+            self.free_pbos.append(job.pbo)
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+        self.in_flight.clear()
+        if self.free_pbos:
+            glDeleteBuffers(len(self.free_pbos), self.free_pbos)
+            self.free_pbos.clear()
+        if self.placeholders:
+            glDeleteTextures(len(self.placeholders), list(self.placeholders.values()))
+            self.placeholders.clear()
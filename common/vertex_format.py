@@ -0,0 +1,214 @@
+# vertex_format.py
+"""Compact, interleaved vertex formats described by a small layout table.
+
+A layout lists the attributes of a vertex with their shader location and
+storage format::
+
+    layout = VertexLayout([
+        Attribute('position', 0, 3, 'snorm16'),
+        Attribute('normal', 1, 3, 'int_2_10_10_10_rev'),
+        Attribute('color', 2, 3, 'unorm8'),
+    ])
+    data, dequant = layout.pack(position=p, normal=n, color=c)
+    ...
+    layout.setup()                       # with the VAO and VBO bound
+    set_dequantization(program, dequant) # with the program in use
+
+Formats:
+
+- ``float32`` / ``float16``: plain floats (GL_FLOAT / GL_HALF_FLOAT).
+- ``snorm16``: int16 relative to the attribute's bounding box. The shader
+  gets ``<name>Scale`` and ``<name>Offset`` uniforms and computes
+  ``value = a<Name> * scale + offset``. The integers are uploaded
+  unnormalized and the 1/32767 is folded into the scale, which is exact and
+  does not depend on the GL version's signed-normalized conversion rule.
+- ``int_2_10_10_10_rev``: three signed 10-bit components in one 32-bit word
+  (unit vectors such as normals), normalized by the GL.
+- ``unorm8`` / ``unorm16``: values in [0, 1] (colors, UVs), normalized by
+  the GL.
+"""
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+# numpy dtype, bytes per component, GL type, normalized
+FORMATS = {
+    'float32': (np.float32, 4, GL_FLOAT, GL_FALSE),
+    'float16': (np.float16, 2, GL_HALF_FLOAT, GL_FALSE),
+    'snorm16': (np.int16, 2, GL_SHORT, GL_FALSE),
+    'unorm16': (np.uint16, 2, GL_UNSIGNED_SHORT, GL_TRUE),
+    'unorm8': (np.uint8, 1, GL_UNSIGNED_BYTE, GL_TRUE),
+    'int_2_10_10_10_rev': (np.uint32, None, GL_INT_2_10_10_10_REV, GL_TRUE),
+}
+
+SNORM16_MAX = 32767
+
+
+class Attribute:
+    def __init__(self, name, location, components, format='float32'):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown vertex format: {format}")
+        if format == 'int_2_10_10_10_rev' and components not in (3, 4):
+            raise ValueError("int_2_10_10_10_rev needs 3 or 4 components")
+        self.name = name
+        self.location = location
+        self.components = components
+        self.format = format
+        self.offset = 0
+
+    @property
+    def size(self):
+        """Bytes taken by this attribute in a vertex (before alignment)"""
+        if self.format == 'int_2_10_10_10_rev':
+            return 4
+        return FORMATS[self.format][1] * self.components
+
+
+class VertexLayout:
+    """Interleaved vertex layout; every attribute starts on a 4-byte boundary"""
+
+    def __init__(self, attributes):
+        self.attributes = list(attributes)
+        offset = 0
+        for attribute in self.attributes:
+            attribute.offset = offset
+            offset += (attribute.size + 3) // 4 * 4
+        self.stride = offset
+
+    def pack(self, **arrays):
+        """Pack per-attribute arrays into one interleaved buffer.
+
+        Every keyword is an attribute name with an array of ``components``
+        values per vertex (flat or 2D). Returns ``(data, dequant)``: a uint8
+        array of shape (count, stride) and, for every ``snorm16`` attribute,
+        its ``(scale, offset)`` dequantization pair.
+        """
+        missing = {a.name for a in self.attributes} - set(arrays)
+        if missing:
+            raise ValueError(f"Missing vertex attributes: {', '.join(sorted(missing))}")
+
+        values = {a.name: np.asarray(arrays[a.name], dtype=np.float64).reshape(-1, a.components)
+                  for a in self.attributes}
+        count = len(next(iter(values.values()))) if values else 0
+        data = np.zeros((count, self.stride), dtype=np.uint8)
+        dequant = {}
+
+        for a in self.attributes:
+            v = values[a.name]
+            if len(v) != count:
+                raise ValueError(f"Attribute '{a.name}' has {len(v)} vertices, expected {count}")
+
+            if a.format == 'snorm16':
+                low, high = (v.min(axis=0), v.max(axis=0)) if count else (np.zeros(a.components),) * 2
+                center = (low + high) / 2
+                half = (high - low) / 2
+                scale = np.where(half > 0, half, 1.0) / SNORM16_MAX
+                packed = np.rint((v - center) / scale).astype(np.int16)
+                dequant[a.name] = (scale.astype(np.float32), center.astype(np.float32))
+            elif a.format == 'int_2_10_10_10_rev':
+                q = np.rint(np.clip(v[:, :3], -1.0, 1.0) * 511).astype(np.int64) & 0x3FF
+                packed = (q[:, 0] | q[:, 1] << 10 | q[:, 2] << 20).astype(np.uint32)[:, None]
+            elif a.format in ('unorm8', 'unorm16'):
+                top = np.iinfo(FORMATS[a.format][0]).max
+                packed = np.rint(np.clip(v, 0.0, 1.0) * top).astype(FORMATS[a.format][0])
+            else:
+                packed = v.astype(FORMATS[a.format][0])
+
+            data[:, a.offset:a.offset + a.size] = packed.view(np.uint8).reshape(count, a.size)
+
+        return data, dequant
+
+    def decode(self, data, dequant):
+        """Values as the vertex shader sees them (after dequantization)"""
+        data = np.ascontiguousarray(data).reshape(-1, self.stride)
+        decoded = {}
+        for a in self.attributes:
+            raw = np.ascontiguousarray(data[:, a.offset:a.offset + a.size]).view(FORMATS[a.format][0])
+            if a.format == 'snorm16':
+                scale, offset = dequant[a.name]
+                decoded[a.name] = raw * scale + offset
+            elif a.format == 'int_2_10_10_10_rev':
+                word = raw[:, 0].astype(np.int64)
+                q = np.stack([(word >> shift) & 0x3FF for shift in (0, 10, 20)], axis=1)
+                q = np.where(q >= 512, q - 1024, q)
+                decoded[a.name] = np.maximum(q / 511, -1.0)
+            elif a.format in ('unorm8', 'unorm16'):
+                decoded[a.name] = raw / np.iinfo(FORMATS[a.format][0]).max
+            else:
+                decoded[a.name] = raw.astype(np.float64)
+        return decoded
+
+    def error_bounds(self, dequant, **arrays):
+        """Worst-case absolute error per attribute component for these inputs"""
+        bounds = {}
+        for a in self.attributes:
+            largest = float(np.abs(np.asarray(arrays[a.name], dtype=np.float64)).max(initial=0.0))
+            if a.format == 'snorm16':
+                # Half a quantization step, plus float32 rounding of the
+                # dequantization in the shader.
+                scale, offset = dequant[a.name]
+                bounds[a.name] = float(scale.max()) / 2 + 2.0 ** -23 * float(np.abs(offset).max() + largest)
+            elif a.format == 'int_2_10_10_10_rev':
+                bounds[a.name] = 0.5 / 511
+            elif a.format in ('unorm8', 'unorm16'):
+                bounds[a.name] = 0.5 / np.iinfo(FORMATS[a.format][0]).max
+            elif a.format == 'float16':
+                # Half a unit in the last place (11 significant bits), or the
+                # subnormal spacing near zero.
+                bounds[a.name] = max(largest * 2.0 ** -11, 2.0 ** -25)
+            else:
+                bounds[a.name] = largest * 2.0 ** -24
+        return bounds
+
+    def accuracy(self, data, dequant, **arrays):
+        """Measured max error and its bound, ``{name: (error, bound)}``.
+
+        Inputs outside a format's range (e.g. colors above 1) are clamped
+        when packing and show up as errors above the bound.
+        """
+        decoded = self.decode(data, dequant)
+        bounds = self.error_bounds(dequant, **arrays)
+        result = {}
+        for a in self.attributes:
+            original = np.asarray(arrays[a.name], dtype=np.float64).reshape(-1, a.components)
+            if a.format == 'int_2_10_10_10_rev':
+                original = original[:, :3]
+            error = float(np.abs(decoded[a.name] - original).max(initial=0.0))
+            result[a.name] = (error, bounds[a.name])
+        return result
+
+    def setup(self):
+        """Point the attributes at the bound GL_ARRAY_BUFFER (VAO must be bound)"""
+        for a in self.attributes:
+            gl_type, normalized = FORMATS[a.format][2:]
+            size = 4 if a.format == 'int_2_10_10_10_rev' else a.components
+            glVertexAttribPointer(a.location, size, gl_type, normalized, self.stride, ctypes.c_void_p(a.offset))
+            glEnableVertexAttribArray(a.location)
+
+
+def create_vertex_buffer(layout, data):
+    """Upload packed vertex data and set up the attributes of the bound VAO"""
+    vbo = glGenBuffers(1)
+    glBindBuffer(GL_ARRAY_BUFFER, vbo)
+    glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+    layout.setup()
+    return vbo
+
+
+def set_dequantization(program, dequant):
+    """Set the ``<name>Scale``/``<name>Offset`` uniforms of the current program.
+
+    ``program`` is a GL program name or a common.shader.Program (which
+    skips values it already holds).
+    """
+    if hasattr(program, 'set'):
+        for name, (scale, offset) in dequant.items():
+            program.set(name + 'Scale', scale)
+            program.set(name + 'Offset', offset)
+        return
+    setters = {1: glUniform1fv, 2: glUniform2fv, 3: glUniform3fv, 4: glUniform4fv}
+    for name, (scale, offset) in dequant.items():
+        setter = setters[len(scale)]
+        setter(glGetUniformLocation(program, name + 'Scale'), 1, scale)
+        setter(glGetUniformLocation(program, name + 'Offset'), 1, offset)